@@ -0,0 +1,21 @@
+"""Benchmarks of the pose streaming hot paths on synthetic data.
+
+Covers Quest packet decoding, FusionWorkspace updates and fusion reads,
+memory per packet, the MediaPipe/SynthPose result conversions and the
+capture -> inference -> workspace pipeline with a stub model. Nothing
+needs a camera, GPU, model weights or network.
+"""
+
+from .bench import main, run_benchmarks
+from .cases import BENCHMARKS, SkipBenchmark
+from .results import compare_results, load_results, save_results
+
+__all__ = [
+    "BENCHMARKS",
+    "SkipBenchmark",
+    "compare_results",
+    "load_results",
+    "main",
+    "run_benchmarks",
+    "save_results",
+]
@@ -0,0 +1,155 @@
+"""Command line for the benchmark suite.
+
+Run every benchmark and save the results::
+
+    python -m pose_stream_server.benchmarks run --output results.json
+
+Check a run against a stored baseline (exit status 1 on regressions)::
+
+    python -m pose_stream_server.benchmarks compare baseline.json results.json --threshold 0.1
+
+or both at once with ``run --baseline baseline.json``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from pose_stream_server.benchmarks.cases import BENCHMARKS, SkipBenchmark
+from pose_stream_server.benchmarks.results import (
+    DEFAULT_THRESHOLD,
+    Comparison,
+    compare_results,
+    environment,
+    load_results,
+    save_results,
+)
+
+logger = logging.getLogger(__name__)
+
+QUICK_SCALE = 0.1
+
+
+def run_benchmarks(names: Optional[Sequence[str]] = None, scale: float = 1.0) -> dict:
+    """Run ``names`` (default: all) and return a result document."""
+
+    meta = environment()
+    meta["scale"] = scale
+    results = {"meta": meta, "benchmarks": {}}
+    for name in names or BENCHMARKS:
+        began = time.perf_counter()
+        try:
+            metrics = BENCHMARKS[name](scale)
+        except SkipBenchmark as exc:
+            logger.warning("Skipping %s: %s", name, exc)
+            results["benchmarks"][name] = {"skipped": str(exc)}
+            continue
+        elapsed = time.perf_counter() - began
+        logger.info("%s done in %.1f s", name, elapsed)
+        results["benchmarks"][name] = {"metrics": metrics, "seconds": elapsed}
+    return results
+
+
+def print_results(results: dict) -> None:
+    for name, entry in results["benchmarks"].items():
+        if "skipped" in entry:
+            print(f"{name}: skipped ({entry['skipped']})")
+            continue
+        print(f"{name}:")
+        for key, value in entry["metrics"].items():
+            print(f"  {key:<40} {value['value']:>14.3f} {value['unit']}")
+
+
+def report(comparisons: List[Comparison]) -> int:
+    """Print ``comparisons`` and return the number of regressions."""
+
+    for comparison in comparisons:
+        print(comparison)
+    regressions = sum(comparison.regressed for comparison in comparisons)
+    print(f"{len(comparisons)} metrics compared, {regressions} regressed")
+    return regressions
+
+
+def _parse_thresholds(values: List[str]) -> Dict[str, float]:
+    thresholds = {}
+    for value in values:
+        name, _, limit = value.partition("=")
+        if name not in BENCHMARKS or not limit:
+            raise argparse.ArgumentTypeError(f"expected BENCHMARK=FRACTION, got {value!r}")
+        thresholds[name] = float(limit)
+    return thresholds
+
+
+def _add_threshold_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Relative change in the worse direction that counts as a regression (default: {DEFAULT_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--benchmark-threshold",
+        action="append",
+        default=[],
+        metavar="NAME=FRACTION",
+        help="Per-benchmark threshold, e.g. pipeline=0.25 (repeatable)",
+    )
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Camera/GPU/network-free benchmarks of the pose streaming hot paths",
+        epilog=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--log-level", default="WARNING", help="Logging level (default: WARNING)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run benchmarks and save their results")
+    run.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Benchmarks to run (default: all)")
+    run.add_argument("--scale", type=float, default=1.0, help="Work per benchmark relative to a full run")
+    run.add_argument("--quick", action="store_true", help=f"Smoke run (same as --scale {QUICK_SCALE})")
+    run.add_argument("--output", type=Path, default=None, help="Write results to this JSON file")
+    run.add_argument("--baseline", type=Path, default=None, help="Compare against this results file afterwards")
+    _add_threshold_arguments(run)
+
+    compare = commands.add_parser("compare", help="Flag regressions of CURRENT against BASELINE")
+    compare.add_argument("baseline", type=Path)
+    compare.add_argument("current", type=Path)
+    _add_threshold_arguments(compare)
+
+    commands.add_parser("list", help="List the benchmarks")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.WARNING))
+
+    if args.command == "list":
+        for name, bench in BENCHMARKS.items():
+            print(f"{name:<20} {bench.__doc__.strip().splitlines()[0]}")
+        return
+
+    thresholds = _parse_thresholds(args.benchmark_threshold)
+    if args.command == "compare":
+        current = load_results(args.current)
+    else:
+        current = run_benchmarks(args.only, QUICK_SCALE if args.quick else args.scale)
+        print_results(current)
+        if args.output is not None:
+            save_results(args.output, current)
+            print(f"Results written to {args.output}")
+        if args.baseline is None:
+            return
+
+    baseline = load_results(args.baseline)
+    if baseline.get("meta", {}).get("scale") != current["meta"].get("scale"):
+        logger.warning("Baseline and current run used different --scale values; latencies may not compare")
+    if report(compare_results(baseline, current, args.threshold, thresholds)):
+        sys.exit(1)
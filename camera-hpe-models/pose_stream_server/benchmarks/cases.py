@@ -0,0 +1,252 @@
+"""The individual benchmarks.
+
+Each one takes a ``scale`` (1.0 for a full run, smaller for a smoke run),
+builds its own synthetic inputs outside the timed region and returns a
+dict of metrics (``results.metric``). A benchmark whose code path needs a
+package that is not installed raises :class:`SkipBenchmark`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gc
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from pose_stream_server.benchmarks import synthetic
+from pose_stream_server.benchmarks.results import HIGHER, LOWER, Metrics, latency_metrics, metric
+from pose_stream_server.common.backend_runner import run_backend
+from pose_stream_server.common.fusion_workspace import FusionWorkspace
+from pose_stream_server.common.pyramid import ResolutionPyramid
+from pose_stream_server.udp_pose_receiver.quest_packet import QuestPacketDecoder
+from pose_stream_server.udp_pose_receiver.udp_pose_receiver import DECODE_ARRAY, DECODE_DICT, PosePacketProtocol
+
+# Quest packets per camera snapshot (72 Hz headset, ~30 FPS camera).
+PACKETS_PER_SNAPSHOT = 2
+HEADSETS = 4
+
+
+class SkipBenchmark(Exception):
+    pass
+
+
+def _count(base: int, scale: float, minimum: int = 10) -> int:
+    return max(minimum, int(base * scale))
+
+
+def _ignore(payload, addr) -> None:
+    pass
+
+
+def bench_decode(scale: float) -> Metrics:
+    """``PosePacketProtocol.datagram_received`` throughput in both decode modes."""
+
+    datagrams = synthetic.quest_datagrams(_count(20000, scale), headsets=HEADSETS)
+    addrs = [("127.0.0.1", 50000 + i % HEADSETS) for i in range(len(datagrams))]
+    metrics: Metrics = {}
+    for mode in (DECODE_ARRAY, DECODE_DICT):
+        protocol = PosePacketProtocol(_ignore, decode=mode)
+        # Warm the per-sender counters and the layout cache.
+        for data, addr in zip(datagrams[:HEADSETS], addrs):
+            protocol.datagram_received(data, addr)
+        began = time.perf_counter()
+        for data, addr in zip(datagrams, addrs):
+            protocol.datagram_received(data, addr)
+        elapsed = time.perf_counter() - began
+        metrics[f"{mode}_packets_per_s"] = metric(len(datagrams) / elapsed, "packets/s", HIGHER)
+    metrics["datagram_bytes"] = metric(sum(map(len, datagrams)) / len(datagrams), "bytes", LOWER)
+    return metrics
+
+
+def _feed(workspace: FusionWorkspace, packets, camera: synthetic.SyntheticCamera, start: float):
+    """Interleave Quest packets and camera snapshots; returns per-call latencies."""
+
+    quest, lower = [], []
+    for i, packet in enumerate(packets):
+        t = start + i / 72.0
+        began = time.perf_counter()
+        workspace.handle_quest_packet(packet, synthetic.ADDR, received_at=t)
+        quest.append(time.perf_counter() - began)
+        if i % PACKETS_PER_SNAPSHOT == 0:
+            snapshot = camera.snapshot(packet, t)
+            began = time.perf_counter()
+            workspace.update_lower_body(snapshot)
+            lower.append(time.perf_counter() - began)
+    return quest, lower
+
+
+def bench_workspace(scale: float) -> Metrics:
+    """FusionWorkspace update latency and time-aligned fusion reads."""
+
+    packets = synthetic.quest_packets(synthetic.quest_datagrams(_count(10000, scale, minimum=200)))
+    camera = synthetic.SyntheticCamera()
+    workspace = FusionWorkspace()
+    start = 1000.0
+    quest, lower = _feed(workspace, packets, camera, start)
+    if not workspace.alignments or not next(iter(workspace.alignments.values())).calibrated:
+        raise RuntimeError("synthetic camera never calibrated against the Quest body")
+
+    # Query between samples so both histories interpolate.
+    end = start + (len(packets) - 1) / 72.0
+    queries = [start + (end - start) * (i + 0.5) / len(packets) for i in range(len(packets))]
+    fusion = []
+    for t in queries:
+        began = time.perf_counter()
+        workspace.upper_body_at(t)
+        workspace.lower_body_in_quest_at(t)
+        fusion.append(time.perf_counter() - began)
+
+    metrics: Metrics = {}
+    metrics.update(latency_metrics("quest_update", quest))
+    metrics.update(latency_metrics("camera_update", lower))
+    metrics.update(latency_metrics("fusion_read", fusion))
+    return metrics
+
+
+def bench_memory(scale: float) -> Metrics:
+    """Bytes held per decoded packet and retained by the workspace per packet."""
+
+    count = _count(2000, scale, minimum=100)
+    datagrams = synthetic.quest_datagrams(count * 3)
+    packets = synthetic.quest_packets(datagrams[count:])
+    decoder = QuestPacketDecoder()
+    decoder.decode(datagrams[0])
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        held = [decoder.decode(data) for data in datagrams[:count]]
+        decoded = (tracemalloc.get_traced_memory()[0] - before) / count
+        del held
+
+        # Fill the ring buffers first; after that a packet should cost nothing.
+        workspace = FusionWorkspace()
+        camera = synthetic.SyntheticCamera()
+        warm, steady = packets[:count], packets[count:]
+        _feed(workspace, warm, camera, 1000.0)
+        gc.collect()
+        before = tracemalloc.get_traced_memory()[0]
+        _feed(workspace, steady, camera, 1000.0 + count / 72.0)
+        gc.collect()
+        retained = (tracemalloc.get_traced_memory()[0] - before) / len(steady)
+    finally:
+        tracemalloc.stop()
+    return {
+        "decoded_packet_bytes": metric(decoded, "bytes", LOWER),
+        "workspace_retained_bytes_per_packet": metric(retained, "bytes", LOWER, tolerance=64.0),
+    }
+
+
+def bench_mediapipe_extract(scale: float) -> Metrics:
+    """``extract_pose_data`` on synthetic MediaPipe results."""
+
+    try:
+        from pose_stream_server.mediapipe.mediapipe_stream_server import extract_pose_data
+    except ImportError as exc:
+        raise SkipBenchmark(f"mediapipe is not importable ({exc})") from None
+
+    results = synthetic.mediapipe_results(_count(5000, scale))
+    samples = []
+    for result in results:
+        began = time.perf_counter()
+        extract_pose_data(result, 0.0)
+        samples.append(time.perf_counter() - began)
+    return latency_metrics("extract", samples)
+
+
+def bench_synthpose_convert(scale: float) -> Metrics:
+    """SynthPose keypoints (mmpose result) to a ``PoseSnapshot``."""
+
+    from pose_stream_server.synthpose.synthpose_mmpose_server import first_instance, keypoints_to_snapshot
+
+    batches = synthetic.synthpose_batches(_count(5000, scale))
+    samples = []
+    for batch in batches:
+        began = time.perf_counter()
+        keypoints, scores = first_instance(batch)
+        keypoints_to_snapshot(keypoints, scores, 0.0)
+        samples.append(time.perf_counter() - began)
+    return latency_metrics("convert", samples)
+
+
+def bench_pyramid(scale: float) -> Metrics:
+    """Resolution pyramid stages on a 1080p frame: downscale, ROI crop, keypoint mapping."""
+
+    frame = synthetic.fake_frames(1, shape=(1080, 1920, 3))[0]
+    pyramid = ResolutionPyramid("bench", detect_size=640, roi_size=(192, 256), padding=1.25)
+    bbox = (760.0, 180.0, 1160.0, 1020.0)
+    keypoints = synthetic.synthpose_batches(1)[0].pred_instances.keypoints
+    count = _count(500, scale)
+    detect, crop, mapping = [], [], []
+    for _ in range(count):
+        began = time.perf_counter()
+        buffer, _, transform = pyramid.detection_input(frame)
+        detect.append(time.perf_counter() - began)
+        buffer.release()
+
+        began = time.perf_counter()
+        buffer, transform = pyramid.roi_input(frame, bbox)
+        crop.append(time.perf_counter() - began)
+        buffer.release()
+
+        began = time.perf_counter()
+        transform.to_frame(keypoints)
+        mapping.append(time.perf_counter() - began)
+
+    metrics: Metrics = {}
+    metrics.update(latency_metrics("detect_downscale", detect))
+    metrics.update(latency_metrics("roi_crop", crop))
+    metrics.update(latency_metrics("keypoint_map", mapping))
+    return metrics
+
+
+def _pipeline(frames: int, fps: float, latency: float) -> Metrics:
+    workspace = FusionWorkspace()
+    source = synthetic.SyntheticFrameSource(frames, fps=fps)
+    backend = synthetic.StubBackend(latency=latency)
+    delays: List[float] = []
+    published: List[float] = []
+
+    def publish(snapshot) -> None:
+        workspace.update_lower_body(snapshot)
+        published.append(time.perf_counter())
+        delays.append(time.time() - snapshot.timestamp)
+
+    # Start-up and shutdown polling are not part of the frame rate.
+    asyncio.run(run_backend(backend, source, publish, headless=True))
+    if len(published) < 2:
+        raise RuntimeError("stub pipeline published fewer than two snapshots")
+    metrics = {
+        "fps": metric((len(published) - 1) / (published[-1] - published[0]), "frames/s", HIGHER),
+        "published_ratio": metric(len(delays) / frames, "ratio", HIGHER),
+    }
+    metrics.update(latency_metrics("capture_to_publish", delays))
+    return metrics
+
+
+def bench_pipeline(scale: float) -> Metrics:
+    """Capture -> inference -> workspace through ``run_backend`` with a stub model.
+
+    ``free`` reads frames as fast as possible into a model that returns
+    immediately (pipeline overhead only); ``model`` feeds a 200 FPS source
+    into a model that takes 10 ms, roughly MediaPipe's lite model on a CPU,
+    so about half the frames are dropped as stale.
+    """
+
+    metrics: Metrics = {}
+    for name, frames, fps, latency in (("free", 2000, 0.0, 0.0), ("model", 600, 200.0, 0.010)):
+        for key, value in _pipeline(_count(frames, scale, minimum=30), fps, latency).items():
+            metrics[f"{name}_{key}"] = value
+    return metrics
+
+
+BENCHMARKS: Dict[str, Callable[[float], Metrics]] = {
+    "decode": bench_decode,
+    "workspace": bench_workspace,
+    "memory": bench_memory,
+    "mediapipe_extract": bench_mediapipe_extract,
+    "synthpose_convert": bench_synthpose_convert,
+    "pyramid": bench_pyramid,
+    "pipeline": bench_pipeline,
+}
@@ -0,0 +1,148 @@
+"""Benchmark result files and the regression check between two of them.
+
+A result file is JSON::
+
+    {
+      "meta": {"created": ..., "python": ..., "platform": ..., ...},
+      "benchmarks": {
+        "decode": {"metrics": {"array_packets_per_s": {"value": 51234.0, "unit": "packets/s", "better": "higher"}}},
+        "mediapipe_extract": {"skipped": "mediapipe is not installed"}
+      }
+    }
+
+Every metric states which direction is an improvement, so ``compare`` needs
+no knowledge of the individual benchmarks.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import platform
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+HIGHER = "higher"
+LOWER = "lower"
+DEFAULT_THRESHOLD = 0.10
+PERCENTILES = (50, 95, 99)
+
+Metrics = Dict[str, dict]
+
+
+def metric(value: float, unit: str, better: str, tolerance: float = 0.0) -> dict:
+    """One result. ``tolerance`` is an absolute change (in ``unit``) that never
+    counts as a regression, for metrics that hover around zero."""
+
+    entry = {"value": float(value), "unit": unit, "better": better}
+    if tolerance:
+        entry["tolerance"] = float(tolerance)
+    return entry
+
+
+def latency_metrics(prefix: str, samples_s: Iterable[float]) -> Metrics:
+    """p50/p95/p99 and mean of ``samples_s`` (seconds) as ``<prefix>_p50_us`` etc."""
+
+    samples = np.asarray(list(samples_s), dtype=np.float64) * 1e6
+    metrics = {
+        f"{prefix}_p{q}_us": metric(value, "us", LOWER)
+        for q, value in zip(PERCENTILES, np.percentile(samples, PERCENTILES))
+    }
+    metrics[f"{prefix}_mean_us"] = metric(samples.mean(), "us", LOWER)
+    return metrics
+
+
+def environment() -> dict:
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+    }
+
+
+def save_results(path: Path, results: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load_results(path: Path) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@dataclass
+class Comparison:
+    benchmark: str
+    metric: str
+    baseline: float
+    current: float
+    unit: str
+    better: str
+    threshold: float
+    tolerance: float = 0.0
+
+    @property
+    def change(self) -> float:
+        """Relative change, positive when the metric improved."""
+
+        delta = self.current - self.baseline
+        if self.baseline:
+            delta /= abs(self.baseline)
+        elif delta:
+            delta = math.copysign(math.inf, delta)
+        return delta if self.better == HIGHER else -delta
+
+    @property
+    def regressed(self) -> bool:
+        if abs(self.current - self.baseline) <= self.tolerance:
+            return False
+        return self.change < -self.threshold
+
+    def __str__(self) -> str:
+        flag = "REGRESSION" if self.regressed else ("improved" if self.change > self.threshold else "ok")
+        return (
+            f"{self.benchmark + '.' + self.metric:<48} {self.baseline:>14.3f} -> {self.current:>14.3f} {self.unit:<10}"
+            f" {self.change:+8.1%}  {flag}"
+        )
+
+
+def compare_results(
+    baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD, thresholds: Optional[Dict[str, float]] = None
+) -> List[Comparison]:
+    """Pair up every metric present in both files.
+
+    A metric regresses when it moved in its worse direction by more than
+    ``threshold`` (relative); ``thresholds`` overrides it per benchmark.
+    """
+
+    thresholds = thresholds or {}
+    comparisons = []
+    for name, entry in current.get("benchmarks", {}).items():
+        base_entry = baseline.get("benchmarks", {}).get(name, {})
+        limit = thresholds.get(name, threshold)
+        for key, value in entry.get("metrics", {}).items():
+            base = base_entry.get("metrics", {}).get(key)
+            if base is None:
+                continue
+            comparisons.append(
+                Comparison(
+                    name,
+                    key,
+                    base["value"],
+                    value["value"],
+                    value["unit"],
+                    value["better"],
+                    limit,
+                    value.get("tolerance", 0.0),
+                )
+            )
+    return comparisons
@@ -0,0 +1,170 @@
+"""Synthetic inputs for the benchmarks: no camera, GPU, model or network.
+
+Quest datagrams come from :class:`SimulatedHeadset` animating
+``example.json`` (the same generator as the UDP load test). Camera
+snapshots are built from the Quest joints themselves, mirrored into a
+right-handed camera frame, so the workspace's camera-to-Quest alignment
+calibrates exactly as it would on real data. MediaPipe and SynthPose model
+outputs are plain objects with the attributes the conversion code reads.
+"""
+
+from __future__ import annotations
+
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from pose_stream_server.common.backends import PoseBackend
+from pose_stream_server.common.frame_source import FrameSource
+from pose_stream_server.common.fusion_workspace import LANDMARK_WIDTH, PoseSnapshot
+from pose_stream_server.common.retarget import SHARED_JOINTS
+from pose_stream_server.udp_pose_receiver.load_generator import DEFAULT_TEMPLATE, SimulatedHeadset, load_template
+from pose_stream_server.udp_pose_receiver.quest_packet import POSITION, QuestPacket, QuestPacketDecoder, get_joint_layout
+
+# mp.solutions.pose.PoseLandmark, lower-cased, in landmark order.
+MEDIAPIPE_LANDMARKS = (
+    "nose", "left_eye_inner", "left_eye", "left_eye_outer", "right_eye_inner", "right_eye", "right_eye_outer",
+    "left_ear", "right_ear", "mouth_left", "mouth_right", "left_shoulder", "right_shoulder", "left_elbow",
+    "right_elbow", "left_wrist", "right_wrist", "left_pinky", "right_pinky", "left_index", "right_index",
+    "left_thumb", "right_thumb", "left_hip", "right_hip", "left_knee", "right_knee", "left_ankle", "right_ankle",
+    "left_heel", "right_heel", "left_foot_index", "right_foot_index",
+)
+# SynthPose-huge keypoint count (17 COCO + 35 anatomical markers).
+SYNTHPOSE_KEYPOINTS = 52
+FRAME_SHAPE = (480, 640, 3)
+# Quest-to-camera transform used for synthetic snapshots: a mirror (Unity is
+# left-handed), a camera 2 m in front of the wearer, and a little noise.
+CAMERA_OFFSET_M = np.array([0.0, -1.0, 2.0], dtype=np.float32)
+CAMERA_JITTER_M = 0.005
+ADDR = ("127.0.0.1", 50000)
+
+
+def template_packet(path: Path = DEFAULT_TEMPLATE) -> QuestPacket:
+    return load_template(path)
+
+
+def quest_datagrams(
+    count: int, headsets: int = 1, rate_hz: float = 72.0, seed: int = 0, path: Path = DEFAULT_TEMPLATE
+) -> List[bytes]:
+    """``count`` msgpack datagrams, round-robin over ``headsets`` simulated senders."""
+
+    template = template_packet(path)
+    senders = [
+        SimulatedHeadset(index, template, rate_hz, seed + index, open_socket=False) for index in range(headsets)
+    ]
+    return [senders[i % headsets].next_datagram() for i in range(count)]
+
+
+def quest_packets(datagrams: List[bytes]) -> List[QuestPacket]:
+    decoder = QuestPacketDecoder()
+    return [decoder.decode(data) for data in datagrams]
+
+
+class SyntheticCamera:
+    """Camera snapshots in MediaPipe's layout that track a Quest body."""
+
+    def __init__(self, seed: int = 0) -> None:
+        self.layout = get_joint_layout(MEDIAPIPE_LANDMARKS)
+        self.rng = np.random.default_rng(seed)
+        index = self.layout.index
+        self._rows = np.array([index[joint.mediapipe] for joint in SHARED_JOINTS], dtype=np.intp)
+        self._bones = np.array([joint.quest_bone_id for joint in SHARED_JOINTS], dtype=np.intp)
+        self._data = np.zeros((len(self.layout), LANDMARK_WIDTH), dtype=np.float32)
+        self._data[:, 3] = 0.9
+
+    def snapshot(self, packet: QuestPacket, timestamp: float) -> PoseSnapshot:
+        data = self._data.copy()
+        joints = packet.poses[self._bones, POSITION]
+        data[self._rows, :3] = joints * np.array([-1.0, 1.0, 1.0], dtype=np.float32) + CAMERA_OFFSET_M
+        data[:, :3] += self.rng.normal(scale=CAMERA_JITTER_M, size=(len(data), 3)).astype(np.float32)
+        return PoseSnapshot(timestamp, data, self.layout)
+
+
+def mediapipe_results(count: int, seed: int = 0) -> List[SimpleNamespace]:
+    """Objects shaped like ``mp.solutions.pose.Pose.process`` results."""
+
+    rng = np.random.default_rng(seed)
+    results = []
+    for _ in range(count):
+        rows = rng.uniform(-1.0, 1.0, size=(len(MEDIAPIPE_LANDMARKS), 4))
+        landmarks = [SimpleNamespace(x=x, y=y, z=z, visibility=abs(v)) for x, y, z, v in rows.tolist()]
+        results.append(
+            SimpleNamespace(
+                pose_landmarks=SimpleNamespace(landmark=landmarks),
+                pose_world_landmarks=SimpleNamespace(landmark=landmarks),
+            )
+        )
+    return results
+
+
+def synthpose_batches(count: int, seed: int = 0, num_kpts: int = SYNTHPOSE_KEYPOINTS) -> List[SimpleNamespace]:
+    """Objects shaped like mmpose ``PoseDataSample`` results for one person."""
+
+    rng = np.random.default_rng(seed)
+    height, width = FRAME_SHAPE[:2]
+    return [
+        SimpleNamespace(
+            pred_instances=SimpleNamespace(
+                keypoints=(rng.uniform(0.0, 1.0, size=(1, num_kpts, 2)) * (width, height)).astype(np.float32),
+                keypoint_scores=rng.uniform(0.0, 1.0, size=(1, num_kpts)).astype(np.float32),
+            )
+        )
+        for _ in range(count)
+    ]
+
+
+def fake_frames(count: int = 4, shape: Tuple[int, ...] = FRAME_SHAPE, seed: int = 0) -> List[np.ndarray]:
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, size=shape, dtype=np.uint8) for _ in range(count)]
+
+
+class SyntheticFrameSource(FrameSource):
+    """``length`` frames cycled from a few noise images.
+
+    Like a video file the capture loop paces it to ``fps``; 0 reads as fast
+    as the pipeline takes frames.
+    """
+
+    def __init__(self, length: int, fps: float = 0.0, frames: Optional[List[np.ndarray]] = None) -> None:
+        self.frames = frames if frames is not None else fake_frames()
+        self.length = length
+        self.fps = fps
+        self.position = 0
+
+    def read(self, image: Optional[np.ndarray] = None):
+        if self.position >= self.length:
+            return False, None
+        frame = self.frames[self.position % len(self.frames)]
+        self.position += 1
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame.copy()
+
+    def __len__(self) -> int:
+        return self.length
+
+
+class StubBackend(PoseBackend):
+    """Returns a fixed MediaPipe-layout snapshot after ``latency`` seconds."""
+
+    name = "stub"
+    title = "Stub pose"
+
+    def __init__(self, latency: float = 0.0, seed: int = 0) -> None:
+        super().__init__()
+        self.latency = latency
+        self.layout = get_joint_layout(MEDIAPIPE_LANDMARKS)
+        self._data = np.random.default_rng(seed).uniform(-1.0, 1.0, size=(len(self.layout), LANDMARK_WIDTH))
+        self._data = self._data.astype(np.float32)
+
+    def process(self, frame, timestamp: Optional[float] = None) -> Optional[PoseSnapshot]:
+        # Touch the frame like a model's preprocessing would.
+        if frame[::16, ::16].mean() < 0.0:
+            return None
+        if self.latency:
+            time.sleep(self.latency)
+        return PoseSnapshot(time.time() if timestamp is None else timestamp, self._data.copy(), self.layout)
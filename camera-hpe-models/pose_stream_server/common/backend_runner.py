@@ -0,0 +1,438 @@
+"""Capture loops that drive :class:`PoseBackend` plugins.
+
+``run_backend`` runs one backend in this process as threaded stages: a
+capture thread reads pooled frames into a latest-frame-wins queue, an
+inference thread runs the model (or the motion model when the frame can be
+skipped) and publishes snapshots, and an optional preview thread draws a
+sample of the results. Camera reads, inference and GUI calls never block
+each other or the asyncio loop that services Quest packets.
+
+``run_broadcast`` feeds every captured frame to several backends at once,
+each in its own worker process. The frame is copied into a shared-memory
+buffer owned by that worker and only a small header crosses the pipe;
+results come back as ``(K, 4)`` arrays and are published per source. A
+worker that is still busy with an earlier frame skips the new one, so the
+fast MediaPipe path keeps its frame rate next to a slow SynthPose path.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from pose_stream_server.common.backends import PoseBackend, create_backend
+from pose_stream_server.common.frame_pool import FramePool, release_frame
+from pose_stream_server.common.frame_source import DEFAULT_PREFETCH, is_live, open_frame_source
+from pose_stream_server.common.fusion_workspace import PoseSnapshot
+from pose_stream_server.common.latency import FrameTimes
+from pose_stream_server.common.pipeline import LatestQueue, StageStats, log_stage_stats, start_stage
+from pose_stream_server.common.pose_filter import AdaptiveInference, adaptive_inference_from_args
+from pose_stream_server.common.preview import PreviewWorker
+from pose_stream_server.udp_pose_receiver.quest_packet import get_joint_layout
+
+logger = logging.getLogger(__name__)
+
+STATS_INTERVAL_S = 5.0
+QUEUE_TIMEOUT_S = 0.1
+# Frames in flight per pool: one being filled, one queued, one or two being
+# consumed (inference and the preview).
+FRAME_POOL_CAPACITY = 4
+# Seconds to wait for a worker process to exit before terminating it.
+WORKER_JOIN_S = 5.0
+# First message of a worker once its model is loaded.
+_READY = "ready"
+
+Publish = Callable[[PoseSnapshot], None]
+
+
+def _capture_stage(cap, frames, stats: StageStats, stop: threading.Event, pool: FramePool) -> None:
+    live = is_live(cap)
+    # Recorded sources are paced to their native frame rate to mimic a camera.
+    frame_interval = 1.0 / cap.fps if not live and cap.fps > 0 else 0.0
+    next_frame_at = time.perf_counter()
+    while not stop.is_set():
+        success, frame = pool.read(cap)
+        if not success:
+            if not live:
+                logger.info("End of recorded source, stopping capture")
+                stop.set()
+                break
+            logger.warning("Empty frame, retrying...")
+            stats.drop()
+            time.sleep(0.1)
+            continue
+        stats.tick()
+        frames.put((time.time(), frame))
+
+        if frame_interval:
+            next_frame_at += frame_interval
+            time.sleep(max(0.0, next_frame_at - time.perf_counter()))
+
+
+def _inference_stage(
+    backend: PoseBackend,
+    frames: LatestQueue,
+    preview: Optional[PreviewWorker],
+    publish: Publish,
+    stats: StageStats,
+    stop: threading.Event,
+    schedule: Optional[AdaptiveInference] = None,
+) -> None:
+    while not stop.is_set():
+        item = frames.get(timeout=QUEUE_TIMEOUT_S)
+        if item is None:
+            continue
+        captured_at, frame = item
+        received = time.time()
+
+        if schedule is not None and not schedule.should_infer(captured_at):
+            frame.release()
+            snapshot = schedule.predict(captured_at)
+            snapshot.times = FrameTimes(captured_at, received, time.time())
+            publish(snapshot)
+            continue
+
+        snapshot, result = backend.infer(frame.array, captured_at)
+        decoded = time.time()
+        stats.tick()
+        if snapshot is not None:
+            if schedule is not None:
+                snapshot = schedule.measured(snapshot)
+            snapshot.times = FrameTimes(captured_at, received, decoded)
+            publish(snapshot)
+        elif schedule is not None:
+            schedule.lost()
+
+        if preview is None or not preview.offer(frame, result):
+            frame.release()
+
+
+async def run_backend(
+    backend: PoseBackend,
+    source: Union[int, str],
+    publish: Publish,
+    headless: bool = False,
+    preview_every: int = 1,
+    schedule: Optional[AdaptiveInference] = None,
+) -> None:
+    """Run ``backend`` on ``source`` until the source ends or the preview closes.
+
+    ``publish`` is called from the inference thread (FusionWorkspace and
+    SharedPoseWriter are both safe to publish to from there).
+    """
+
+    cap = open_frame_source(source, prefetch=DEFAULT_PREFETCH)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open frame source {source}.")
+
+    loop = asyncio.get_running_loop()
+    stop = threading.Event()
+
+    capture_stats = StageStats("capture")
+    inference_stats = StageStats(backend.name)
+    stages = [capture_stats, inference_stats]
+    frames: LatestQueue = LatestQueue(maxsize=1, stats=inference_stats, on_drop=lambda item: release_frame(item[1]))
+    pool = FramePool(f"{backend.name}-capture", capacity=FRAME_POOL_CAPACITY)
+
+    preview: Optional[PreviewWorker] = None
+    if not headless:
+        preview = PreviewWorker(backend.title, backend.render, every=preview_every).start()
+        stages.append(preview.stats)
+
+    threads = [
+        start_stage(f"{backend.name}-capture", _capture_stage, cap, frames, capture_stats, stop, pool),
+        start_stage(
+            f"{backend.name}-inference",
+            _inference_stage,
+            backend,
+            frames,
+            preview,
+            publish,
+            inference_stats,
+            stop,
+            schedule,
+        ),
+    ]
+
+    try:
+        next_report = loop.time() + STATS_INTERVAL_S
+        while not stop.is_set():
+            if not all(thread.is_alive() for thread in threads):
+                logger.error("A %s pipeline stage exited, stopping", backend.name)
+                break
+            if preview is not None and preview.closed.is_set():
+                logger.info("Preview closed, stopping %s loop", backend.name)
+                break
+            await asyncio.sleep(QUEUE_TIMEOUT_S)
+            if loop.time() >= next_report:
+                log_stage_stats(stages)
+                logger.debug("Frame pool — %s", pool.stats())
+                next_report += STATS_INTERVAL_S
+    finally:
+        stop.set()
+        frames.close()
+        for thread in threads:
+            await asyncio.to_thread(thread.join, 1.0)
+        if preview is not None:
+            await asyncio.to_thread(preview.stop)
+        cap.release()
+
+
+# Broadcast to worker processes
+def _attach_frames(name: str) -> shared_memory.SharedMemory:
+    # Spawned workers share the parent's resource tracker, so attaching
+    # does not make the segment theirs to unlink.
+    return shared_memory.SharedMemory(name=name)
+
+
+def _worker_main(name: str, args, frames, results, log_level: int) -> None:
+    """Worker process: load backend ``name`` and answer every frame with one message."""
+
+    logging.basicConfig(level=log_level, format="%(processName)s %(levelname)s %(name)s: %(message)s")
+    backend = create_backend(name, args)
+    backend.load()
+    schedule = adaptive_inference_from_args(args, name, backend.skip_tolerance, backend.smooth_beta)
+    results.send(_READY)
+
+    segment: Optional[shared_memory.SharedMemory] = None
+    layout = None
+    try:
+        while True:
+            try:
+                message = frames.recv()
+            except EOFError:
+                break
+            if message is None:
+                break
+            timestamp, segment_name, shape = message
+            received = time.time()
+            if segment is None or segment.name != segment_name:
+                if segment is not None:
+                    segment.close()
+                segment = _attach_frames(segment_name)
+            frame = np.ndarray(shape, dtype=np.uint8, buffer=segment.buf)
+
+            if schedule is not None and not schedule.should_infer(timestamp):
+                snapshot = schedule.predict(timestamp)
+            else:
+                snapshot = backend.process(frame, timestamp)
+                if schedule is not None:
+                    if snapshot is not None:
+                        schedule.measured(snapshot)
+                    else:
+                        schedule.lost()
+            decoded = time.time()
+            del frame
+
+            if snapshot is None:
+                results.send(None)
+                continue
+            # Keypoint names only travel when the layout changes.
+            names = snapshot.layout.names if snapshot.layout is not layout else None
+            layout = snapshot.layout
+            results.send(
+                (
+                    snapshot.timestamp,
+                    snapshot.data,
+                    names,
+                    snapshot.kind,
+                    received,
+                    decoded,
+                    snapshot.unit,
+                    snapshot.image_size,
+                )
+            )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if segment is not None:
+            segment.close()
+        backend.close()
+
+
+class BackendWorker:
+    """Parent-side handle of one backend worker process.
+
+    At most one frame is outstanding per worker: ``offer`` skips frames
+    while the worker is busy, which is what keeps a slow model from
+    queueing up latency.
+    """
+
+    def __init__(self, context, name: str, args, publish: Publish) -> None:
+        self.name = name
+        self.stats = StageStats(name)
+        self.ready = threading.Event()
+        self._publish = publish
+        self._idle = threading.Event()
+        self._segment: Optional[shared_memory.SharedMemory] = None
+        self._shape = None
+        self._buffer: Optional[np.ndarray] = None
+        frames_recv, self._frames = context.Pipe(duplex=False)
+        self._results, results_send = context.Pipe(duplex=False)
+        self.process = context.Process(
+            target=_worker_main,
+            args=(name, args, frames_recv, results_send, logging.getLogger().level),
+            name=f"pose-{name}",
+            daemon=True,
+        )
+        self.process.start()
+        # The child holds its own copies of these ends.
+        frames_recv.close()
+        results_send.close()
+        self._collector = start_stage(f"{name}-results", self._collect)
+
+    @property
+    def alive(self) -> bool:
+        return self.process.is_alive() and self._collector.is_alive()
+
+    def offer(self, timestamp: float, frame: np.ndarray) -> bool:
+        """Hand ``frame`` to the worker if it is idle; it is copied, not kept."""
+
+        if not self._idle.is_set():
+            self.stats.drop()
+            return False
+        if frame.shape != self._shape:
+            self._resize(frame.shape)
+        self._buffer[...] = frame
+        self._idle.clear()
+        try:
+            self._frames.send((timestamp, self._segment.name, self._shape))
+        except (BrokenPipeError, OSError):
+            return False
+        return True
+
+    def close(self) -> None:
+        try:
+            self._frames.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(WORKER_JOIN_S)
+        if self.process.is_alive():
+            logger.warning("Backend worker %s did not stop, terminating it", self.name)
+            self.process.terminate()
+            self.process.join()
+        self._collector.join(1.0)
+        self._frames.close()
+        self._results.close()
+        self._release_segment()
+
+    def _resize(self, shape) -> None:
+        self._release_segment()
+        self._shape = tuple(shape)
+        self._segment = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(self._shape))))
+        self._buffer = np.ndarray(self._shape, dtype=np.uint8, buffer=self._segment.buf)
+
+    def _release_segment(self) -> None:
+        if self._segment is None:
+            return
+        self._buffer = None
+        self._segment.close()
+        self._segment.unlink()
+        self._segment = None
+
+    def _collect(self) -> None:
+        layout = None
+        while True:
+            try:
+                message = self._results.recv()
+            except (EOFError, OSError):
+                break
+            if message == _READY:
+                logger.info("Backend %s ready in worker process %d", self.name, self.process.pid)
+                self.ready.set()
+                self._idle.set()
+                continue
+            self.stats.tick()
+            if message is not None:
+                timestamp, data, names, kind, received, decoded, unit, image_size = message
+                if names is not None:
+                    layout = get_joint_layout(names)
+                times = FrameTimes(timestamp, received, decoded)
+                snapshot = PoseSnapshot(
+                    timestamp, data, layout, kind=kind, times=times, unit=unit, image_size=image_size
+                )
+                try:
+                    self._publish(snapshot)
+                except Exception:
+                    logger.exception("Failed to publish %s snapshot", self.name)
+            self._idle.set()
+        # Unblock anyone still waiting on a worker that died during start-up.
+        self.ready.set()
+
+
+class _Broadcast:
+    """Capture-stage sink that offers each frame to every worker, then frees it."""
+
+    def __init__(self, workers: Sequence[BackendWorker]) -> None:
+        self.workers = workers
+
+    def put(self, item) -> None:
+        captured_at, frame = item
+        try:
+            for worker in self.workers:
+                worker.offer(captured_at, frame.array)
+        finally:
+            frame.release()
+
+
+async def run_broadcast(
+    names: Sequence[str],
+    args,
+    source: Union[int, str],
+    publishers: Dict[str, Publish],
+) -> None:
+    """Run backends ``names`` side by side on every frame of ``source``.
+
+    Each backend loads in its own spawned process (models load in
+    parallel) and its snapshots go to ``publishers[name]``. Runs until the
+    source ends or a worker dies.
+    """
+
+    context = multiprocessing.get_context("spawn")
+    workers: List[BackendWorker] = [BackendWorker(context, name, args, publishers[name]) for name in names]
+    cap = None
+    stop = threading.Event()
+    thread = None
+    try:
+        for worker in workers:
+            await asyncio.to_thread(worker.ready.wait)
+            if not worker.alive:
+                raise RuntimeError(f"Backend worker {worker.name} failed to start")
+
+        cap = open_frame_source(source, prefetch=DEFAULT_PREFETCH)
+        if not cap.isOpened():
+            raise RuntimeError(f"Could not open frame source {source}.")
+        capture_stats = StageStats("capture")
+        stages = [capture_stats] + [worker.stats for worker in workers]
+        pool = FramePool("broadcast-capture", capacity=FRAME_POOL_CAPACITY)
+        thread = start_stage("broadcast-capture", _capture_stage, cap, _Broadcast(workers), capture_stats, stop, pool)
+        logger.info("Broadcasting frames to %s", ", ".join(names))
+
+        loop = asyncio.get_running_loop()
+        next_report = loop.time() + STATS_INTERVAL_S
+        while not stop.is_set():
+            if not thread.is_alive():
+                break
+            dead = [worker.name for worker in workers if not worker.alive]
+            if dead:
+                logger.error("Backend worker %s exited, stopping", ", ".join(dead))
+                break
+            await asyncio.sleep(QUEUE_TIMEOUT_S)
+            if loop.time() >= next_report:
+                log_stage_stats(stages)
+                next_report += STATS_INTERVAL_S
+    finally:
+        stop.set()
+        if thread is not None:
+            await asyncio.to_thread(thread.join, 1.0)
+        for worker in workers:
+            await asyncio.to_thread(worker.close)
+        if cap is not None:
+            cap.release()
@@ -0,0 +1,125 @@
+"""Pose estimator plugins and the registry the servers pick them from.
+
+A backend wraps one pose model behind ``process(frame, timestamp) ->
+Optional[PoseSnapshot]``; everything around it (frame sources, the Quest
+listener, smoothing, previews, shared-memory publishing, offline batches)
+is shared by ``pose_stream_server/pose_server.py`` and
+common/offline_batch.py. Adding a model means subclassing
+:class:`PoseBackend` and registering it::
+
+    class MyBackend(PoseBackend):
+        name = "mymodel"
+
+        def load(self, timer=None):
+            self.model = ...
+
+        def process(self, frame, timestamp=None):
+            return PoseSnapshot(...)
+
+    register_backend("mymodel", "my_package.my_module:MyBackend")
+
+Backends are registered by import path and only imported when selected,
+so a process never pays for (or needs) the models it doesn't run.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple, Type, Union
+
+from pose_stream_server.common.fusion_workspace import PoseSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+class PoseBackend:
+    """One pose model. Instances live in the process that runs the model.
+
+    ``load`` does the heavy lifting (imports, weights, warm-up) and is
+    called once before the first frame, off the event loop. ``process``
+    takes a BGR ``uint8`` frame it must not modify or keep.
+
+    Backends with a preview override ``infer`` to also return whatever
+    ``render`` needs to draw the result.
+    """
+
+    name = "camera"
+    # Preview window title.
+    title = "Pose"
+    # Defaults for the smoothing/skip options (common/pose_filter.py), in the
+    # backend's own keypoint units.
+    skip_tolerance = 0.0
+    smooth_beta = 0.05
+    unit = "keypoint units"
+
+    def __init__(self, args: Optional[argparse.Namespace] = None) -> None:
+        self.args = args if args is not None else default_arguments(type(self))
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        """Add this backend's own command-line options to ``parser``."""
+
+    def load(self, timer=None) -> None:
+        """Import and initialize the model (``timer``: optional StartupTimer)."""
+
+    def process(self, frame, timestamp: Optional[float] = None) -> Optional[PoseSnapshot]:
+        raise NotImplementedError
+
+    def infer(self, frame, timestamp: float) -> Tuple[Optional[PoseSnapshot], Any]:
+        """``process`` plus the raw result handed to ``render`` for the preview."""
+
+        return self.process(frame, timestamp), None
+
+    def render(self, frame, result):
+        """Draw ``result`` on ``frame`` (owned by the preview) and return the image to show."""
+
+        return frame
+
+    def close(self) -> None:
+        pass
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.name})"
+
+
+BACKENDS: Dict[str, Union[str, Type[PoseBackend]]] = {
+    "mediapipe": "pose_stream_server.mediapipe.mediapipe_stream_server:MediaPipeBackend",
+    "synthpose": "pose_stream_server.synthpose.synthpose_mmpose_server:SynthPoseBackend",
+}
+
+
+def register_backend(name: str, target: Union[str, Type[PoseBackend]]) -> None:
+    """Make ``target`` (a class or ``"module:Class"``) selectable as ``name``."""
+
+    BACKENDS[name] = target
+
+
+def backend_names() -> List[str]:
+    return sorted(BACKENDS)
+
+
+def backend_class(name: str) -> Type[PoseBackend]:
+    try:
+        target = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown pose backend {name!r}; expected one of {backend_names()}") from None
+    if isinstance(target, str):
+        module_name, _, class_name = target.partition(":")
+        target = BACKENDS[name] = getattr(importlib.import_module(module_name), class_name)
+    return target
+
+
+def default_arguments(cls: Type[PoseBackend]) -> argparse.Namespace:
+    """The backend's options at their defaults, for callers without a command line."""
+
+    parser = argparse.ArgumentParser(add_help=False)
+    cls.add_arguments(parser)
+    return parser.parse_args([])
+
+
+def create_backend(name: str, args: Optional[argparse.Namespace] = None) -> PoseBackend:
+    """Instantiate backend ``name``; ``load()`` still has to be called."""
+
+    return backend_class(name)(args)
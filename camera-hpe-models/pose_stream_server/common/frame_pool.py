@@ -0,0 +1,172 @@
+"""Preallocated, reference-counted frame buffers for the capture loops.
+
+A :class:`FramePool` keeps up to ``capacity`` images of one shape. Stages
+``acquire`` a :class:`FrameBuffer`, let OpenCV write into ``buffer.array``
+(``cap.read(image=...)``, ``cv2.cvtColor(..., dst=...)``) and pass the
+buffer itself downstream. Whoever holds it last calls ``release`` and the
+array goes back on the free list, so a steady-state pipeline allocates no
+image memory at all.
+
+A buffer that is never released is simply garbage collected; the pool then
+allocates a replacement, which shows up as a miss. Shape changes (a camera
+switching resolution) drop the free list and start over at the new shape.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from pose_stream_server.common.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CAPACITY = 4
+
+
+class FrameBuffer:
+    """One pooled image. ``retain``/``release`` count the stages holding it."""
+
+    __slots__ = ("array", "_pool", "_refs")
+
+    def __init__(self, array: np.ndarray, pool: Optional["FramePool"]) -> None:
+        self.array = array
+        self._pool = pool
+        self._refs = 1
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.array.shape
+
+    def retain(self) -> "FrameBuffer":
+        pool = self._pool
+        if pool is None:
+            self._refs += 1
+            return self
+        with pool._lock:
+            self._refs += 1
+        return self
+
+    def release(self) -> None:
+        pool = self._pool
+        if pool is None:
+            self._refs -= 1
+            return
+        pool._release(self)
+
+    def __repr__(self) -> str:
+        return f"FrameBuffer(shape={self.array.shape}, refs={self._refs})"
+
+
+class FramePool:
+    """Free list of same-shaped image buffers with hit/miss accounting."""
+
+    def __init__(self, name: str, capacity: int = DEFAULT_CAPACITY, dtype=np.uint8) -> None:
+        self.name = name
+        self.capacity = max(1, capacity)
+        self.dtype = np.dtype(dtype)
+        self.shape: Optional[Tuple[int, ...]] = None
+        self.hits = 0
+        self.misses = 0
+        self._free: List[FrameBuffer] = []
+        self._lock = threading.Lock()
+        self._hit_metric = REGISTRY.counter(
+            "pose_frame_pool_hits_total", "Frames served from a buffer pool", pool=name
+        )
+        self._miss_metric = REGISTRY.counter(
+            "pose_frame_pool_misses_total", "Frames that needed a fresh allocation", pool=name
+        )
+
+    def acquire(self, shape: Tuple[int, ...]) -> FrameBuffer:
+        shape = tuple(shape)
+        with self._lock:
+            if shape != self.shape:
+                if self.shape is not None:
+                    logger.info("Frame pool %s switching from %s to %s", self.name, self.shape, shape)
+                self.shape = shape
+                self._free.clear()
+            if self._free:
+                buffer = self._free.pop()
+                buffer._refs = 1
+                self.hits += 1
+                hit = True
+            else:
+                buffer = None
+                self.misses += 1
+                hit = False
+        if hit:
+            self._hit_metric.inc()
+            # A previous holder may have frozen it (e.g. for MediaPipe).
+            buffer.array.flags.writeable = True
+            return buffer
+        self._miss_metric.inc()
+        return FrameBuffer(np.empty(shape, dtype=self.dtype), self)
+
+    def adopt(self, array: np.ndarray) -> FrameBuffer:
+        """Wrap an array allocated elsewhere; it joins the pool once released."""
+
+        with self._lock:
+            self.misses += 1
+        self._miss_metric.inc()
+        return FrameBuffer(array, self)
+
+    def read(self, cap) -> Tuple[bool, Optional[FrameBuffer]]:
+        """``cap.read`` into a pooled buffer.
+
+        The first read (shape unknown) and any read whose frame didn't fit
+        the offered buffer fall back to the array OpenCV allocated. Sources
+        that pool their own frames (``read_buffer``) hand theirs out as is.
+        """
+
+        read_buffer = getattr(cap, "read_buffer", None)
+        if read_buffer is not None:
+            return read_buffer()
+
+        shape = self.shape
+        buffer = self.acquire(shape) if shape is not None else None
+        ok, image = cap.read(buffer.array if buffer is not None else None)
+        if not ok or image is None:
+            if buffer is not None:
+                buffer.release()
+            return False, None
+        if buffer is not None and image is buffer.array:
+            return True, buffer
+        if buffer is not None:
+            buffer.release()
+        if image.dtype == self.dtype:
+            # New or changed frame size: adopt OpenCV's array at that shape.
+            with self._lock:
+                if image.shape != self.shape:
+                    self.shape = image.shape
+                    self._free.clear()
+            return True, self.adopt(image)
+        return True, FrameBuffer(image, None)
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        ratio = self.hits / total if total else 0.0
+        return f"{self.name}: {self.hits} hits, {self.misses} misses ({ratio:.1%} hit rate)"
+
+    def _release(self, buffer: FrameBuffer) -> None:
+        with self._lock:
+            buffer._refs -= 1
+            if buffer._refs > 0:
+                return
+            if buffer._refs < 0:
+                raise RuntimeError(f"{buffer!r} released more often than acquired")
+            if buffer.array.shape == self.shape and len(self._free) < self.capacity:
+                self._free.append(buffer)
+
+
+def release_frame(frame) -> None:
+    """Release ``frame`` if it is a pooled buffer (plain arrays are ignored)."""
+
+    if isinstance(frame, FrameBuffer):
+        frame.release()
+
+
+def frame_array(frame) -> np.ndarray:
+    return frame.array if isinstance(frame, FrameBuffer) else frame
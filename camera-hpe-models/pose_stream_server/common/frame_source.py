@@ -0,0 +1,257 @@
+"""Pluggable frame sources for the capture loops.
+
+Every source mirrors the subset of ``cv2.VideoCapture`` the servers use
+(``read``, ``isOpened``, ``release``), so a live camera, a video file or a
+directory of images can be passed wherever a capture object was expected.
+``live`` tells loops whether a failed read means "retry" (camera) or
+"end of stream" (files).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+from typing import List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from pose_stream_server.common.frame_pool import FrameBuffer, FramePool
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff")
+DEFAULT_PREFETCH = 8
+
+
+class FrameSource:
+    live = False
+    fps = 0.0
+
+    def read(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        raise NotImplementedError
+
+    def isOpened(self) -> bool:
+        return True
+
+    def release(self) -> None:
+        pass
+
+    def __len__(self) -> int:
+        return 0
+
+
+class CameraSource(FrameSource):
+    live = True
+
+    def __init__(self, camera_index: int) -> None:
+        self._cap = cv2.VideoCapture(camera_index)
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS) or 0.0
+
+    def read(self, image: Optional[np.ndarray] = None):
+        return self._cap.read(image)
+
+    def isOpened(self) -> bool:
+        return self._cap.isOpened()
+
+    def release(self) -> None:
+        self._cap.release()
+
+
+class VideoFileSource(FrameSource):
+    """Frames ``[start, end)`` of a video file."""
+
+    def __init__(self, path: str, start: int = 0, end: Optional[int] = None) -> None:
+        self.path = path
+        self._cap = cv2.VideoCapture(path)
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS) or 0.0
+        total = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        if end is None:
+            end = total or None
+        elif total:
+            end = min(end, total)
+        self.start = start
+        self.end = end
+        if start:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        self._next = start
+
+    def read(self, image: Optional[np.ndarray] = None):
+        if self.end is not None and self._next >= self.end:
+            return False, None
+        ok, frame = self._cap.read(image)
+        if ok:
+            self._next += 1
+        return ok, frame
+
+    def isOpened(self) -> bool:
+        return self._cap.isOpened()
+
+    def release(self) -> None:
+        self._cap.release()
+
+    def __len__(self) -> int:
+        return max(0, (self.end or 0) - self.start)
+
+
+class ImageDirectorySource(FrameSource):
+    """Images of a directory in sorted filename order, optionally sliced."""
+
+    def __init__(self, path: str, start: int = 0, end: Optional[int] = None, fps: float = 30.0) -> None:
+        self.path = path
+        self.files: List[str] = list_images(path)[start:end]
+        self.fps = fps
+        self._next = 0
+
+    def read(self, image: Optional[np.ndarray] = None):
+        while self._next < len(self.files):
+            filename = self.files[self._next]
+            self._next += 1
+            frame = cv2.imread(filename)
+            if frame is not None:
+                return True, frame
+            logger.warning("Skipping unreadable image %s", filename)
+        return False, None
+
+    def isOpened(self) -> bool:
+        return bool(self.files)
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+
+class PrefetchingSource(FrameSource):
+    """Decode frames from ``inner`` on a background thread.
+
+    Offline sources must not lose frames, so the queue blocks the decoder
+    when full instead of dropping. Frames are decoded into a private
+    :class:`FramePool`; ``read_buffer`` hands them out for the consumer to
+    release, while plain ``read`` gives the array away for good.
+    """
+
+    _END = object()
+
+    def __init__(self, inner: FrameSource, depth: int = DEFAULT_PREFETCH) -> None:
+        self.inner = inner
+        self.live = inner.live
+        self.fps = inner.fps
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, depth))
+        # Queued frames plus a few held by the consumer's pipeline stages.
+        self._pool = FramePool("prefetch", capacity=max(1, depth) + 4)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="frame-prefetch", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.is_set():
+                ok, frame = self._pool.read(self.inner)
+                if not ok:
+                    break
+                self._put(frame)
+        except Exception:
+            logger.exception("Frame prefetch failed")
+        finally:
+            self._put(self._END)
+
+    def _put(self, item) -> None:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def read(self, image: Optional[np.ndarray] = None):
+        ok, buffer = self.read_buffer()
+        return ok, buffer.array if ok else None
+
+    def read_buffer(self) -> Tuple[bool, Optional[FrameBuffer]]:
+        item = self._queue.get()
+        if item is self._END:
+            # Leave the marker for any later reads.
+            self._queue.put(item)
+            return False, None
+        return True, item
+
+    def isOpened(self) -> bool:
+        return self.inner.isOpened()
+
+    def release(self) -> None:
+        self._stop.set()
+        self._thread.join(1.0)
+        self.inner.release()
+
+    def __len__(self) -> int:
+        return len(self.inner)
+
+
+def list_images(path: str) -> List[str]:
+    return sorted(
+        os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def count_frames(path: str) -> int:
+    """Number of frames in a video file or image directory."""
+
+    if os.path.isdir(path):
+        return len(list_images(path))
+    cap = cv2.VideoCapture(path)
+    try:
+        return int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    finally:
+        cap.release()
+
+
+def open_frame_source(
+    spec: Union[int, str, FrameSource],
+    start: int = 0,
+    end: Optional[int] = None,
+    prefetch: int = 0,
+) -> FrameSource:
+    """Open a camera index, video file or image directory.
+
+    ``spec`` may be an int or a digit string for a camera. ``prefetch > 0``
+    wraps file sources in a :class:`PrefetchingSource` of that depth. An
+    already open :class:`FrameSource` (e.g. synthetic benchmark frames) is
+    returned as is.
+    """
+
+    if isinstance(spec, FrameSource):
+        return spec
+
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+        return CameraSource(int(spec))
+
+    if os.path.isdir(spec):
+        source: FrameSource = ImageDirectorySource(spec, start, end)
+    elif os.path.isfile(spec):
+        source = VideoFileSource(spec, start, end)
+    else:
+        raise FileNotFoundError(f"No camera, video file or image directory at {spec!r}")
+
+    if prefetch > 0:
+        source = PrefetchingSource(source, prefetch)
+    return source
+
+
+def add_source_argument(parser) -> None:
+    parser.add_argument(
+        "--source",
+        default=None,
+        help="Camera index, video file or image directory (default: --camera-index)",
+    )
+
+
+def source_spec(args) -> Union[int, str]:
+    return args.source if args.source is not None else args.camera_index
+
+
+def is_live(source) -> bool:
+    """Plain ``cv2.VideoCapture`` objects are treated as live cameras."""
+
+    return getattr(source, "live", True)
+
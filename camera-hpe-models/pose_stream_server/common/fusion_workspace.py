@@ -1,15 +1,158 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-from dataclasses import dataclass
-from typing import Mapping, Optional
+import threading
+import time
+from types import MappingProxyType
+from typing import Callable, Dict, Iterator, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from pose_stream_server.common.latency import FrameTimes, StageLatency
+from pose_stream_server.common.metrics import REGISTRY, Counter, Histogram
+from pose_stream_server.common.pose_history import FieldSpec, PoseRingBuffer
+from pose_stream_server.common.retarget import QuestAlignment, merge_camera_joints, quest_hip_midpoint
+from pose_stream_server.common.subscriptions import (
+    DEFAULT_BOUNDED_SIZE,
+    LATEST,
+    QUEST_SOURCE,
+    FramePublisher,
+    FusedFrame,
+    Subscription,
+)
+from pose_stream_server.udp_pose_receiver.quest_packet import (
+    POSE_WIDTH,
+    ROTATION,
+    JointLayout,
+    QuestPacket,
+    as_quest_packet,
+    get_joint_layout,
+)
+from pose_stream_server.udp_pose_receiver.sessions import DEFAULT_IDLE_TIMEOUT_S, QuestSession, QuestSessionTable
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Samples kept per source; ~4 s of Quest data at 60 Hz.
+HISTORY_CAPACITY = 256
+# Source name used when a single camera server publishes in-process.
+DEFAULT_SOURCE = "camera"
+LANDMARK_FIELDS = ("x", "y", "z", "visibility")
+LANDMARK_WIDTH = len(LANDMARK_FIELDS)
+# Camera snapshots between the throttled keypoint dumps at INFO level.
+LOG_EVERY_N_SNAPSHOTS = 60
+# PoseSnapshot.kind: straight from a pose model, or extrapolated between
+# inferences by common/pose_filter.py.
+MEASURED = "measured"
+PREDICTED = "predicted"
+# PoseSnapshot.unit: image coordinates of a camera frame, or 3D positions
+# (MediaPipe world landmarks, triangulated or Quest-space points).
+PIXELS = "pixels"
+METRES = "metres"
+
+SKEW_SECONDS = REGISTRY.histogram(
+    "pose_quest_camera_skew_seconds", "Distance between a camera capture and the newest Quest capture"
+)
+
+
+class LandmarkView(Mapping[str, Mapping[str, float]]):
+    """Read-only ``{name: {"x", "y", "z", "visibility"}}`` view over a snapshot.
+
+    Per-keypoint dicts are only built when a keypoint is actually accessed.
+    """
+
+    __slots__ = ("_data", "_layout")
+
+    def __init__(self, data: np.ndarray, layout: JointLayout) -> None:
+        self._data = data
+        self._layout = layout
+
+    def __getitem__(self, name: str) -> Mapping[str, float]:
+        row = self._data[self._layout.index[name]]
+        return dict(zip(LANDMARK_FIELDS, row.tolist()))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._layout.names)
+
+    def __len__(self) -> int:
+        return len(self._layout.names)
+
+    def __repr__(self) -> str:
+        return f"LandmarkView({len(self)} keypoints)"
+
+
 class PoseSnapshot:
-    timestamp: float
-    landmarks: Mapping[str, Mapping[str, float]]
+    """Camera keypoints as a ``(K, 4)`` float32 array of (x, y, z, visibility).
+
+    Keypoint names live in a shared, cached :class:`JointLayout`, so a
+    snapshot costs one array regardless of K. ``landmarks`` keeps the old
+    dict-of-dicts interface as a lazy read-only view, and passing
+    ``landmarks=`` to the constructor still works for existing callers.
+    ``kind`` is ``MEASURED`` or ``PREDICTED``. ``times`` holds the frame's
+    capture/receive/decode/publish times (common/latency.py) once known;
+    ``timestamp`` is the capture time. ``unit`` is ``PIXELS`` or ``METRES``
+    and, for pixels, ``image_size`` the ``(width, height)`` of the frame the
+    keypoints were found in; either stays None when the producer did not say.
+    """
+
+    __slots__ = ("timestamp", "data", "layout", "kind", "times", "unit", "image_size")
+
+    def __init__(
+        self,
+        timestamp: float,
+        data: Optional[np.ndarray] = None,
+        layout: Optional[JointLayout] = None,
+        landmarks: Optional[Mapping[str, Mapping[str, float]]] = None,
+        kind: str = MEASURED,
+        times: Optional[FrameTimes] = None,
+        unit: Optional[str] = None,
+        image_size: Optional[Tuple[int, int]] = None,
+    ) -> None:
+        if landmarks is not None:
+            layout = get_joint_layout(list(landmarks.keys()))
+            data = np.array(
+                [[lm.get(key, 0.0) for key in LANDMARK_FIELDS] for lm in landmarks.values()],
+                dtype=np.float32,
+            ).reshape(len(layout), LANDMARK_WIDTH)
+        elif data is None or layout is None:
+            raise TypeError("PoseSnapshot needs either data and layout, or landmarks")
+
+        self.timestamp = timestamp
+        self.data = data
+        self.layout = layout
+        self.kind = kind
+        self.times = times
+        self.unit = unit
+        self.image_size = image_size
+
+    @classmethod
+    def from_array(cls, timestamp: float, data: np.ndarray, names: Sequence[str]) -> "PoseSnapshot":
+        return cls(timestamp, np.asarray(data, dtype=np.float32), get_joint_layout(names))
+
+    @property
+    def landmarks(self) -> LandmarkView:
+        return LandmarkView(self.data, self.layout)
+
+    @property
+    def names(self):
+        return self.layout.names
+
+    @property
+    def predicted(self) -> bool:
+        return self.kind == PREDICTED
+
+    def __repr__(self) -> str:
+        return f"PoseSnapshot(timestamp={self.timestamp:.3f}, keypoints={len(self.layout)}, kind={self.kind})"
+
+
+class UpperBodyTrack:
+    """Per-headset pose history, kept in ``QuestSession.state``."""
+
+    __slots__ = ("history", "layout")
+
+    def __init__(self, history: PoseRingBuffer, layout: JointLayout) -> None:
+        self.history = history
+        self.layout = layout
 
 
 class FusionWorkspace:
@@ -18,39 +161,132 @@ class FusionWorkspace:
     This module holds the shared state for upper-body data (e.g. from
     Unity/Meta Quest) and lower-body keypoints (MediaPipe, SynthPose,
     etc.).
+
+    Besides the latest sample, each source keeps a fixed-capacity ring
+    buffer indexed by capture time on the host clock so a fusion step can
+    read both bodies interpolated to the same instant (see ``upper_body_at``
+    and ``lower_body_at``). Quest packets carry Unity's clock; each session
+    maps it onto the host clock from arrival times (udp_pose_receiver/
+    clock_sync.py). Lower-body data is kept per source so several
+    estimators can feed one workspace.
+
+    Packets and snapshots leave with their capture/receive/decode/publish
+    times filled in (``.times``) and per-stage latencies are recorded in
+    ``pose_stage_latency_seconds``.
+
+    Quest packets are routed to per-sender sessions (``quest_sessions``), so
+    several headsets on one port never overwrite each other. The
+    ``upper_body`` accessors read the primary session, the longest-running
+    live one, unless a session key (``"host:port"``) is given.
+
+    Every measured camera snapshot is also paired with the Quest body at the
+    same instant to keep a per-source camera-to-Quest alignment up to date
+    (common/retarget.py); ``lower_body_in_quest_at`` uses it to hand out
+    camera keypoints in Quest tracking space.
+
+    Producers may call ``handle_quest_packet`` and ``update_lower_body``
+    from any thread (the event loop, capture threads); updates are
+    serialized by one lock, which the time-aligned readers take as well.
+    Each update ends by publishing an immutable ``FusedFrame``: it becomes
+    ``latest_frame`` and is pushed to every ``subscribe``/``stream``
+    consumer (common/subscriptions.py), so consumers need neither polling
+    nor the lock.
     """
 
-    def __init__(self) -> None:
-        self.latest_upper_body: Optional[Mapping[str, object]] = None
+    def __init__(
+        self,
+        history_capacity: int = HISTORY_CAPACITY,
+        recorder=None,
+        session_timeout: float = DEFAULT_IDLE_TIMEOUT_S,
+    ) -> None:
+        # Optional SessionRecorder (common/session_log.py) that receives every
+        # published pose snapshot.
+        self.recorder = recorder
         self.latest_lower_body: Optional[PoseSnapshot] = None
 
+        self.history_capacity = history_capacity
+        self.quest_sessions = QuestSessionTable(idle_timeout=session_timeout)
+        self.latest_lower_source: Optional[str] = None
+        self.lower_bodies: Dict[str, PoseSnapshot] = {}
+        self.lower_body_histories: Dict[str, PoseRingBuffer] = {}
+        self._lower_layouts: Dict[str, JointLayout] = {}
+        self._publish_metrics: Dict[str, tuple] = {}
+        self.alignments: Dict[str, QuestAlignment] = {}
+        self.latest_frame: Optional[FusedFrame] = None
+
+        self._lock = threading.RLock()
+        self._publisher = FramePublisher()
+        self._sequence = 0
+        self._lower_snapshot_count = 0
+        self._quest_latency = StageLatency(QUEST_SOURCE)
+
     # Unity / OSC callbacks
-    def handle_quest_packet(self, packet: Mapping[str, object], addr) -> None:
-        self.latest_upper_body = packet
-        timestamp = packet.get("timestamp")
-        joint_count = len(packet.get("joints", []) or [])
-        logger.info(
-            "Unity OSC packet from %s @ %.3f with %d joints", addr, timestamp, joint_count
-        )
-        self._log_workspace_state()
+    def handle_quest_packet(
+        self,
+        packet: Union[QuestPacket, Mapping[str, object]],
+        addr,
+        received_at: Optional[float] = None,
+    ) -> None:
+        # Dict payloads (decode="dict") are converted so the workspace always
+        # holds the array-backed form; .to_payload() rebuilds the dict.
+        packet = as_quest_packet(packet)
+        if received_at is None:
+            # Arrival as stamped by the receiver, before any queueing.
+            received_at = packet.times.received if packet.times is not None else None
+        received_at = time.time() if received_at is None else received_at
+        with self._lock:
+            session = self.quest_sessions.update(packet, addr, received_at)
+            if session is None:
+                logger.debug("Dropped stale Quest packet from %s @ %.3f", addr, packet.timestamp)
+                return
+            times = packet.times
+            self._record_upper_body(session, packet, times.captured)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Unity OSC packet from %s @ %.3f with %d joints", addr, packet.timestamp, len(packet.layout)
+                )
+                self._log_workspace_state()
+            times.published = time.time()
+            frame = self._build_frame(times.captured, QUEST_SOURCE, session.key)
+            # Under the lock so subscribers get frames in sequence order;
+            # offer() never blocks.
+            self._publisher.publish(frame)
+        self._quest_latency.observe(times)
 
     # Pose estimation model callbacks
-    def update_lower_body(self, snapshot: PoseSnapshot) -> None:
-        self.latest_lower_body = snapshot
+    def update_lower_body(self, snapshot: PoseSnapshot, source: str = DEFAULT_SOURCE) -> None:
+        began = time.perf_counter()
+        times = snapshot.times
+        if times is None:
+            times = snapshot.times = FrameTimes(captured=snapshot.timestamp)
+        with self._lock:
+            self.latest_lower_body = snapshot
+            self.latest_lower_source = source
+            self.lower_bodies[source] = snapshot
+            self._record_lower_body(snapshot, source)
+            if self.recorder is not None:
+                self.recorder.record_snapshot(snapshot, source)
+            if self.upper_body_history is not None:
+                SKEW_SECONDS.observe(abs(snapshot.timestamp - self.upper_body_history.newest_timestamp))
+                if snapshot.kind == MEASURED:
+                    self._align(snapshot, source)
+            if logger.isEnabledFor(logging.DEBUG):
+                self._log_workspace_state()
+            times.published = time.time()
+            frame = self._build_frame(snapshot.timestamp, source)
+            self._lower_snapshot_count += 1
+            log_keypoints = self._lower_snapshot_count % LOG_EVERY_N_SNAPSHOTS == 0
+            self._publisher.publish(frame)
 
         # Keep a light throttled logger so we can monitor incoming data without
         # flooding the console when multiple sources are active.
-        if hasattr(self, "_mp_frame_idx"):
-            self._mp_frame_idx += 1
-        else:
-            self._mp_frame_idx = 1
-
-        if self._mp_frame_idx % 60 == 0:
+        if log_keypoints:
             if snapshot.landmarks:
                 logger.info(
-                    "Pose snapshot from camera @ %.3f with %d keypoints (logging every 60 frames):",
+                    "Pose snapshot from camera @ %.3f with %d keypoints (logging every %d frames):",
                     snapshot.timestamp,
                     len(snapshot.landmarks),
+                    LOG_EVERY_N_SNAPSHOTS,
                 )
                 for idx, (name, lm) in enumerate(snapshot.landmarks.items(), start=1):
                     x = lm.get("x", 0.0)
@@ -72,7 +308,230 @@ class FusionWorkspace:
                     snapshot.timestamp,
                 )
 
-        self._log_workspace_state()
+        snapshots, predicted, publish_seconds, latency = self._source_metrics(source)
+        snapshots.inc()
+        if snapshot.kind == PREDICTED:
+            predicted.inc()
+        publish_seconds.observe(time.perf_counter() - began)
+        latency.observe(times)
+
+    # Subscriptions
+    def subscribe(
+        self,
+        callback: Optional[Callable[[FusedFrame], None]] = None,
+        policy: str = LATEST,
+        maxsize: int = DEFAULT_BOUNDED_SIZE,
+        name: Optional[str] = None,
+    ) -> Subscription:
+        """Receive every published ``FusedFrame``.
+
+        With ``callback`` frames are delivered on the subscription's own
+        thread; otherwise read them with ``Subscription.get``. ``policy``
+        is ``"latest"`` (keep only the newest frame) or ``"bounded"`` (queue
+        up to ``maxsize``, dropping the oldest). ``close()`` detaches.
+        """
+
+        return self._publisher.subscribe(callback, policy=policy, maxsize=maxsize, name=name)
+
+    def stream(
+        self, policy: str = LATEST, maxsize: int = DEFAULT_BOUNDED_SIZE, name: Optional[str] = None
+    ) -> Subscription:
+        """``async for frame in workspace.stream(): ...`` on the running loop."""
+
+        loop = asyncio.get_running_loop()
+        return self._publisher.subscribe(policy=policy, maxsize=maxsize, name=name, loop=loop)
+
+    def close_subscriptions(self) -> None:
+        """End every stream and stop every callback thread."""
+
+        self._publisher.close()
+
+    # Quest sessions
+    def quest_session(self, key: Optional[str] = None) -> Optional[QuestSession]:
+        """Session ``key`` (``"host:port"``), or the primary session."""
+
+        return self.quest_sessions.primary if key is None else self.quest_sessions.get(key)
+
+    @property
+    def latest_upper_body(self) -> Optional[QuestPacket]:
+        session = self.quest_sessions.primary
+        return session.latest if session is not None else None
+
+    @property
+    def upper_body_history(self) -> Optional[PoseRingBuffer]:
+        track = self._upper_track()
+        return track.history if track is not None else None
+
+    def _upper_track(self, session: Optional[str] = None) -> Optional[UpperBodyTrack]:
+        quest_session = self.quest_session(session)
+        return quest_session.state if quest_session is not None else None
+
+    # Time-aligned access
+    def upper_body_at(self, timestamp: float, session: Optional[str] = None) -> Optional[QuestPacket]:
+        """Quest body of ``session`` (default: the primary one) interpolated
+        to host capture time ``timestamp``."""
+
+        with self._lock:
+            track = self._upper_track(session)
+            if track is None:
+                return None
+            sample = track.history.sample(timestamp)
+        if sample is None:
+            return None
+        return QuestPacket(
+            timestamp=float(sample["quest_timestamp"]),
+            hmd=sample["hmd"],
+            poses=sample["poses"],
+            confidences=sample["confidences"],
+            layout=track.layout,
+        )
+
+    def lower_body_at(self, timestamp: float, source: Optional[str] = None) -> Optional[PoseSnapshot]:
+        """Camera keypoints from ``source`` (default: the most recently
+        updated one) interpolated to host time ``timestamp``."""
+
+        with self._lock:
+            source = self.latest_lower_source if source is None else source
+            history = self.lower_body_histories.get(source)
+            if history is None:
+                return None
+            sample = history.sample(timestamp)
+            layout = self._lower_layouts[source]
+            latest = self.lower_bodies[source]
+        if sample is None:
+            return None
+        return PoseSnapshot(timestamp, sample["landmarks"], layout, unit=latest.unit, image_size=latest.image_size)
+
+    def lower_body_in_quest_at(self, timestamp: float, source: Optional[str] = None) -> Optional[PoseSnapshot]:
+        """``lower_body_at`` mapped into Quest tracking space.
+
+        None until ``source`` has been aligned with the Quest body. A
+        hip-centred source is placed at the Quest hips at ``timestamp``.
+        """
+
+        with self._lock:
+            source = self.latest_lower_source if source is None else source
+            alignment = self.alignments.get(source)
+            if alignment is None or not alignment.calibrated:
+                return None
+            snapshot = self.lower_body_at(timestamp, source)
+            if snapshot is None:
+                return None
+            anchor = None
+            if alignment.hip_centred:
+                upper = self.upper_body_at(timestamp)
+                anchor = quest_hip_midpoint(upper.poses, upper.layout) if upper is not None else None
+                if anchor is None:
+                    return None
+            data = snapshot.data.copy()
+            alignment.to_quest(snapshot.data[:, :3], out=data[:, :3], anchor=anchor)
+        return PoseSnapshot(timestamp, data, snapshot.layout, unit=METRES)
+
+    def fused_body_at(
+        self, timestamp: float, session: Optional[str] = None, source: Optional[str] = None
+    ) -> Optional[QuestPacket]:
+        """Quest body at ``timestamp`` with the camera's joints merged in.
+
+        The result is in the Quest's OVR layout: rows the headset does not
+        track (the legs, or anything it reports low confidence for) come
+        from ``lower_body_in_quest_at``. Until the camera is aligned, or
+        without a camera, it is just the Quest body. ``times.captured`` is
+        the newest capture time that went into it.
+        """
+
+        with self._lock:
+            upper = self.upper_body_at(timestamp, session)
+            if upper is None:
+                return None
+            captured = self._upper_track(session).history.newest_timestamp
+            lower = self.lower_body_in_quest_at(timestamp, source)
+            if lower is not None:
+                source = self.latest_lower_source if source is None else source
+                captured = max(captured, self.lower_body_histories[source].newest_timestamp)
+        if lower is not None:
+            merge_camera_joints(upper.poses, upper.confidences, upper.layout, lower.data, lower.layout)
+        upper.times = FrameTimes(captured=min(captured, timestamp))
+        return upper
+
+    def _align(self, snapshot: PoseSnapshot, source: str) -> None:
+        track = self._upper_track()
+        upper = track.history.sample(snapshot.timestamp)
+        if upper is None:
+            return
+        alignment = self.alignments.get(source)
+        if alignment is None:
+            alignment = self.alignments[source] = QuestAlignment(source)
+        alignment.observe(snapshot.data, snapshot.layout, upper["poses"], upper["confidences"], track.layout)
+
+    def _build_frame(self, timestamp: float, source: str, session: Optional[str] = None) -> FusedFrame:
+        """Freeze the current state into a frame and make it ``latest_frame``."""
+
+        self._sequence += 1
+        primary = self.quest_sessions.primary
+        frame = FusedFrame(
+            self._sequence,
+            timestamp,
+            source,
+            session=session,
+            upper_body=primary.latest if primary is not None else None,
+            lower_body=self.latest_lower_body,
+            upper_bodies=MappingProxyType({s.key: s.latest for s in self.quest_sessions}),
+            lower_bodies=MappingProxyType(dict(self.lower_bodies)),
+        )
+        self.latest_frame = frame
+        return frame
+
+    def _record_upper_body(self, session: QuestSession, packet: QuestPacket, captured_at: float) -> None:
+        track: Optional[UpperBodyTrack] = session.state
+        if track is None or packet.layout is not track.layout:
+            n_joints = len(packet.layout)
+            history = PoseRingBuffer(
+                self.history_capacity,
+                {
+                    "quest_timestamp": FieldSpec((), dtype=np.float64),
+                    "hmd": FieldSpec((POSE_WIDTH,), quaternion=ROTATION),
+                    "poses": FieldSpec((n_joints, POSE_WIDTH), quaternion=ROTATION),
+                    "confidences": FieldSpec((n_joints,)),
+                },
+            )
+            track = session.state = UpperBodyTrack(history, packet.layout)
+
+        track.history.append(
+            captured_at,
+            quest_timestamp=packet.timestamp,
+            hmd=packet.hmd,
+            poses=packet.poses,
+            confidences=packet.confidences,
+        )
+
+    def _record_lower_body(self, snapshot: PoseSnapshot, source: str) -> None:
+        if not len(snapshot.layout):
+            return
+        history = self.lower_body_histories.get(source)
+        if snapshot.layout is not self._lower_layouts.get(source) or history is None:
+            history = PoseRingBuffer(
+                self.history_capacity,
+                {"landmarks": FieldSpec((len(snapshot.layout), LANDMARK_WIDTH))},
+            )
+            self.lower_body_histories[source] = history
+            self._lower_layouts[source] = snapshot.layout
+
+        history.append(snapshot.timestamp, landmarks=snapshot.data)
+
+    def _source_metrics(self, source: str) -> Tuple[Counter, Counter, Histogram, StageLatency]:
+        metrics = self._publish_metrics.get(source)
+        if metrics is None:
+            metrics = self._publish_metrics[source] = (
+                REGISTRY.counter("pose_snapshots_total", "Pose snapshots published into the workspace", source=source),
+                REGISTRY.counter(
+                    "pose_predicted_snapshots_total",
+                    "Published snapshots extrapolated between inferences",
+                    source=source,
+                ),
+                REGISTRY.histogram("pose_publish_seconds", "Time to publish a snapshot into the workspace", source=source),
+                StageLatency(source),
+            )
+        return metrics
 
     def _log_workspace_state(self) -> None:
         """Log when both streams are live to highlight the fusion."""
@@ -80,16 +539,36 @@ class FusionWorkspace:
         if not self.latest_upper_body or not self.latest_lower_body:
             return
 
-        try:
-            quest_ts = float(self.latest_upper_body.get("timestamp", 0.0))
-        except Exception:
-            quest_ts = 0.0
+        session = self.quest_sessions.primary
+        if session is None:
+            return
         pose_estimation_by_camera_ts = self.latest_lower_body.timestamp
-        delta = pose_estimation_by_camera_ts - quest_ts
+        aligned_upper_body = self.upper_body_at(pose_estimation_by_camera_ts)
+        quest_ts = aligned_upper_body.timestamp if aligned_upper_body else 0.0
+        quest_host_ts = session.to_host(quest_ts) if aligned_upper_body else 0.0
+        # Both histories are indexed by capture time on the host clock, so
+        # this is how far the camera capture lies past the newest Quest
+        # capture; a large positive value means the upper body is being
+        # held, not interpolated.
+        newest_quest = self.upper_body_history.newest_timestamp or 0.0
+        delta = pose_estimation_by_camera_ts - newest_quest
+        now = time.time()
+        alignment = self.alignments.get(self.latest_lower_source)
+        if alignment is not None and alignment.calibrated:
+            aligned = f"aligned to Quest space, residual {alignment.residual:.3f} m"
+        else:
+            aligned = "not aligned to Quest space yet"
 
-        logger.info(
-            "Fusion workspace ready (Quest ts=%.3f, Camera source ts=%.3f, Δ=%.3fs) — this is the hook for blending the two bodies.",
+        logger.debug(
+            "Fusion workspace ready (Quest ts=%.3f, host %.3f, aligned to Camera source ts=%.3f, Δ=%.3fs; "
+            "Quest %.0f ms old, camera %.0f ms old, %s); %s %s.",
             quest_ts,
+            quest_host_ts,
             pose_estimation_by_camera_ts,
             delta,
+            (now - newest_quest) * 1e3,
+            (now - pose_estimation_by_camera_ts) * 1e3,
+            session.clock.summary(),
+            self.latest_lower_source,
+            aligned,
         )
@@ -0,0 +1,106 @@
+"""Per-frame stage times on one clock and the latency histograms built from them.
+
+Quest packets and camera snapshots can carry a :class:`FrameTimes`. All four
+times are host ``time.time()`` seconds, which every process on the machine
+shares:
+
+``captured``
+    when the pose was sampled: Unity's timestamp mapped onto the host clock
+    by the headset's ``ClockSync``, or the camera frame's capture time;
+``received``
+    datagram arrival, or when the inference stage picked the frame up;
+``decoded``
+    msgpack decoded into a ``QuestPacket``, or model output turned into a
+    ``PoseSnapshot``;
+``published``
+    the ``FusionWorkspace`` made it visible to readers.
+
+Consecutive differences are the ``receive`` (network, or frame queue),
+``decode`` (decode, or inference) and ``publish`` stages; ``end_to_end``
+spans capture to publish. The mapped Quest capture time includes the
+smallest network delay seen, so Quest ``receive`` is the delay above it.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Dict, Optional, Tuple
+
+from pose_stream_server.common.metrics import REGISTRY, Histogram
+
+STAGES = ("receive", "decode", "publish", "end_to_end")
+_STAGE_BOUNDS = (
+    ("receive", "captured", "received"),
+    ("decode", "received", "decoded"),
+    ("publish", "decoded", "published"),
+    ("end_to_end", "captured", "published"),
+)
+
+
+class FrameTimes:
+    """Host-clock times of one frame's pipeline stages; unknown ones stay None."""
+
+    __slots__ = ("captured", "received", "decoded", "published")
+
+    def __init__(
+        self,
+        captured: Optional[float] = None,
+        received: Optional[float] = None,
+        decoded: Optional[float] = None,
+        published: Optional[float] = None,
+    ) -> None:
+        self.captured = captured
+        self.received = received
+        self.decoded = decoded
+        self.published = published
+
+    def stages(self) -> Dict[str, float]:
+        """Seconds spent per stage, for the stages whose both ends are known."""
+
+        durations = {}
+        for stage, start, end in _STAGE_BOUNDS:
+            began = getattr(self, start)
+            ended = getattr(self, end)
+            if began is not None and ended is not None:
+                durations[stage] = ended - began
+        return durations
+
+    def age(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds since capture."""
+
+        if self.captured is None:
+            return None
+        return (time.time() if now is None else now) - self.captured
+
+    def __repr__(self) -> str:
+        stages = ", ".join(f"{stage}={seconds * 1e3:.1f}ms" for stage, seconds in self.stages().items())
+        return f"FrameTimes({stages or 'no complete stages'})"
+
+
+class StageLatency:
+    """``pose_stage_latency_seconds`` histograms of one stream, one per stage."""
+
+    def __init__(self, stream: str) -> None:
+        self.stream = stream
+        self._histograms: Tuple[Tuple[str, str, Histogram], ...] = tuple(
+            (
+                start,
+                end,
+                REGISTRY.histogram(
+                    "pose_stage_latency_seconds",
+                    "Per-stage pipeline latency on the host clock",
+                    stream=stream,
+                    stage=stage,
+                ),
+            )
+            for stage, start, end in _STAGE_BOUNDS
+        )
+
+    def observe(self, times: Optional[FrameTimes]) -> None:
+        if times is None:
+            return
+        for start, end, histogram in self._histograms:
+            began = getattr(times, start)
+            ended = getattr(times, end)
+            if began is not None and ended is not None:
+                histogram.observe(ended - began)
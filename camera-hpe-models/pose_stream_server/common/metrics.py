@@ -0,0 +1,278 @@
+"""Counters and fixed-bucket latency histograms with a Prometheus endpoint.
+
+Hot paths only touch preallocated series objects: ``Counter.inc`` adds to an
+int and ``Histogram.observe`` bumps one bucket found by bisection, each under
+an uncontended lock. Text is only rendered when the HTTP endpoint is scraped
+or the periodic summary line is due, so instrumentation costs next to
+nothing when nobody is looking.
+
+Series are created once, usually at import or construction time::
+
+    DECODE_SECONDS = REGISTRY.histogram("pose_decode_seconds", "Quest packet decode time")
+    ...
+    began = time.perf_counter()
+    ...
+    DECODE_SECONDS.observe(time.perf_counter() - began)
+"""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans sub-millisecond decode up to multi-frame skew.
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+DEFAULT_SUMMARY_INTERVAL_S = 10.0
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    __slots__ = ("value", "_lock", "_last")
+
+    def __init__(self) -> None:
+        self.value = 0
+        self._lock = threading.Lock()
+        self._last = 0
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "total", "count", "_lock", "_last_counts")
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        self.bounds = tuple(bounds)
+        # One slot per bound plus +Inf.
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+        self._last_counts = list(self.counts)
+
+    def observe(self, value: float) -> None:
+        slot = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[slot] += 1
+            self.total += value
+            self.count += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        with self._lock:
+            return list(self.counts), self.total, self.count
+
+
+class _Family:
+    def __init__(self, name: str, kind: str, help_text: str) -> None:
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.series: Dict[Labels, object] = {}
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._families: Dict[str, _Family] = {}
+        self._lock = threading.Lock()
+        self._last_summary = time.perf_counter()
+
+    def counter(self, name: str, help_text: str, **labels: str) -> Counter:
+        return self._series(name, "counter", help_text, labels, Counter)
+
+    def histogram(
+        self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS, **labels: str
+    ) -> Histogram:
+        return self._series(name, "histogram", help_text, labels, lambda: Histogram(buckets))
+
+    def _series(self, name, kind, help_text, labels, factory):
+        key: Labels = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = _Family(name, kind, help_text)
+            elif family.kind != kind:
+                raise ValueError(f"Metric {name} already registered as a {family.kind}")
+            series = family.series.get(key)
+            if series is None:
+                series = family.series[key] = factory()
+            return series
+
+    # Exposition
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+
+        lines: List[str] = []
+        with self._lock:
+            families = [(f, list(f.series.items())) for f in self._families.values()]
+        for family, series in families:
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for labels, metric in series:
+                if family.kind == "counter":
+                    lines.append(f"{family.name}{_format_labels(labels)} {metric.value}")
+                    continue
+                counts, total, count = metric.snapshot()
+                cumulative = 0
+                for bound, bucket in zip(metric.bounds + (float("inf"),), counts):
+                    cumulative += bucket
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    bucket_labels = _format_labels(labels, f'le="{le}"')
+                    lines.append(f"{family.name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{family.name}_sum{_format_labels(labels)} {total}")
+                lines.append(f"{family.name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """One line describing activity since the previous call."""
+
+        now = time.perf_counter()
+        elapsed = max(now - self._last_summary, 1e-6)
+        self._last_summary = now
+        parts: List[str] = []
+        with self._lock:
+            families = [(f, list(f.series.items())) for f in self._families.values()]
+        for family, series in families:
+            for labels, metric in series:
+                label_text = ",".join(value for _, value in labels)
+                name = f"{family.name}[{label_text}]" if label_text else family.name
+                if family.kind == "counter":
+                    value = metric.value
+                    delta, metric._last = value - metric._last, value
+                    if delta:
+                        parts.append(f"{name} {delta / elapsed:.1f}/s")
+                    continue
+                counts, _, _ = metric.snapshot()
+                deltas = [c - last for c, last in zip(counts, metric._last_counts)]
+                metric._last_counts = counts
+                n = sum(deltas)
+                if n:
+                    p50 = _quantile(metric.bounds, deltas, n, 0.5)
+                    p95 = _quantile(metric.bounds, deltas, n, 0.95)
+                    parts.append(f"{name} p50<={p50 * 1000:.1f}ms p95<={p95 * 1000:.1f}ms")
+        return "; ".join(parts) if parts else "idle"
+
+
+def _quantile(bounds: Sequence[float], counts: Sequence[int], total: int, q: float) -> float:
+    """Upper bound of the bucket holding quantile ``q``."""
+
+    target = q * total
+    cumulative = 0
+    for bound, count in zip(tuple(bounds) + (float("inf"),), counts):
+        cumulative += count
+        if cumulative >= target:
+            return bound
+    return float("inf")
+
+
+REGISTRY = MetricsRegistry()
+
+
+class MetricsServer:
+    """Serves ``GET /metrics`` from a daemon thread."""
+
+    def __init__(self, port: int, host: str = "127.0.0.1", registry: MetricsRegistry = REGISTRY) -> None:
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802 (http.server API)
+                if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+
+    def start(self) -> "MetricsServer":
+        self._thread.start()
+        logger.info("Serving metrics on http://%s:%d/metrics", self._server.server_address[0], self.port)
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class SummaryLogger:
+    """Logs ``registry.summary()`` every ``interval`` seconds from a daemon thread."""
+
+    def __init__(self, interval: float = DEFAULT_SUMMARY_INTERVAL_S, registry: MetricsRegistry = REGISTRY) -> None:
+        self.interval = interval
+        self._registry = registry
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-summary", daemon=True)
+
+    def start(self) -> "SummaryLogger":
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            logger.info("Metrics — %s", self._registry.summary())
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+class Metrics:
+    """The endpoint and summary logger a server asked for on its command line."""
+
+    def __init__(self, server: Optional[MetricsServer], summary: Optional[SummaryLogger]) -> None:
+        self.server = server
+        self.summary = summary
+
+    def stop(self) -> None:
+        if self.server is not None:
+            self.server.stop()
+        if self.summary is not None:
+            self.summary.stop()
+
+
+def add_metrics_arguments(parser) -> None:
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=0,
+        help="Serve Prometheus metrics on this local port (default: 0, disabled)",
+    )
+    parser.add_argument(
+        "--metrics-host", default="127.0.0.1", help="Interface for the metrics endpoint (default: 127.0.0.1)"
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=DEFAULT_SUMMARY_INTERVAL_S,
+        help=f"Seconds between metrics summary log lines, 0 to disable (default: {DEFAULT_SUMMARY_INTERVAL_S:g})",
+    )
+
+
+def start_metrics(args, registry: MetricsRegistry = REGISTRY) -> Metrics:
+    server = MetricsServer(args.metrics_port, args.metrics_host, registry).start() if args.metrics_port else None
+    summary = SummaryLogger(args.metrics_interval, registry).start() if args.metrics_interval > 0 else None
+    return Metrics(server, summary)
@@ -0,0 +1,334 @@
+"""Multi-camera calibration and batched DLT triangulation.
+
+Calibration files are JSON, one entry per camera keyed by the same name the
+camera's estimator publishes under (``--publish-shm NAME``)::
+
+    {
+      "cameras": {
+        "cam0": {
+          "K": [[fx, 0, cx], [0, fy, cy], [0, 0, 1]],
+          "dist": [k1, k2, p1, p2, k3],
+          "R": [[...], [...], [...]],      # or "rvec": [rx, ry, rz]
+          "t": [tx, ty, tz],
+          "image_size": [width, height]
+        }
+      }
+    }
+
+``R``/``t`` map world points into the camera frame (OpenCV convention), so
+the world frame is whatever the extrinsic calibration used.
+
+Views must be pixel keypoints of the calibrated image: a live snapshot whose
+``unit`` is not pixels, or whose ``image_size`` differs from the camera's
+``image_size``, is left out with a warning (snapshots that do not say are
+trusted).
+
+Triangulation works on undistorted, normalized image coordinates. Every
+keypoint of every frame becomes one small ``(2C, 4)`` DLT system whose rows
+are scaled by that view's visibility score; all systems are stacked and
+solved with a single batched SVD call.
+
+Offline, per-camera ``.npz`` outputs from ``offline_batch`` can be
+triangulated in one go::
+
+    python -m pose_stream_server.common.multiview calibration.json \\
+        --view cam0=keypoints/cam0.npz --view cam1=keypoints/cam1.npz --output keypoints/3d.npz
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from pose_stream_server.common.fusion_workspace import LANDMARK_WIDTH, PIXELS, PoseSnapshot
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_VIEWS = 2
+DEFAULT_MIN_VISIBILITY = 0.3
+
+
+@dataclass(frozen=True)
+class CameraCalibration:
+    name: str
+    K: np.ndarray
+    dist: np.ndarray
+    R: np.ndarray
+    t: np.ndarray
+    image_size: Optional[Tuple[int, int]] = None
+
+    @property
+    def extrinsic(self) -> np.ndarray:
+        """``(3, 4)`` world-to-camera ``[R | t]``."""
+
+        return np.hstack([self.R, self.t.reshape(3, 1)])
+
+    @property
+    def projection(self) -> np.ndarray:
+        """``(3, 4)`` pixel projection matrix ``K [R | t]``."""
+
+        return self.K @ self.extrinsic
+
+    def normalize(self, points: np.ndarray) -> np.ndarray:
+        """Undistort ``(..., 2)`` pixel coordinates to normalized image coordinates."""
+
+        points = np.asarray(points, dtype=np.float64)
+        shape = points.shape
+        flat = points.reshape(-1, 2)
+        if np.any(self.dist):
+            import cv2
+
+            flat = cv2.undistortPoints(flat.reshape(-1, 1, 2), self.K, self.dist).reshape(-1, 2)
+        else:
+            flat = (flat - self.K[:2, 2]) / np.diag(self.K)[:2]
+        return flat.reshape(shape)
+
+    def mismatch(self, snapshot: PoseSnapshot) -> Optional[str]:
+        """Why ``snapshot`` cannot be a view of this camera, or None if it can."""
+
+        if snapshot.unit is not None and snapshot.unit != PIXELS:
+            return f"its keypoints are in {snapshot.unit}, not pixels"
+        if (
+            self.image_size is not None
+            and snapshot.image_size is not None
+            and tuple(snapshot.image_size) != tuple(self.image_size)
+        ):
+            width, height = snapshot.image_size
+            return f"its frames are {width}x{height}, calibrated for {self.image_size[0]}x{self.image_size[1]}"
+        return None
+
+
+def _camera_from_dict(name: str, entry: Mapping) -> CameraCalibration:
+    K = np.asarray(entry["K"], dtype=np.float64).reshape(3, 3)
+    dist = np.asarray(entry.get("dist", ()), dtype=np.float64).ravel()
+    if "R" in entry:
+        R = np.asarray(entry["R"], dtype=np.float64).reshape(3, 3)
+    elif "rvec" in entry:
+        import cv2
+
+        R, _ = cv2.Rodrigues(np.asarray(entry["rvec"], dtype=np.float64).reshape(3, 1))
+    else:
+        raise ValueError(f"Camera {name!r} needs either 'R' or 'rvec'")
+    t = np.asarray(entry["t"], dtype=np.float64).reshape(3)
+    image_size = tuple(entry["image_size"]) if "image_size" in entry else None
+    return CameraCalibration(name, K, dist, R, t, image_size)
+
+
+def load_calibration(path: str) -> Dict[str, CameraCalibration]:
+    """Read a calibration file into ``{camera name: CameraCalibration}``."""
+
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    cameras = {name: _camera_from_dict(name, entry) for name, entry in config["cameras"].items()}
+    if len(cameras) < DEFAULT_MIN_VIEWS:
+        raise ValueError(f"{path} defines {len(cameras)} camera(s); triangulation needs at least {DEFAULT_MIN_VIEWS}")
+    return cameras
+
+
+def save_calibration(path: str, cameras: Mapping[str, CameraCalibration]) -> None:
+    config = {
+        "cameras": {
+            name: {
+                "K": cam.K.tolist(),
+                "dist": cam.dist.tolist(),
+                "R": cam.R.tolist(),
+                "t": cam.t.tolist(),
+                **({"image_size": list(cam.image_size)} if cam.image_size else {}),
+            }
+            for name, cam in cameras.items()
+        }
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+
+
+def triangulate(
+    points: np.ndarray,
+    weights: np.ndarray,
+    extrinsics: np.ndarray,
+    min_views: int = DEFAULT_MIN_VIEWS,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Weighted DLT over any number of frames and keypoints at once.
+
+    ``points`` is ``(..., C, K, 2)`` in normalized image coordinates,
+    ``weights`` ``(..., C, K)`` with 0 for views that must not contribute,
+    and ``extrinsics`` ``(C, 3, 4)``. Returns ``(xyz, views)``: ``(..., K, 3)``
+    world points (NaN where fewer than ``min_views`` views had weight) and
+    the ``(..., K)`` number of contributing views.
+    """
+
+    points = np.asarray(points, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    P = np.asarray(extrinsics, dtype=np.float64)
+
+    # x * P[2] - P[0] and y * P[2] - P[1] for every (view, keypoint): (..., C, K, 2, 4)
+    rows = points[..., :, None] * P[:, None, None, 2, :] - P[:, None, :2, :]
+    rows *= weights[..., None, None]
+
+    # One (2C, 4) system per keypoint: (..., K, 2C, 4)
+    n_views = P.shape[0]
+    rows = np.moveaxis(rows, -4, -3)
+    rows = rows.reshape(*rows.shape[:-3], 2 * n_views, 4)
+    _, _, vt = np.linalg.svd(rows)
+    homogeneous = vt[..., -1, :]
+
+    views = np.count_nonzero(weights > 0.0, axis=-2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        xyz = homogeneous[..., :3] / homogeneous[..., 3:]
+    xyz[views < min_views] = np.nan
+    return xyz, views
+
+
+class MultiViewTriangulator:
+    """Turn per-camera 2D keypoint snapshots into one 3D :class:`PoseSnapshot`."""
+
+    def __init__(
+        self,
+        cameras: Mapping[str, CameraCalibration],
+        min_views: int = DEFAULT_MIN_VIEWS,
+        min_visibility: float = DEFAULT_MIN_VISIBILITY,
+    ) -> None:
+        self.cameras: List[CameraCalibration] = list(cameras.values())
+        self.names: List[str] = [cam.name for cam in self.cameras]
+        self.min_views = min_views
+        self.min_visibility = min_visibility
+        self._extrinsics = np.stack([cam.extrinsic for cam in self.cameras])
+        # Last reason each camera's views were skipped, so it is logged once.
+        self._skipped: Dict[str, Optional[str]] = {}
+
+    def triangulate_arrays(self, keypoints: np.ndarray) -> np.ndarray:
+        """``(..., C, K, 4)`` per-view (x, y, _, visibility) pixel keypoints
+        to ``(..., K, 4)`` (x, y, z, visibility) world keypoints.
+
+        NaN rows (missing detections) are treated as invisible. Output
+        visibility is the mean score of the contributing views, 0 where the
+        keypoint could not be triangulated (its position is then 0).
+        """
+
+        keypoints = np.asarray(keypoints, dtype=np.float64)
+        pixels = np.nan_to_num(keypoints[..., :2])
+        visibility = np.nan_to_num(keypoints[..., 3])
+        weights = np.where(visibility >= self.min_visibility, visibility, 0.0)
+
+        normalized = np.empty_like(pixels)
+        for c, cam in enumerate(self.cameras):
+            normalized[..., c, :, :] = cam.normalize(pixels[..., c, :, :])
+
+        xyz, views = triangulate(normalized, weights, self._extrinsics, self.min_views)
+
+        out = np.zeros((*xyz.shape[:-1], LANDMARK_WIDTH), dtype=np.float32)
+        valid = views >= self.min_views
+        out[..., :3] = np.where(valid[..., None], xyz, 0.0)
+        out[..., 3] = np.where(valid, weights.sum(axis=-2) / np.maximum(views, 1), 0.0)
+        return out
+
+    def triangulate(
+        self, snapshots: Sequence[Optional[PoseSnapshot]], timestamp: Optional[float] = None
+    ) -> Optional[PoseSnapshot]:
+        """Triangulate one frame from per-camera snapshots given in ``names`` order.
+
+        Missing views may be None. All present snapshots must share a
+        keypoint layout; views that do not match their calibration
+        (:meth:`CameraCalibration.mismatch`) are skipped.
+        """
+
+        snapshots = [
+            None if snapshot is None or not self._matches(cam, snapshot) else snapshot
+            for cam, snapshot in zip(self.cameras, snapshots)
+        ]
+        present = [s for s in snapshots if s is not None]
+        if len(present) < self.min_views:
+            return None
+        layout = present[0].layout
+
+        keypoints = np.zeros((len(self.cameras), len(layout), LANDMARK_WIDTH), dtype=np.float32)
+        for c, snapshot in enumerate(snapshots):
+            if snapshot is None:
+                continue
+            if snapshot.layout is not layout:
+                logger.warning("Camera %s has a different keypoint layout; ignoring it", self.names[c])
+                continue
+            keypoints[c] = snapshot.data
+
+        if timestamp is None:
+            timestamp = max(s.timestamp for s in present)
+        return PoseSnapshot(timestamp, self.triangulate_arrays(keypoints), layout)
+
+    def _matches(self, cam: CameraCalibration, snapshot: PoseSnapshot) -> bool:
+        reason = cam.mismatch(snapshot)
+        if reason != self._skipped.get(cam.name):
+            self._skipped[cam.name] = reason
+            if reason is not None:
+                logger.warning("Ignoring camera %s: %s", cam.name, reason)
+            else:
+                logger.info("Camera %s matches its calibration again", cam.name)
+        return reason is None
+
+
+def triangulate_npz(
+    triangulator: MultiViewTriangulator, views: Mapping[str, str], output: str
+) -> None:
+    """Triangulate synchronized per-camera ``offline_batch`` outputs into one ``.npz``."""
+
+    loaded = {name: np.load(path) for name, path in views.items()}
+    try:
+        missing = [name for name in triangulator.names if name not in loaded]
+        if missing:
+            raise ValueError(f"No keypoints given for camera(s) {', '.join(missing)}")
+
+        frames = min(len(data["frame_index"]) for data in loaded.values())
+        names = next(data["names"] for data in loaded.values() if len(data["names"]))
+        stacked = np.stack(
+            [
+                data["keypoints"][:frames]
+                if data["keypoints"].shape[1] == len(names)
+                else np.full((frames, len(names), LANDMARK_WIDTH), np.nan, dtype=np.float32)
+                for data in (loaded[name] for name in triangulator.names)
+            ],
+            axis=1,
+        )
+        reference = loaded[triangulator.names[0]]
+        np.savez(
+            output,
+            frame_index=reference["frame_index"][:frames],
+            timestamps=reference["timestamps"][:frames],
+            keypoints=triangulator.triangulate_arrays(stacked),
+            names=names,
+        )
+        logger.info("Triangulated %d frames from %d cameras into %s", frames, len(triangulator.names), output)
+    finally:
+        for data in loaded.values():
+            data.close()
+
+
+# CLI entrypoint
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Triangulate per-camera offline keypoints")
+    parser.add_argument("calibration", help="Calibration JSON")
+    parser.add_argument(
+        "--view", action="append", required=True, metavar="CAMERA=NPZ", help="Keypoints of one camera (repeatable)"
+    )
+    parser.add_argument("--output", required=True, help="Output .npz with (F, K, 4) world keypoints")
+    parser.add_argument("--min-views", type=int, default=DEFAULT_MIN_VIEWS)
+    parser.add_argument("--min-visibility", type=float, default=DEFAULT_MIN_VISIBILITY)
+    parser.add_argument("--log-level", default="INFO", help="Logging level (default: INFO)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    args = parse_args(argv)
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.INFO))
+    triangulator = MultiViewTriangulator(
+        load_calibration(args.calibration), min_views=args.min_views, min_visibility=args.min_visibility
+    )
+    views = dict(view.split("=", 1) for view in args.view)
+    triangulate_npz(triangulator, views, args.output)
+
+
+if __name__ == "__main__":
+    main()
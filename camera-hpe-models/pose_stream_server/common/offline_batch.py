@@ -0,0 +1,244 @@
+"""Offline batch pose extraction over recorded footage.
+
+Spreads video files and image directories (or fixed-size chunks of long
+videos) across a process pool. Each worker loads one backend pipeline once,
+runs it headlessly over a prefetched frame source and writes per-frame
+keypoints to ``<output>/<name>.npz``::
+
+    python -m pose_stream_server.common.offline_batch --backend mediapipe \\
+        --output keypoints/ --workers 8 --chunk-frames 2000 session1.mp4 session2.mp4
+
+Each ``.npz`` holds ``frame_index (F,)``, ``timestamps (F,)`` in seconds from
+the start of the source, ``keypoints (F, K, 4)`` with NaN rows for frames
+without a pose, and the keypoint ``names``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from pose_stream_server.common.backends import backend_names, create_backend
+from pose_stream_server.common.frame_source import DEFAULT_PREFETCH, count_frames, open_frame_source
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FPS = 30.0
+
+
+@dataclass(frozen=True)
+class Job:
+    path: str
+    start: int
+    end: Optional[int]
+    output: str
+
+
+@dataclass(frozen=True)
+class JobResult:
+    job: Job
+    frames: int
+    detected: int
+    seconds: float
+
+
+# Per-worker pipeline, created once by _init_worker.
+_processor: Optional[Callable] = None
+
+
+def _init_worker(backend: str, opencv_threads: int, log_level: int) -> None:
+    global _processor
+    logging.basicConfig(level=log_level)
+    if opencv_threads > 0:
+        import cv2
+
+        # One process per core already; avoid oversubscribing with OpenCV threads.
+        cv2.setNumThreads(opencv_threads)
+    pipeline = create_backend(backend)
+    pipeline.load()
+    _processor = pipeline.process
+
+
+def _run_job(job: Job, prefetch: int) -> JobResult:
+    began = time.perf_counter()
+    source = open_frame_source(job.path, job.start, job.end, prefetch=prefetch)
+    fps = source.fps or DEFAULT_FPS
+
+    frame_index: List[int] = []
+    snapshots = []
+    try:
+        index = job.start
+        while True:
+            ok, frame = source.read()
+            if not ok:
+                break
+            frame_index.append(index)
+            snapshots.append(_processor(frame, index / fps))
+            index += 1
+    finally:
+        source.release()
+
+    detected = [s for s in snapshots if s is not None]
+    names = detected[0].names if detected else ()
+    keypoints = np.full((len(snapshots), len(names), 4), np.nan, dtype=np.float32)
+    for row, snapshot in enumerate(snapshots):
+        if snapshot is not None and snapshot.names == names:
+            keypoints[row] = snapshot.data
+
+    frame_index_arr = np.asarray(frame_index, dtype=np.int64)
+    np.savez(
+        job.output,
+        frame_index=frame_index_arr,
+        timestamps=frame_index_arr / fps,
+        keypoints=keypoints,
+        names=np.asarray(names, dtype=str),
+    )
+    return JobResult(job, len(snapshots), len(detected), time.perf_counter() - began)
+
+
+def plan_jobs(inputs: Sequence[str], output_dir: str, chunk_frames: int) -> Dict[str, List[Job]]:
+    """Split every input into jobs, keyed by the final merged output path."""
+
+    plan: Dict[str, List[Job]] = {}
+    for path in inputs:
+        stem = os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+        merged = os.path.join(output_dir, f"{stem}.npz")
+        total = count_frames(path) if chunk_frames > 0 else 0
+        if total <= chunk_frames or chunk_frames <= 0:
+            plan[merged] = [Job(path, 0, None, merged)]
+            continue
+        n_chunks = math.ceil(total / chunk_frames)
+        plan[merged] = [
+            Job(
+                path,
+                i * chunk_frames,
+                min(total, (i + 1) * chunk_frames),
+                os.path.join(output_dir, f"{stem}.part{i:04d}.npz"),
+            )
+            for i in range(n_chunks)
+        ]
+    return plan
+
+
+def merge_chunks(parts: Sequence[Job], merged: str) -> None:
+    """Concatenate chunk outputs (in frame order) and remove them."""
+
+    loaded = [np.load(job.output) for job in sorted(parts, key=lambda job: job.start)]
+    names = next((data["names"] for data in loaded if len(data["names"])), np.asarray([], dtype=str))
+    keypoints = []
+    for data in loaded:
+        chunk = data["keypoints"]
+        if chunk.shape[1] != len(names):
+            chunk = np.full((chunk.shape[0], len(names), 4), np.nan, dtype=np.float32)
+        keypoints.append(chunk)
+
+    np.savez(
+        merged,
+        frame_index=np.concatenate([data["frame_index"] for data in loaded]),
+        timestamps=np.concatenate([data["timestamps"] for data in loaded]),
+        keypoints=np.concatenate(keypoints),
+        names=names,
+    )
+    for data in loaded:
+        data.close()
+    for job in parts:
+        os.remove(job.output)
+
+
+def run_batch(
+    backend: str,
+    inputs: Sequence[str],
+    output_dir: str,
+    workers: int,
+    chunk_frames: int = 0,
+    prefetch: int = DEFAULT_PREFETCH,
+    opencv_threads: int = 1,
+) -> List[JobResult]:
+    os.makedirs(output_dir, exist_ok=True)
+    plan = plan_jobs(inputs, output_dir, chunk_frames)
+    jobs = [job for parts in plan.values() for job in parts]
+    logger.info("Processing %d inputs as %d jobs on %d workers", len(inputs), len(jobs), workers)
+
+    results: List[JobResult] = []
+    began = time.perf_counter()
+    # spawn keeps heavy model state (torch, MediaPipe graphs) out of forked children.
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(backend, opencv_threads, logging.getLogger().level),
+    ) as pool:
+        futures = {pool.submit(_run_job, job, prefetch): job for job in jobs}
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            logger.info(
+                "%s [%d:%s] %d frames (%d with pose) at %.1f fps",
+                result.job.path,
+                result.job.start,
+                result.job.end if result.job.end is not None else "end",
+                result.frames,
+                result.detected,
+                result.frames / max(result.seconds, 1e-9),
+            )
+
+    for merged, parts in plan.items():
+        if len(parts) > 1:
+            merge_chunks(parts, merged)
+
+    elapsed = time.perf_counter() - began
+    total = sum(result.frames for result in results)
+    logger.info("Done: %d frames in %.1fs (%.1f fps overall)", total, elapsed, total / max(elapsed, 1e-9))
+    return results
+
+
+# CLI entrypoint
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline batch pose extraction")
+    parser.add_argument("inputs", nargs="+", help="Video files and/or image directories")
+    parser.add_argument("--backend", choices=backend_names(), default="mediapipe", help="Pose pipeline to run")
+    parser.add_argument("--output", required=True, help="Directory for per-input .npz keypoint files")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: CPU count)"
+    )
+    parser.add_argument(
+        "--chunk-frames",
+        type=int,
+        default=0,
+        help="Split long inputs into chunks of this many frames (default: 0, one job per input)",
+    )
+    parser.add_argument(
+        "--prefetch", type=int, default=DEFAULT_PREFETCH, help="Decoded frames buffered ahead per worker"
+    )
+    parser.add_argument(
+        "--opencv-threads", type=int, default=1, help="OpenCV threads per worker, 0 = OpenCV default (default: 1)"
+    )
+    parser.add_argument("--log-level", default="INFO", help="Logging level (default: INFO)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    args = parse_args(argv)
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.INFO))
+    run_batch(
+        args.backend,
+        args.inputs,
+        args.output,
+        workers=max(1, args.workers),
+        chunk_frames=args.chunk_frames,
+        prefetch=args.prefetch,
+        opencv_threads=args.opencv_threads,
+    )
+
+
+if __name__ == "__main__":
+    main()
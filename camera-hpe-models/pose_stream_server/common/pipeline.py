@@ -0,0 +1,137 @@
+"""Small building blocks for threaded capture/inference/display pipelines.
+
+Stages run on their own threads and are connected by bounded
+latest-frame-wins queues: when a consumer falls behind, the oldest queued
+item is discarded instead of blocking the producer, so a slow stage never
+throttles the ones upstream of it.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Generic, Iterable, Optional, TypeVar
+
+from pose_stream_server.common.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class StageStats:
+    """Throughput and drop counters for one pipeline stage."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.processed = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._last_report = time.perf_counter()
+        self._last_processed = 0
+        self._last_dropped = 0
+        self._processed_metric = REGISTRY.counter("pose_stage_frames_total", "Frames handled per stage", stage=name)
+        self._dropped_metric = REGISTRY.counter("pose_stage_dropped_total", "Frames dropped per stage", stage=name)
+
+    def tick(self, count: int = 1) -> None:
+        with self._lock:
+            self.processed += count
+        self._processed_metric.inc(count)
+
+    def drop(self, count: int = 1) -> None:
+        with self._lock:
+            self.dropped += count
+        self._dropped_metric.inc(count)
+
+    def interval_summary(self) -> str:
+        """Describe activity since the previous call and reset the interval."""
+
+        now = time.perf_counter()
+        with self._lock:
+            processed = self.processed - self._last_processed
+            dropped = self.dropped - self._last_dropped
+            self._last_processed = self.processed
+            self._last_dropped = self.dropped
+        elapsed = max(now - self._last_report, 1e-6)
+        self._last_report = now
+        return f"{self.name}: {processed / elapsed:.1f} fps, {dropped} dropped"
+
+
+class LatestQueue(Generic[T]):
+    """Bounded queue where ``put`` evicts the oldest item instead of blocking."""
+
+    def __init__(
+        self,
+        maxsize: int = 1,
+        stats: Optional[StageStats] = None,
+        on_drop: Optional[Callable[[T], None]] = None,
+    ) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        self._items: Deque[T] = deque()
+        self._maxsize = maxsize
+        self._cond = threading.Condition()
+        self._closed = False
+        # Drops are charged to the consuming stage: they are frames it never saw.
+        self._stats = stats
+        self._on_drop = on_drop
+
+    def put(self, item: T) -> None:
+        evicted = None
+        with self._cond:
+            if self._closed:
+                evicted = item
+            else:
+                if len(self._items) >= self._maxsize:
+                    evicted = self._items.popleft()
+                self._items.append(item)
+                self._cond.notify()
+        if evicted is not None:
+            if self._stats is not None:
+                self._stats.drop()
+            if self._on_drop is not None:
+                self._on_drop(evicted)
+
+    def get(self, timeout: Optional[float] = None) -> Optional[T]:
+        """Return the oldest queued item, or ``None`` on timeout/close."""
+
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            leftovers = list(self._items)
+            self._items.clear()
+            self._cond.notify_all()
+        if self._on_drop is not None:
+            for item in leftovers:
+                self._on_drop(item)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+
+def start_stage(name: str, target: Callable[..., None], *args) -> threading.Thread:
+    """Run ``target(*args)`` on a daemon thread, logging any crash."""
+
+    def _run() -> None:
+        try:
+            target(*args)
+        except Exception:
+            logger.exception("Pipeline stage %s crashed", name)
+
+    thread = threading.Thread(target=_run, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+def log_stage_stats(stages: Iterable[StageStats], level: int = logging.INFO) -> None:
+    logger.log(level, "Pipeline stats — %s", "; ".join(stage.interval_summary() for stage in stages))
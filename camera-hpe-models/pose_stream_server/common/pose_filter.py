@@ -0,0 +1,298 @@
+"""Keypoint smoothing and extrapolation so the pose model can skip frames.
+
+:class:`KeypointFilter` is a One Euro filter vectorized over a ``(K, 4)``
+snapshot: every keypoint coordinate is smoothed in place with a cutoff that
+rises with its speed, and the filtered velocity doubles as a
+constant-velocity motion model for ``predict``.
+
+:class:`AdaptiveInference` decides per frame whether the model has to run.
+Each measurement is compared with what the motion model predicted for it;
+the miss, divided by the time since the previous measurement, gives an
+error growth rate. Inference is skipped while ``rate * elapsed`` stays under
+``tolerance`` and published as a ``PREDICTED`` snapshot instead. Fast motion
+raises the rate (and trips the speed check directly), so the servers drop
+back to inferring every frame without any mode switch.
+
+Positions are in the estimator's own units (metres for MediaPipe world
+landmarks, pixels for SynthPose), so ``tolerance`` is too.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+from typing import Optional
+
+import numpy as np
+
+from pose_stream_server.common.fusion_workspace import PREDICTED, PoseSnapshot
+from pose_stream_server.common.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_CUTOFF = 1.0
+DEFAULT_BETA = 0.05
+DEFAULT_DERIVATIVE_CUTOFF = 1.0
+DEFAULT_MAX_SKIP = 0
+# Keypoints below this visibility don't count towards speed or prediction error.
+MIN_VISIBILITY = 0.5
+# A gap this long (seconds) restarts the filter instead of smoothing across it.
+RESET_AFTER_S = 0.5
+# Moving more than ``tolerance`` within this many seconds counts as fast motion.
+FAST_MOTION_S = 0.1
+# Weight of the newest error-rate sample.
+ERROR_RATE_SMOOTHING = 0.5
+_POSITION = slice(0, 3)
+_VISIBILITY = 3
+
+
+def _alpha(cutoff, dt: float):
+    """One Euro smoothing factor for ``cutoff`` Hz over ``dt`` seconds."""
+
+    return 1.0 / (1.0 + 1.0 / (2.0 * math.pi * cutoff * dt))
+
+
+class KeypointFilter:
+    """One Euro filter with a constant-velocity predictor for ``(K, 4)`` keypoints.
+
+    State is kept in preallocated ``(K, 3)`` arrays; ``update`` writes the
+    filtered positions back into the snapshot's own array.
+    """
+
+    def __init__(
+        self,
+        min_cutoff: float = DEFAULT_MIN_CUTOFF,
+        beta: float = DEFAULT_BETA,
+        derivative_cutoff: float = DEFAULT_DERIVATIVE_CUTOFF,
+    ) -> None:
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.derivative_cutoff = derivative_cutoff
+        self.layout = None
+        # Predictions are in the frame of the latest measurement.
+        self.unit: Optional[str] = None
+        self.image_size = None
+        self.timestamp: Optional[float] = None
+        self.positions: Optional[np.ndarray] = None
+        self.velocity: Optional[np.ndarray] = None
+        self.visibility: Optional[np.ndarray] = None
+        self._scratch: Optional[np.ndarray] = None
+
+    def reset(self) -> None:
+        self.timestamp = None
+
+    @property
+    def ready(self) -> bool:
+        return self.timestamp is not None
+
+    def update(self, snapshot: PoseSnapshot) -> Optional[float]:
+        """Filter ``snapshot`` in place and return the prediction miss.
+
+        The miss is the largest distance between a visible measured keypoint
+        and where the motion model put it; None when the filter (re)started
+        on this snapshot and had nothing to predict from.
+        """
+
+        data = snapshot.data
+        self.unit, self.image_size = snapshot.unit, snapshot.image_size
+        dt = 0.0 if self.timestamp is None else snapshot.timestamp - self.timestamp
+        if snapshot.layout is not self.layout or not 0.0 < dt <= RESET_AFTER_S:
+            self._restart(snapshot)
+            return None
+
+        measured = data[:, _POSITION]
+        scratch = self._scratch
+        visible = data[:, _VISIBILITY] >= MIN_VISIBILITY
+
+        # Prediction miss: measured - (positions + velocity * dt).
+        np.multiply(self.velocity, dt, out=scratch)
+        scratch += self.positions
+        np.subtract(measured, scratch, out=scratch)
+        miss = np.linalg.norm(scratch[visible], axis=1).max(initial=0.0)
+
+        # Derivative: lerp the raw velocity into the filtered one.
+        np.subtract(measured, self.positions, out=scratch)
+        scratch /= dt
+        scratch -= self.velocity
+        scratch *= _alpha(self.derivative_cutoff, dt)
+        self.velocity += scratch
+
+        # Position: cutoff rises with speed so fast keypoints lag less.
+        cutoff = np.abs(self.velocity, out=scratch)
+        cutoff *= self.beta
+        cutoff += self.min_cutoff
+        alpha = _alpha(cutoff, dt)
+        np.subtract(measured, self.positions, out=scratch)
+        scratch *= alpha
+        self.positions += scratch
+
+        measured[...] = self.positions
+        self.visibility[...] = data[:, _VISIBILITY]
+        self.timestamp = snapshot.timestamp
+        return float(miss)
+
+    def predict(self, timestamp: float) -> PoseSnapshot:
+        """Extrapolate the last filtered state to ``timestamp``."""
+
+        if self.timestamp is None:
+            raise RuntimeError("Nothing to predict from; call update() first")
+        data = np.empty((len(self.positions), 4), dtype=np.float32)
+        np.multiply(self.velocity, timestamp - self.timestamp, out=data[:, _POSITION])
+        data[:, _POSITION] += self.positions
+        data[:, _VISIBILITY] = self.visibility
+        return PoseSnapshot(timestamp, data, self.layout, kind=PREDICTED, unit=self.unit, image_size=self.image_size)
+
+    def speed(self) -> float:
+        """Fastest visible keypoint, in position units per second."""
+
+        if self.timestamp is None:
+            return 0.0
+        visible = self.visibility >= MIN_VISIBILITY
+        return float(np.linalg.norm(self.velocity[visible], axis=1).max(initial=0.0))
+
+    def _restart(self, snapshot: PoseSnapshot) -> None:
+        count = len(snapshot.layout)
+        if self.positions is None or len(self.positions) != count:
+            self.positions = np.empty((count, 3), dtype=np.float32)
+            self.velocity = np.empty((count, 3), dtype=np.float32)
+            self.visibility = np.empty(count, dtype=np.float32)
+            self._scratch = np.empty((count, 3), dtype=np.float32)
+        self.positions[...] = snapshot.data[:, _POSITION]
+        self.velocity.fill(0.0)
+        self.visibility[...] = snapshot.data[:, _VISIBILITY]
+        self.layout = snapshot.layout
+        self.timestamp = snapshot.timestamp
+
+
+class AdaptiveInference:
+    """Per-frame choice between running the model and extrapolating.
+
+    Usage from a capture loop::
+
+        if schedule.should_infer(timestamp):
+            snapshot = schedule.measured(run_model(frame))   # or schedule.lost()
+        else:
+            snapshot = schedule.predict(timestamp)
+
+    ``max_skip`` caps consecutive predicted frames; 0 disables skipping, so
+    every frame is inferred and only smoothed.
+    """
+
+    def __init__(
+        self,
+        tolerance: float,
+        max_skip: int = DEFAULT_MAX_SKIP,
+        source: str = "camera",
+        keypoint_filter: Optional[KeypointFilter] = None,
+    ) -> None:
+        self.tolerance = tolerance
+        self.max_skip = max(0, max_skip)
+        self.filter = keypoint_filter or KeypointFilter()
+        self.error_rate = math.inf
+        self.skipped = 0
+        self._last_measured: Optional[float] = None
+        self._inferred = REGISTRY.counter(
+            "pose_frames_inferred_total", "Frames run through the pose model", source=source
+        )
+        self._predicted = REGISTRY.counter(
+            "pose_frames_predicted_total", "Frames extrapolated instead of inferred", source=source
+        )
+
+    def should_infer(self, timestamp: float) -> bool:
+        if self.max_skip == 0 or not self.filter.ready or self.skipped >= self.max_skip:
+            return True
+        elapsed = timestamp - self._last_measured
+        if elapsed > RESET_AFTER_S:
+            return True
+        if self.filter.speed() * FAST_MOTION_S > self.tolerance:
+            return True
+        return self.error_rate * elapsed > self.tolerance
+
+    def measured(self, snapshot: PoseSnapshot) -> PoseSnapshot:
+        """Smooth a fresh model output in place and learn from its miss."""
+
+        miss = self.filter.update(snapshot)
+        if miss is None:
+            self.error_rate = math.inf
+        else:
+            rate = miss / max(snapshot.timestamp - self._last_measured, 1e-3)
+            if math.isinf(self.error_rate):
+                self.error_rate = rate
+            else:
+                self.error_rate += ERROR_RATE_SMOOTHING * (rate - self.error_rate)
+        self._last_measured = snapshot.timestamp
+        self.skipped = 0
+        self._inferred.inc()
+        return snapshot
+
+    def predict(self, timestamp: float) -> PoseSnapshot:
+        self.skipped += 1
+        self._predicted.inc()
+        return self.filter.predict(timestamp)
+
+    def lost(self) -> None:
+        """The model found nobody: forget the motion and infer next frame."""
+
+        self.filter.reset()
+        self.error_rate = math.inf
+        self.skipped = 0
+        self._inferred.inc()
+
+
+def add_adaptive_arguments(
+    parser, default_tolerance: Optional[float], default_beta: Optional[float], unit: str
+) -> None:
+    """Add the smoothing/skip options; None defaults leave the choice to each backend."""
+
+    def shown(default) -> str:
+        return "per backend" if default is None else f"{default:g}"
+
+    parser.add_argument(
+        "--max-skip",
+        type=int,
+        default=DEFAULT_MAX_SKIP,
+        metavar="N",
+        help="Skip inference for up to N frames in a row while motion is predictable and publish "
+        f"extrapolated keypoints instead (default: {DEFAULT_MAX_SKIP}, infer every frame)",
+    )
+    parser.add_argument(
+        "--skip-tolerance",
+        type=float,
+        default=default_tolerance,
+        help=f"Largest expected extrapolation error, in {unit}, that still allows skipping "
+        f"(default: {shown(default_tolerance)})",
+    )
+    parser.add_argument(
+        "--smooth-min-cutoff",
+        type=float,
+        default=DEFAULT_MIN_CUTOFF,
+        help=f"One Euro filter cutoff in Hz at rest; lower is smoother (default: {DEFAULT_MIN_CUTOFF:g})",
+    )
+    parser.add_argument(
+        "--smooth-beta",
+        type=float,
+        default=default_beta,
+        help=f"One Euro filter speed coefficient; higher lags less on fast motion (default: {shown(default_beta)})",
+    )
+
+
+def adaptive_inference_from_args(
+    args, source: str, default_tolerance: Optional[float] = None, default_beta: Optional[float] = None
+) -> Optional[AdaptiveInference]:
+    """The schedule asked for on the command line, or None to infer (unsmoothed) every frame.
+
+    ``default_*`` fill in options left at None by ``add_adaptive_arguments``.
+    """
+
+    if args.max_skip <= 0:
+        return None
+    tolerance = args.skip_tolerance if args.skip_tolerance is not None else default_tolerance
+    beta = args.smooth_beta if args.smooth_beta is not None else default_beta
+    return AdaptiveInference(
+        tolerance,
+        max_skip=args.max_skip,
+        source=source,
+        keypoint_filter=KeypointFilter(
+            min_cutoff=args.smooth_min_cutoff, beta=DEFAULT_BETA if beta is None else beta
+        ),
+    )
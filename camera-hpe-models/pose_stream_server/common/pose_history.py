@@ -0,0 +1,157 @@
+"""Fixed-capacity, time-indexed ring buffers for pose streams.
+
+Every field is stored in a preallocated ``(capacity, *shape)`` array so that
+appending never allocates and history is never copied around. Timestamps must
+be non-decreasing; lookups are a binary search over the two sorted segments
+of the ring, and samples are interpolated to the query time (lerp for plain
+values, slerp for quaternion columns).
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, Mapping, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_SLERP_LINEAR_THRESHOLD = 0.9995
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    shape: Tuple[int, ...]
+    # Columns of the last axis that hold an (x, y, z, w) quaternion.
+    quaternion: Optional[slice] = None
+    dtype: type = np.float32
+
+
+def slerp(q0: np.ndarray, q1: np.ndarray, alpha: float, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Spherical interpolation between two stacks of ``(..., 4)`` quaternions."""
+
+    dot = np.einsum("...i,...i->...", q0, q1)
+    # Take the short way round.
+    sign = np.where(dot < 0.0, -1.0, 1.0).astype(q0.dtype)
+    dot = np.abs(dot)
+
+    theta = np.arccos(np.clip(dot, -1.0, 1.0))
+    sin_theta = np.sin(theta)
+    linear = dot > _SLERP_LINEAR_THRESHOLD
+    safe_sin = np.where(linear, 1.0, sin_theta)
+    w0 = np.where(linear, 1.0 - alpha, np.sin((1.0 - alpha) * theta) / safe_sin)
+    w1 = np.where(linear, alpha, np.sin(alpha * theta) / safe_sin) * sign
+
+    result = np.multiply(q0, w0[..., None], out=out)
+    result += q1 * w1[..., None]
+    norm = np.linalg.norm(result, axis=-1, keepdims=True)
+    np.divide(result, norm, out=result, where=norm > 0.0)
+    return result
+
+
+class PoseRingBuffer:
+    """Ring buffer of timestamped samples made of one or more array fields."""
+
+    def __init__(self, capacity: int, fields: Mapping[str, FieldSpec]) -> None:
+        if capacity < 2:
+            raise ValueError("capacity must be at least 2 to interpolate")
+        self.capacity = capacity
+        self.fields = dict(fields)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.values: Dict[str, np.ndarray] = {
+            name: np.zeros((capacity,) + spec.shape, dtype=spec.dtype) for name, spec in self.fields.items()
+        }
+        self._head = 0  # physical index of the next write
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def clear(self) -> None:
+        self._head = 0
+        self._size = 0
+
+    @property
+    def oldest_timestamp(self) -> Optional[float]:
+        return float(self.timestamps[self._physical(0)]) if self._size else None
+
+    @property
+    def newest_timestamp(self) -> Optional[float]:
+        return float(self.timestamps[self._physical(self._size - 1)]) if self._size else None
+
+    def append(self, timestamp: float, **values: np.ndarray) -> bool:
+        """Copy one sample into the ring. Out-of-order samples are rejected."""
+
+        newest = self.newest_timestamp
+        if newest is not None and timestamp < newest:
+            logger.debug("Dropping out-of-order sample @ %.3f (newest %.3f)", timestamp, newest)
+            return False
+
+        slot = self._head
+        self.timestamps[slot] = timestamp
+        for name, buffer in self.values.items():
+            buffer[slot] = values[name]
+
+        self._head = (self._head + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        return True
+
+    def latest(self) -> Optional[Dict[str, np.ndarray]]:
+        if not self._size:
+            return None
+        slot = self._physical(self._size - 1)
+        return {name: buffer[slot] for name, buffer in self.values.items()}
+
+    def sample(self, timestamp: float) -> Optional[Dict[str, np.ndarray]]:
+        """Return every field interpolated to ``timestamp``.
+
+        Queries outside the buffered range are clamped to the oldest/newest
+        sample rather than extrapolated.
+        """
+
+        if not self._size:
+            return None
+
+        right = self._bisect_right(timestamp)
+        if right == 0:
+            slot = self._physical(0)
+            return {name: buffer[slot].copy() for name, buffer in self.values.items()}
+        if right == self._size:
+            slot = self._physical(self._size - 1)
+            return {name: buffer[slot].copy() for name, buffer in self.values.items()}
+
+        a = self._physical(right - 1)
+        b = self._physical(right)
+        t0 = self.timestamps[a]
+        t1 = self.timestamps[b]
+        alpha = float((timestamp - t0) / (t1 - t0)) if t1 > t0 else 0.0
+
+        sample: Dict[str, np.ndarray] = {}
+        for name, buffer in self.values.items():
+            v0 = buffer[a]
+            v1 = buffer[b]
+            out = v0 + (v1 - v0) * alpha
+            quat = self.fields[name].quaternion
+            if quat is not None:
+                slerp(v0[..., quat], v1[..., quat], alpha, out=out[..., quat])
+            sample[name] = out
+        return sample
+
+    def _physical(self, logical: int) -> int:
+        return (self._head - self._size + logical) % self.capacity
+
+    def _bisect_right(self, timestamp: float) -> int:
+        """Logical index of the first sample strictly newer than ``timestamp``."""
+
+        start = self._physical(0)
+        if start + self._size <= self.capacity:
+            segment = self.timestamps[start : start + self._size]
+            return int(np.searchsorted(segment, timestamp, side="right"))
+
+        # Wrapped: [start, capacity) holds the older half, [0, head) the newer.
+        older = self.timestamps[start:]
+        if timestamp < older[-1]:
+            return int(np.searchsorted(older, timestamp, side="right"))
+        newer = self.timestamps[: self._head]
+        return len(older) + int(np.searchsorted(newer, timestamp, side="right"))
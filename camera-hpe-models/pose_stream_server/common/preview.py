@@ -0,0 +1,140 @@
+"""Off-thread, decimated preview window for the pose servers.
+
+The inference path only calls :meth:`PreviewWorker.offer`, which keeps every
+Nth frame and returns immediately; drawing, ``cv2.imshow`` and
+``cv2.waitKey`` all happen on the preview thread. Servers running with
+``--headless`` simply don't create a worker and skip visualization entirely.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import threading
+from typing import Any, Callable, Optional
+
+from pose_stream_server.common.frame_pool import frame_array, release_frame
+from pose_stream_server.common.pipeline import LatestQueue, StageStats, start_stage
+
+logger = logging.getLogger(__name__)
+
+ESC_KEY = 27
+_POLL_S = 0.1
+
+
+def add_preview_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Skip all visualization work (no preview window)",
+    )
+    parser.add_argument(
+        "--preview-every",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Render only every Nth frame in the preview window (default: 1)",
+    )
+
+
+class PreviewWorker:
+    """Render a sampled subset of frames in an OpenCV window on its own thread.
+
+    ``render(frame, result)`` turns an offered frame and its inference result
+    into the BGR image to show. ``closed`` is set when the user presses ESC or
+    closes the window. Offered frames may be pooled ``FrameBuffer`` objects;
+    ``render`` gets their array and the worker releases them once shown or
+    dropped.
+    """
+
+    def __init__(
+        self,
+        window_name: str,
+        render: Callable[[Any, Any], Any],
+        every: int = 1,
+        stats: Optional[StageStats] = None,
+    ) -> None:
+        self.window_name = window_name
+        self.every = max(1, every)
+        self.stats = stats or StageStats("preview")
+        self.closed = threading.Event()
+        self._render = render
+        self._queue: LatestQueue = LatestQueue(
+            maxsize=1, stats=self.stats, on_drop=lambda item: release_frame(item[0])
+        )
+        self._counter = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "PreviewWorker":
+        self._thread = start_stage(f"preview-{self.window_name}", self._run)
+        return self
+
+    def wants_frame(self) -> bool:
+        """Whether the next offered frame will be rendered.
+
+        Lets callers skip any preparation (copies, conversions) for frames
+        that would be discarded anyway.
+        """
+
+        return self._counter % self.every == 0
+
+    def offer(self, frame, result) -> bool:
+        """Queue ``frame`` for display if it falls on the sampling cadence.
+
+        Ownership of ``frame`` passes to the worker when accepted, so callers
+        must not reuse that buffer afterwards; a rejected frame stays with the
+        caller (and must be released by it if pooled).
+        """
+
+        accepted = self.wants_frame()
+        self._counter += 1
+        if accepted:
+            if self.closed.is_set():
+                release_frame(frame)
+            else:
+                self._queue.put((frame, result))
+        return accepted
+
+    def stop(self, timeout: float = 1.0) -> None:
+        self.closed.set()
+        self._queue.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        import cv2
+
+        cv2.namedWindow(self.window_name, cv2.WINDOW_NORMAL)
+        shown = False
+        try:
+            while not self.closed.is_set():
+                item = self._queue.get(timeout=_POLL_S)
+                if item is not None:
+                    frame, result = item
+                    try:
+                        cv2.imshow(self.window_name, self._render(frame_array(frame), result))
+                    finally:
+                        release_frame(frame)
+                    self.stats.tick()
+                    shown = True
+
+                if cv2.waitKey(5) & 0xFF == ESC_KEY:
+                    logger.info("ESC pressed in %s", self.window_name)
+                    self.closed.set()
+                elif shown and cv2.getWindowProperty(self.window_name, cv2.WND_PROP_VISIBLE) < 1:
+                    self.closed.set()
+        finally:
+            cv2.destroyWindow(self.window_name)
+
+
+def create_preview(
+    args: argparse.Namespace,
+    window_name: str,
+    render: Callable[[Any, Any], Any],
+    stats: Optional[StageStats] = None,
+) -> Optional[PreviewWorker]:
+    """Start a preview worker unless the server runs ``--headless``."""
+
+    if args.headless:
+        return None
+    return PreviewWorker(window_name, render, every=args.preview_every, stats=stats).start()
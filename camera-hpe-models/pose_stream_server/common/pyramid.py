@@ -0,0 +1,152 @@
+"""Per-stage input resolutions: downscaled detection and ROI-cropped pose.
+
+Detectors only need a coarse view of the frame and pose models resize
+their input to a fixed, small tensor anyway, so handing either of them the
+full camera frame mostly buys pixel copies. A :class:`ResolutionPyramid`
+prepares each stage's input instead:
+
+``detection_input``
+    the frame downscaled so its long side is ``detect_size``;
+``roi_input``
+    the person box, padded and widened to the model's aspect ratio, cut
+    out and resized to ``roi_size`` in one ``cv2.warpAffine`` (parts of the
+    box outside the frame come out black, as in mmpose's own affine).
+
+Both return a :class:`FrameTransform` that maps stage coordinates back to
+the full frame with one multiply-add over the whole keypoint array. Stage
+images live in pooled buffers the caller releases once the model is done.
+"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from pose_stream_server.common.frame_pool import FrameBuffer, FramePool
+
+Size = Tuple[int, int]
+
+
+@dataclass(frozen=True)
+class FrameTransform:
+    """``frame = stage * scale + offset`` for x/y coordinates."""
+
+    scale: Tuple[float, float] = (1.0, 1.0)
+    offset: Tuple[float, float] = (0.0, 0.0)
+
+    @property
+    def identity(self) -> bool:
+        return self.scale == (1.0, 1.0) and self.offset == (0.0, 0.0)
+
+    def to_frame(self, points: np.ndarray) -> np.ndarray:
+        """Map ``(..., 2+)`` points; columns past x/y (scores, z) are kept as is."""
+
+        points = np.array(points, dtype=np.float32)
+        if not self.identity:
+            points[..., :2] *= np.asarray(self.scale, dtype=np.float32)
+            points[..., :2] += np.asarray(self.offset, dtype=np.float32)
+        return points
+
+    def boxes_to_frame(self, boxes: np.ndarray) -> np.ndarray:
+        """Map ``(N, 4)`` xyxy boxes."""
+
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 2, 2)
+        return self.to_frame(boxes).reshape(-1, 4)
+
+
+IDENTITY = FrameTransform()
+
+
+def parse_size(value: str) -> Size:
+    """argparse type for ``WIDTHxHEIGHT``."""
+
+    try:
+        width, height = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {value!r}") from None
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"size must be positive, got {value!r}")
+    return width, height
+
+
+def roi_box(bbox: Sequence[float], aspect: float, padding: float = 1.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Center and ``(w, h)`` of ``bbox`` scaled by ``padding`` and widened to ``aspect`` (w / h)."""
+
+    x1, y1, x2, y2 = (float(v) for v in bbox[:4])
+    center = np.array([(x1 + x2) * 0.5, (y1 + y2) * 0.5], dtype=np.float32)
+    width = max(x2 - x1, 1.0) * padding
+    height = max(y2 - y1, 1.0) * padding
+    if width > height * aspect:
+        height = width / aspect
+    else:
+        width = height * aspect
+    return center, np.array([width, height], dtype=np.float32)
+
+
+class ResolutionPyramid:
+    """Stage inputs for one backend; 0 / None leave a stage at full resolution.
+
+    ``padding`` widens ROI crops around the box, matching whatever context
+    the pose model adds around a box itself.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        detect_size: int = 0,
+        roi_size: Optional[Size] = None,
+        padding: float = 1.0,
+    ) -> None:
+        self.name = name
+        self.detect_size = detect_size
+        self.roi_size = roi_size
+        self.padding = padding
+        self._detect_pool = FramePool(f"{name}-detect", capacity=1)
+        self._roi_pool = FramePool(f"{name}-roi", capacity=1)
+
+    @property
+    def crops(self) -> bool:
+        return self.roi_size is not None
+
+    def detection_input(self, frame: np.ndarray) -> Tuple[Optional[FrameBuffer], np.ndarray, FrameTransform]:
+        """``(buffer, image, transform)``; ``buffer`` is None when ``image`` is ``frame``."""
+
+        height, width = frame.shape[:2]
+        ratio = self.detect_size / max(height, width) if self.detect_size else 1.0
+        if ratio >= 1.0:
+            return None, frame, IDENTITY
+        size = (max(1, round(width * ratio)), max(1, round(height * ratio)))
+        buffer = self._detect_pool.acquire((size[1], size[0]) + frame.shape[2:])
+        # Bilinear like the detector's own letterbox; INTER_AREA is ~7x slower.
+        cv2.resize(frame, size, dst=buffer.array, interpolation=cv2.INTER_LINEAR)
+        # Exact per-axis ratios, since both sides were rounded.
+        return buffer, buffer.array, FrameTransform((width / size[0], height / size[1]))
+
+    def roi_input(self, frame: np.ndarray, bbox: Sequence[float]) -> Tuple[FrameBuffer, FrameTransform]:
+        """Crop ``bbox`` (full-frame xyxy) to ``roi_size``."""
+
+        out_w, out_h = self.roi_size
+        center, size = roi_box(bbox, out_w / out_h, self.padding)
+        scale = size / np.array([out_w, out_h], dtype=np.float32)
+        offset = center - size * 0.5
+        # Inverse of ``frame = crop * scale + offset``.
+        warp = np.array(
+            [[1.0 / scale[0], 0.0, -offset[0] / scale[0]], [0.0, 1.0 / scale[1], -offset[1] / scale[1]]],
+            dtype=np.float64,
+        )
+        buffer = self._roi_pool.acquire((out_h, out_w) + frame.shape[2:])
+        # Bilinear, like mmpose's TopdownAffine, so crops look as they did.
+        cv2.warpAffine(
+            frame,
+            warp,
+            (out_w, out_h),
+            dst=buffer.array,
+            flags=cv2.INTER_LINEAR,
+            borderMode=cv2.BORDER_CONSTANT,
+            borderValue=0,
+        )
+        return buffer, FrameTransform((float(scale[0]), float(scale[1])), (float(offset[0]), float(offset[1])))
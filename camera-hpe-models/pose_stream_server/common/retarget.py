@@ -0,0 +1,397 @@
+"""Camera keypoints to Quest tracking space.
+
+Shared joints
+    ``SHARED_JOINTS`` lists the body joints every source can see, with the
+    MediaPipe landmark, COCO keypoint (the first 17 SynthPose outputs) and
+    OVR bone that stand for each. ``joint_map`` resolves that table against
+    a concrete pair of layouts once and caches the index arrays.
+
+    OVR bone names are ambiguous on the wire: ``OVRSkeleton.BoneId`` has
+    several aliases per value (Body_*, FullBody_*, Hand_*, XRHand_*) and
+    ``ToString()`` may pick any of them, so the Head can arrive as
+    ``Hand_Index2``. Bones are looked up by their Body_/FullBody_ name first
+    and otherwise by bone ID, which is the joint's position in the packet.
+
+Calibration
+    :class:`QuestAlignment` keeps a sliding window of (camera, Quest)
+    correspondences sampled at the same host time and solves a weighted
+    Umeyama similarity (rotation, scale, translation) over all of them with
+    one SVD. The result is cached; each new frame is only checked against it
+    and the window is re-solved once the residual has grown more than a
+    threshold past the residual of the fit itself.
+    Mapping a frame into Quest space is then one ``(K, 3) @ (3, 3)`` product.
+
+Fusion
+    ``merge_camera_joints`` writes camera joints, already in Quest space,
+    over the Quest rows the headset does not track: the legs (the Quest
+    only generates them from the upper body) and any joint whose Quest
+    confidence is low. Rotations stay the Quest's; cameras give none.
+
+    Unity's tracking space is left-handed while MediaPipe world landmarks
+    and OpenCV image/camera coordinates are right-handed, so the solve is
+    for an improper rotation (det -1) by default.
+
+    MediaPipe world landmarks are hip-centred: their origin moves with the
+    wearer, so no fixed transform can follow them through the room. A
+    source whose hip midpoint sits at its origin is detected on its first
+    frame. For such a source the Quest side is made hip-relative too: only
+    rotation and scale are fitted, and the Quest hip midpoint at the same
+    instant is added back when mapping (``to_quest(..., anchor=...)``).
+    Sources with a fixed origin (pixels, triangulated points) keep the full
+    similarity fit.
+"""
+
+from __future__ import annotations
+
+import functools
+import logging
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+from pose_stream_server.common.metrics import REGISTRY
+from pose_stream_server.udp_pose_receiver.quest_packet import POSITION, JointLayout
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW = 90
+DEFAULT_MIN_FRAMES = 30
+# Growth of the weighted RMS residual, in metres, that triggers a re-solve.
+DEFAULT_DRIFT_THRESHOLD = 0.05
+# Smoothing of the per-frame residual before it is compared with the threshold.
+DRIFT_SMOOTHING = 0.1
+MIN_VISIBILITY = 0.5
+MIN_SHARED_JOINTS = 4
+# A camera hip midpoint closer than this to the origin means hip-centred data.
+HIP_ORIGIN_TOLERANCE_M = 0.01
+
+
+@dataclass(frozen=True)
+class SharedJoint:
+    name: str
+    mediapipe: str
+    coco: Optional[int]
+    quest: str
+    quest_bone_id: int
+
+
+SHARED_JOINTS: Tuple[SharedJoint, ...] = (
+    SharedJoint("left_shoulder", "left_shoulder", 5, "LeftArmUpper", 10),
+    SharedJoint("right_shoulder", "right_shoulder", 6, "RightArmUpper", 15),
+    SharedJoint("left_elbow", "left_elbow", 7, "LeftArmLower", 11),
+    SharedJoint("right_elbow", "right_elbow", 8, "RightArmLower", 16),
+    SharedJoint("left_wrist", "left_wrist", 9, "LeftHandWrist", 19),
+    SharedJoint("right_wrist", "right_wrist", 10, "RightHandWrist", 45),
+    SharedJoint("left_hip", "left_hip", 11, "LeftUpperLeg", 70),
+    SharedJoint("right_hip", "right_hip", 12, "RightUpperLeg", 77),
+    SharedJoint("left_knee", "left_knee", 13, "LeftLowerLeg", 71),
+    SharedJoint("right_knee", "right_knee", 14, "RightLowerLeg", 78),
+    SharedJoint("left_ankle", "left_ankle", 15, "LeftFootAnkle", 73),
+    SharedJoint("right_ankle", "right_ankle", 16, "RightFootAnkle", 80),
+    SharedJoint("left_foot", "left_foot_index", None, "LeftFootBall", 76),
+    SharedJoint("right_foot", "right_foot_index", None, "RightFootBall", 83),
+)
+# Joints the Quest infers rather than tracks; the camera wins on these.
+LOWER_BODY_JOINTS = frozenset(
+    ("left_hip", "right_hip", "left_knee", "right_knee", "left_ankle", "right_ankle", "left_foot", "right_foot")
+)
+
+
+@dataclass(frozen=True)
+class JointMap:
+    """Index arrays pairing rows of a camera layout with rows of a Quest layout."""
+
+    names: Tuple[str, ...]
+    camera: np.ndarray
+    quest: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+def _camera_index(layout: JointLayout, joint: SharedJoint) -> Optional[int]:
+    index = layout.index.get(joint.mediapipe)
+    if index is None and joint.coco is not None:
+        index = layout.index.get(f"synthpose_kpt_{joint.coco}")
+    return index
+
+
+def _quest_index(layout: JointLayout, joint: SharedJoint) -> Optional[int]:
+    for prefix in ("Body_", "FullBody_"):
+        index = layout.index.get(prefix + joint.quest)
+        if index is not None:
+            return index
+    return joint.quest_bone_id if joint.quest_bone_id < len(layout) else None
+
+
+@functools.lru_cache(maxsize=None)
+def joint_map(camera_layout: JointLayout, quest_layout: JointLayout) -> JointMap:
+    """Shared joints present in both layouts (layouts are cached singletons)."""
+
+    names, camera, quest = [], [], []
+    for joint in SHARED_JOINTS:
+        c = _camera_index(camera_layout, joint)
+        q = _quest_index(quest_layout, joint)
+        if c is not None and q is not None:
+            names.append(joint.name)
+            camera.append(c)
+            quest.append(q)
+    return JointMap(tuple(names), np.asarray(camera, dtype=np.intp), np.asarray(quest, dtype=np.intp))
+
+
+@functools.lru_cache(maxsize=None)
+def lower_body_mask(camera_layout: JointLayout, quest_layout: JointLayout) -> np.ndarray:
+    """Which ``joint_map`` pairs are lower-body joints."""
+
+    mapping = joint_map(camera_layout, quest_layout)
+    return np.array([name in LOWER_BODY_JOINTS for name in mapping.names], dtype=bool)
+
+
+def merge_camera_joints(
+    poses: np.ndarray,
+    confidences: np.ndarray,
+    quest_layout: JointLayout,
+    camera: np.ndarray,
+    camera_layout: JointLayout,
+) -> int:
+    """Overwrite untracked Quest rows with visible camera joints, in place.
+
+    ``camera`` is a ``(K, 4)`` snapshot array already mapped into Quest
+    space (``QuestAlignment.to_quest``). Replaced rows take the camera's
+    visibility as their confidence. Returns how many rows were replaced.
+    """
+
+    mapping = joint_map(camera_layout, quest_layout)
+    if not len(mapping):
+        return 0
+    rows = camera[mapping.camera]
+    untracked = lower_body_mask(camera_layout, quest_layout) | (confidences[mapping.quest] < MIN_VISIBILITY)
+    take = untracked & (rows[:, 3] >= MIN_VISIBILITY)
+    quest_rows = mapping.quest[take]
+    poses[quest_rows, POSITION] = rows[take, :3]
+    confidences[quest_rows] = rows[take, 3]
+    return len(quest_rows)
+
+
+_HIPS = tuple(joint for joint in SHARED_JOINTS if joint.name in ("left_hip", "right_hip"))
+
+
+def camera_hip_midpoint(camera: np.ndarray, layout: JointLayout) -> Optional[np.ndarray]:
+    """Midpoint of the two hips in a ``(K, 4)`` camera array, if both are in ``layout``."""
+
+    rows = [_camera_index(layout, joint) for joint in _HIPS]
+    if None in rows:
+        return None
+    return camera[rows, :3].mean(axis=0)
+
+
+def quest_hip_midpoint(poses: np.ndarray, layout: JointLayout) -> Optional[np.ndarray]:
+    """Midpoint of the two upper-leg bones in ``(J, 7)`` Quest poses, if both are in ``layout``."""
+
+    rows = [_quest_index(layout, joint) for joint in _HIPS]
+    if None in rows:
+        return None
+    return poses[rows, POSITION].mean(axis=0)
+
+
+def umeyama(
+    src: np.ndarray, dst: np.ndarray, weights: np.ndarray, reflect: bool = True
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Weighted similarity fit ``dst ~ scale * R @ src + t`` over any batch.
+
+    ``src``/``dst`` are ``(..., N, 3)`` and ``weights`` ``(..., N)``; every
+    leading index is an independent problem and all of them share one
+    batched SVD. With ``reflect`` the rotation is constrained to det -1
+    (handedness change), otherwise to det +1. Returns ``(R, scale, t)`` with
+    shapes ``(..., 3, 3)``, ``(...)`` and ``(..., 3)``.
+    """
+
+    src = np.asarray(src, dtype=np.float64)
+    dst = np.asarray(dst, dtype=np.float64)
+    w = np.asarray(weights, dtype=np.float64)
+    total = np.maximum(w.sum(axis=-1), 1e-12)
+    w = w / total[..., None]
+
+    mu_src = np.einsum("...n,...ni->...i", w, src)
+    mu_dst = np.einsum("...n,...ni->...i", w, dst)
+    src_c = src - mu_src[..., None, :]
+    dst_c = dst - mu_dst[..., None, :]
+
+    cov = np.einsum("...n,...ni,...nj->...ij", w, dst_c, src_c)
+    u, sigma, vt = np.linalg.svd(cov)
+    target = -1.0 if reflect else 1.0
+    d = np.where(np.linalg.det(u) * np.linalg.det(vt) * target < 0.0, -1.0, 1.0)
+    sigma[..., 2] *= d
+    u[..., :, 2] *= d[..., None]
+    rotation = u @ vt
+
+    var_src = np.einsum("...n,...ni,...ni->...", w, src_c, src_c)
+    scale = sigma.sum(axis=-1) / np.maximum(var_src, 1e-12)
+    translation = mu_dst - scale[..., None] * np.einsum("...ij,...j->...i", rotation, mu_src)
+    return rotation, scale, translation
+
+
+class QuestAlignment:
+    """Online camera-to-Quest similarity transform for one camera source.
+
+    ``hip_centred`` None detects it from the first frame (see the module
+    docstring); True or False forces the mode.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        window: int = DEFAULT_WINDOW,
+        min_frames: int = DEFAULT_MIN_FRAMES,
+        drift_threshold: float = DEFAULT_DRIFT_THRESHOLD,
+        reflect: bool = True,
+        hip_centred: Optional[bool] = None,
+    ) -> None:
+        self.source = source
+        self.hip_centred = hip_centred
+        self._detect_origin = hip_centred is None
+        self.window = window
+        self.min_frames = min(min_frames, window)
+        self.drift_threshold = drift_threshold
+        self.reflect = reflect
+        self.residual = float("inf")
+        self.fit_residual = float("inf")
+        self.solves = 0
+
+        # (3, 3) so that row vectors map with one ``points @ linear``.
+        self.linear: Optional[np.ndarray] = None
+        self.translation: Optional[np.ndarray] = None
+        self._map: Optional[JointMap] = None
+        self._camera: Optional[np.ndarray] = None
+        self._quest: Optional[np.ndarray] = None
+        self._weights: Optional[np.ndarray] = None
+        self._head = 0
+        self._size = 0
+        self._solve_counter = REGISTRY.counter(
+            "pose_calibration_solves_total", "Camera-to-Quest alignment solves", source=source
+        )
+
+    @property
+    def calibrated(self) -> bool:
+        return self.linear is not None
+
+    def observe(
+        self,
+        camera: np.ndarray,
+        camera_layout: JointLayout,
+        quest_poses: np.ndarray,
+        quest_confidences: np.ndarray,
+        quest_layout: JointLayout,
+    ) -> None:
+        """Add one time-aligned frame and re-solve if the cached transform drifted.
+
+        ``camera`` is a ``(K, 4)`` (x, y, z, visibility) snapshot array and
+        ``quest_poses`` the ``(J, 7)`` Quest joint poses at the same instant.
+        """
+
+        mapping = joint_map(camera_layout, quest_layout)
+        if len(mapping) < MIN_SHARED_JOINTS:
+            return
+        if mapping is not self._map:
+            self._reset(mapping)
+        if self.hip_centred is None:
+            self._detect_hip_centred(camera, camera_layout, quest_layout)
+        anchor = None
+        if self.hip_centred:
+            anchor = quest_hip_midpoint(quest_poses, quest_layout)
+            if anchor is None:
+                return
+
+        rows = camera[mapping.camera]
+        slot = self._head
+        self._camera[slot] = rows[:, :3]
+        self._quest[slot] = quest_poses[mapping.quest, POSITION]
+        if anchor is not None:
+            self._quest[slot] -= anchor
+        visibility = np.where(rows[:, 3] >= MIN_VISIBILITY, rows[:, 3], 0.0)
+        self._weights[slot] = visibility * quest_confidences[mapping.quest]
+        self._head = (slot + 1) % self.window
+        self._size = min(self._size + 1, self.window)
+
+        if self.calibrated:
+            residual = self._residual(slot)
+            self.residual += DRIFT_SMOOTHING * (residual - self.residual)
+            if self.residual <= self.fit_residual + self.drift_threshold:
+                return
+        if self._size >= self.min_frames:
+            self._solve()
+
+    def to_quest(
+        self, points: np.ndarray, out: Optional[np.ndarray] = None, anchor: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Map ``(..., 3)`` camera points into Quest tracking space.
+
+        For a hip-centred source ``anchor`` is the Quest hip midpoint at the
+        points' instant (``quest_hip_midpoint``); without it the result is
+        relative to the Quest hips.
+        """
+
+        out = np.matmul(points, self.linear, out=out)
+        out += self.translation
+        if anchor is not None:
+            out += anchor
+        return out
+
+    def _detect_hip_centred(self, camera: np.ndarray, camera_layout: JointLayout, quest_layout: JointLayout) -> None:
+        origin = camera_hip_midpoint(camera, camera_layout)
+        hip_centred = origin is not None and float(np.linalg.norm(origin)) < HIP_ORIGIN_TOLERANCE_M
+        if hip_centred and any(_quest_index(quest_layout, joint) is None for joint in _HIPS):
+            logger.warning("%s is hip-centred but the Quest layout has no hips; using a fixed transform", self.source)
+            hip_centred = False
+        self.hip_centred = hip_centred
+        logger.info("Aligning %s as a %s source", self.source, "hip-centred" if hip_centred else "fixed-origin")
+
+    def _reset(self, mapping: JointMap) -> None:
+        n = len(mapping)
+        self._map = mapping
+        self._camera = np.zeros((self.window, n, 3), dtype=np.float32)
+        self._quest = np.zeros((self.window, n, 3), dtype=np.float32)
+        self._weights = np.zeros((self.window, n), dtype=np.float32)
+        self._head = 0
+        self._size = 0
+        if self._detect_origin:
+            self.hip_centred = None
+        self.linear = None
+        self.translation = None
+        self.residual = float("inf")
+        self.fit_residual = float("inf")
+
+    def _residual(self, slot: int) -> float:
+        weights = self._weights[slot]
+        total = weights.sum()
+        if total <= 0.0:
+            return self.residual
+        error = self.to_quest(self._camera[slot]) - self._quest[slot]
+        return float(np.sqrt(np.einsum("n,ni,ni->", weights, error, error) / total))
+
+    def _solve(self) -> None:
+        n = self._size
+        # Every correspondence in the window goes into one weighted fit.
+        camera = self._camera[:n].reshape(-1, 3)
+        quest = self._quest[:n].reshape(-1, 3)
+        weights = self._weights[:n].reshape(-1)
+        if np.count_nonzero(weights) < MIN_SHARED_JOINTS:
+            return
+
+        rotation, scale, translation = umeyama(camera, quest, weights, reflect=self.reflect)
+        self.linear = (scale * rotation).T.astype(np.float32)
+        self.translation = translation.astype(np.float32)
+
+        error = self.to_quest(camera) - quest
+        self.fit_residual = float(np.sqrt(np.einsum("n,ni,ni->", weights, error, error) / weights.sum()))
+        self.residual = self.fit_residual
+        self.solves += 1
+        self._solve_counter.inc()
+        logger.info(
+            "Aligned %s to Quest space over %d frames (scale %.4f, residual %.3f m)",
+            self.source,
+            n,
+            scale,
+            self.fit_residual,
+        )
@@ -0,0 +1,392 @@
+"""Record live sessions to a memory-mapped log and replay them later.
+
+A session is two files:
+
+``<name>.poselog``
+    Append-only records written through an ``mmap`` that grows in chunks.
+    Each record is a 16-byte header (host timestamp, payload length, kind)
+    followed by the payload, padded to 8 bytes.
+``<name>.poselog.idx``
+    One ``(timestamp, offset, kind)`` entry per record, so readers can
+    binary-search a time range and jump straight to it without scanning the
+    log.
+
+Quest datagrams are stored exactly as received (raw msgpack plus sender
+address); pose snapshots are stored as their ``(K, 4)`` float32 array with
+references to a keypoint-name table recorded once per layout and to the
+name of the source that produced them (recorded once per source), so a
+session with several camera sources replays into the same sources.
+Version 1 logs, which predate source names, replay into the default source;
+version 1 and 2 logs, which predate snapshot kinds, replay as measured.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import mmap
+import struct
+import threading
+import time
+from typing import Dict, Iterator, NamedTuple, Optional, Sequence, Tuple
+
+import msgpack
+import numpy as np
+
+from pose_stream_server.common.fusion_workspace import (
+    DEFAULT_SOURCE,
+    LANDMARK_WIDTH,
+    MEASURED,
+    PREDICTED,
+    FusionWorkspace,
+    PoseSnapshot,
+)
+from pose_stream_server.udp_pose_receiver.quest_packet import JointLayout, QuestPacketDecoder, get_joint_layout
+from pose_stream_server.udp_pose_receiver.skeleton_codec import SkeletonDecoder, is_skeleton_datagram
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"POSELOG\x00"
+VERSION = 3
+SUPPORTED_VERSIONS = (1, 2, 3)
+# magic, version, data_end
+FILE_HEADER = struct.Struct("<8sIQ4x")
+# host timestamp, payload length, kind
+RECORD_HEADER = struct.Struct("<dIB3x")
+# original snapshot timestamp, layout ref, source ref, keypoint count, flags
+SNAPSHOT_HEADER = struct.Struct("<dHHHH")
+# Version 2: original snapshot timestamp, layout ref, source ref, keypoint count
+SNAPSHOT_HEADER_V2 = struct.Struct("<dHHH")
+# Version 1: original snapshot timestamp, layout ref, keypoint count
+SNAPSHOT_HEADER_V1 = struct.Struct("<dHH")
+# Snapshot header flags
+FLAG_PREDICTED = 0x01
+INDEX_DTYPE = np.dtype([("timestamp", "<f8"), ("offset", "<u8"), ("kind", "<u8")])
+INDEX_ENTRY = struct.Struct("<dQQ")
+
+KIND_QUEST_DATAGRAM = 1
+KIND_POSE_SNAPSHOT = 2
+KIND_LAYOUT = 3
+KIND_SOURCE = 4
+# Name tables, read up front rather than yielded as records.
+TABLE_KINDS = (KIND_LAYOUT, KIND_SOURCE)
+
+DEFAULT_CHUNK_SIZE = 16 << 20
+
+
+def _index_path(path: str) -> str:
+    return path + ".idx"
+
+
+def _aligned(size: int) -> int:
+    return (size + 7) & ~7
+
+
+class SessionRecorder:
+    """Thread-safe writer for Quest datagrams and pose snapshots."""
+
+    def __init__(self, path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        self.path = path
+        self._chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self._file = open(path, "w+b")
+        self._file.truncate(chunk_size)
+        self._mm = mmap.mmap(self._file.fileno(), chunk_size)
+        self._index = open(_index_path(path), "wb")
+        self._pos = FILE_HEADER.size
+        self._last_ts = 0.0
+        self._layout_refs: Dict[int, int] = {}
+        self._source_refs: Dict[str, int] = {}
+        self.records = 0
+        self._write_file_header()
+        logger.info("Recording session to %s", path)
+
+    # Public hooks
+    def record_quest_datagram(self, data: bytes, addr: Tuple[str, int]) -> None:
+        host, port = addr[0], addr[1]
+        self._append(KIND_QUEST_DATAGRAM, msgpack.packb([host, port, data], use_bin_type=True))
+
+    def record_snapshot(self, snapshot: PoseSnapshot, source: str = DEFAULT_SOURCE) -> None:
+        data = np.ascontiguousarray(snapshot.data, dtype=np.float32)
+        with self._lock:
+            ref = self._layout_ref(snapshot.layout)
+            source_ref = self._source_ref(source)
+            flags = FLAG_PREDICTED if snapshot.kind == PREDICTED else 0
+            header = SNAPSHOT_HEADER.pack(snapshot.timestamp, ref, source_ref, len(snapshot.layout), flags)
+            self._append_locked(KIND_POSE_SNAPSHOT, header, memoryview(data).cast("B"))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._mm is None:
+                return
+            self._write_file_header()
+            self._mm.flush()
+            self._mm.close()
+            self._mm = None
+            self._file.truncate(self._pos)
+            self._file.close()
+            self._index.close()
+        logger.info("Closed session %s (%d records, %d bytes)", self.path, self.records, self._pos)
+
+    def __enter__(self) -> "SessionRecorder":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # Internals
+    def _layout_ref(self, layout: JointLayout) -> int:
+        # Layouts are cached singletons, so identity is a stable key.
+        ref = self._layout_refs.get(id(layout))
+        if ref is None:
+            ref = len(self._layout_refs)
+            self._layout_refs[id(layout)] = ref
+            self._append_locked(KIND_LAYOUT, msgpack.packb([ref, list(layout.names)]))
+        return ref
+
+    def _source_ref(self, source: str) -> int:
+        ref = self._source_refs.get(source)
+        if ref is None:
+            ref = len(self._source_refs)
+            self._source_refs[source] = ref
+            self._append_locked(KIND_SOURCE, msgpack.packb([ref, source]))
+        return ref
+
+    def _append(self, kind: int, *parts) -> None:
+        with self._lock:
+            self._append_locked(kind, *parts)
+
+    def _append_locked(self, kind: int, *parts) -> None:
+        if self._mm is None:
+            return
+        length = sum(len(part) for part in parts)
+        needed = self._pos + _aligned(RECORD_HEADER.size + length)
+        if needed > len(self._mm):
+            self._grow(needed)
+
+        # Index timestamps must stay sorted for binary search.
+        timestamp = max(time.time(), self._last_ts)
+        self._last_ts = timestamp
+
+        RECORD_HEADER.pack_into(self._mm, self._pos, timestamp, length, kind)
+        cursor = self._pos + RECORD_HEADER.size
+        for part in parts:
+            self._mm[cursor : cursor + len(part)] = part
+            cursor += len(part)
+        self._index.write(INDEX_ENTRY.pack(timestamp, self._pos, kind))
+
+        self._pos = needed
+        self.records += 1
+
+    def _grow(self, needed: int) -> None:
+        size = len(self._mm)
+        while size < needed:
+            size += self._chunk_size
+        self._write_file_header()
+        self._mm.flush()
+        self._mm.close()
+        self._file.truncate(size)
+        self._mm = mmap.mmap(self._file.fileno(), size)
+        self._index.flush()
+
+    def _write_file_header(self) -> None:
+        FILE_HEADER.pack_into(self._mm, 0, MAGIC, VERSION, self._pos)
+
+
+class Record(NamedTuple):
+    kind: int
+    timestamp: float
+    payload: memoryview
+
+
+class SessionReader:
+    """Random access over a recorded session via its timestamp index."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _ = FILE_HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a pose session log")
+        if version not in SUPPORTED_VERSIONS:
+            raise ValueError(f"Unsupported session log version {version}")
+        self.version = version
+
+        index = np.fromfile(_index_path(path), dtype=INDEX_DTYPE)
+        # Drop entries pointing past the mapped data (e.g. after a crash).
+        self.index = index[index["offset"] + RECORD_HEADER.size <= len(self._mm)]
+
+        self._layouts: Dict[int, JointLayout] = {}
+        self._skeleton_decoders: Dict[Tuple[str, int], SkeletonDecoder] = {}
+        self._packet_decoder = QuestPacketDecoder()
+        for offset in self.index["offset"][self.index["kind"] == KIND_LAYOUT]:
+            ref, names = msgpack.unpackb(self._payload(int(offset))[1], raw=False)
+            self._layouts[ref] = get_joint_layout(names)
+        self.sources: Dict[int, str] = {}
+        for offset in self.index["offset"][self.index["kind"] == KIND_SOURCE]:
+            ref, source = msgpack.unpackb(self._payload(int(offset))[1], raw=False)
+            self.sources[ref] = source
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def time_range(self) -> Tuple[float, float]:
+        if not len(self.index):
+            return (0.0, 0.0)
+        return float(self.index["timestamp"][0]), float(self.index["timestamp"][-1])
+
+    def records(self, start: Optional[float] = None, end: Optional[float] = None) -> Iterator[Record]:
+        """Yield records with ``start <= timestamp <= end`` in recording order."""
+
+        timestamps = self.index["timestamp"]
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, side="left"))
+        hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side="right"))
+        for entry in self.index[lo:hi]:
+            kind, payload = self._payload(int(entry["offset"]))
+            if kind not in TABLE_KINDS:
+                yield Record(kind, float(entry["timestamp"]), payload)
+
+    def decode_quest(self, record: Record):
+        """Return ``(packet, addr)``; packet is None for skeleton deltas that
+        cannot be decoded yet (records read out of order or mid-stream)."""
+
+        host, port, data = msgpack.unpackb(record.payload, raw=False)
+        if is_skeleton_datagram(data):
+            decoder = self._skeleton_decoders.setdefault((host, port), SkeletonDecoder())
+            return decoder.decode(data), (host, port)
+        return self._packet_decoder.decode(data), (host, port)
+
+    def decode_snapshot(self, record: Record, time_shift: float = 0.0) -> Tuple[PoseSnapshot, str]:
+        """Return ``(snapshot, source)``."""
+
+        flags = 0
+        if self.version == 1:
+            timestamp, ref, count = SNAPSHOT_HEADER_V1.unpack_from(record.payload, 0)
+            source, header_size = DEFAULT_SOURCE, SNAPSHOT_HEADER_V1.size
+        elif self.version == 2:
+            timestamp, ref, source_ref, count = SNAPSHOT_HEADER_V2.unpack_from(record.payload, 0)
+            source, header_size = self.sources[source_ref], SNAPSHOT_HEADER_V2.size
+        else:
+            timestamp, ref, source_ref, count, flags = SNAPSHOT_HEADER.unpack_from(record.payload, 0)
+            source, header_size = self.sources[source_ref], SNAPSHOT_HEADER.size
+        data = np.frombuffer(record.payload, dtype=np.float32, count=count * LANDMARK_WIDTH, offset=header_size)
+        kind = PREDICTED if flags & FLAG_PREDICTED else MEASURED
+        snapshot = PoseSnapshot(
+            timestamp + time_shift,
+            data.reshape(count, LANDMARK_WIDTH).copy(),
+            self._layouts[ref],
+            kind=kind,
+        )
+        return snapshot, source
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def _payload(self, offset: int) -> Tuple[int, memoryview]:
+        _, length, kind = RECORD_HEADER.unpack_from(self._mm, offset)
+        start = offset + RECORD_HEADER.size
+        return kind, memoryview(self._mm)[start : start + length]
+
+
+class SessionReplayer:
+    """Feed a recorded session back into a :class:`FusionWorkspace`."""
+
+    def __init__(self, reader: SessionReader, workspace: FusionWorkspace) -> None:
+        self.reader = reader
+        self.workspace = workspace
+
+    def replay(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        realtime: bool = True,
+        speed: float = 1.0,
+    ) -> int:
+        """Replay ``[start, end]``; returns the number of records delivered.
+
+        In real-time mode records are paced by their original spacing (scaled
+        by ``speed``) and timestamps are shifted onto the current clock; in
+        max-speed mode records are delivered back to back with their
+        original timestamps.
+        """
+
+        count = 0
+        first_ts: Optional[float] = None
+        wall_start = time.time()
+        perf_start = time.perf_counter()
+        shift = 0.0
+
+        for record in self.reader.records(start, end):
+            if first_ts is None:
+                first_ts = record.timestamp
+                if realtime:
+                    shift = wall_start - first_ts
+
+            if realtime:
+                delay = (record.timestamp - first_ts) / speed - (time.perf_counter() - perf_start)
+                if delay > 0:
+                    time.sleep(delay)
+
+            self._deliver(record, shift)
+            count += 1
+        return count
+
+    def _deliver(self, record: Record, shift: float) -> None:
+        if record.kind == KIND_QUEST_DATAGRAM:
+            packet, addr = self.reader.decode_quest(record)
+            if packet is not None:
+                self.workspace.handle_quest_packet(packet, addr, received_at=record.timestamp + shift)
+        elif record.kind == KIND_POSE_SNAPSHOT:
+            snapshot, source = self.reader.decode_snapshot(record, shift)
+            self.workspace.update_lower_body(snapshot, source)
+
+
+# CLI entrypoint
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Inspect or replay a recorded pose session")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    info = sub.add_parser("info", help="Print record counts and time range")
+    info.add_argument("path")
+
+    replay = sub.add_parser("replay", help="Replay a session into a FusionWorkspace")
+    replay.add_argument("path")
+    replay.add_argument("--start", type=float, default=None, help="Start offset in seconds from session start")
+    replay.add_argument("--end", type=float, default=None, help="End offset in seconds from session start")
+    replay.add_argument("--max-speed", action="store_true", help="Replay as fast as possible")
+    replay.add_argument("--speed", type=float, default=1.0, help="Real-time playback rate (default: 1.0)")
+    replay.add_argument("--log-level", default="INFO", help="Logging level (default: INFO)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    args = parse_args(argv)
+    logging.basicConfig(level=getattr(logging, getattr(args, "log_level", "INFO").upper(), logging.INFO))
+
+    reader = SessionReader(args.path)
+    try:
+        first, last = reader.time_range
+        if args.command == "info":
+            kinds = reader.index["kind"]
+            print(f"{args.path}: {len(reader)} records over {last - first:.3f}s")
+            print(f"  quest datagrams: {int(np.sum(kinds == KIND_QUEST_DATAGRAM))}")
+            print(f"  pose snapshots:  {int(np.sum(kinds == KIND_POSE_SNAPSHOT))}")
+            if reader.sources:
+                print(f"  sources:         {', '.join(reader.sources.values())}")
+            return
+
+        start = None if args.start is None else first + args.start
+        end = None if args.end is None else first + args.end
+        replayer = SessionReplayer(reader, FusionWorkspace())
+        began = time.perf_counter()
+        count = replayer.replay(start, end, realtime=not args.max_speed, speed=args.speed)
+        elapsed = time.perf_counter() - began
+        logger.info("Replayed %d records in %.3fs (%.0f records/s)", count, elapsed, count / max(elapsed, 1e-9))
+    finally:
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+"""Shared-memory pose slots between estimator processes and the fusion process.
+
+Each pose source owns one ``multiprocessing.shared_memory`` segment laid out
+as::
+
+    [ header (96 B) | keypoint names (4 KiB) | (max_keypoints, 4) float32 ]
+
+Writers publish under a seqlock: the sequence counter is made odd, the
+payload written in place, then the counter made even again. Readers copy the
+payload straight out of the segment and retry if the counter was odd or
+changed underneath them, so nothing is pickled or sent through a socket.
+
+Python has no memory barriers, and on weakly ordered CPUs (ARM, including
+Apple silicon) another core may see the stores out of order, so the
+sequence checks alone can pass around a torn copy. The header therefore
+also carries CRC32s: one over the frame metadata and keypoint rows, one
+over the keypoint names. Readers verify them on their own copy and retry
+on a mismatch, so a torn snapshot is never returned on any platform.
+
+Every writer stamps a random ``generation`` into the header. Readers reset
+their cached layout and frame counter when it changes, and
+:func:`refresh_reader` re-attaches a reader whose segment was replaced by a
+restarted writer (POSIX unlinks the old segment, so a reader holding it
+would otherwise never see another frame). On Windows a segment lives as
+long as any handle to it, so a restarted writer reuses the existing one.
+
+The snapshot's :class:`FrameTimes` (captured, received, decoded) travel in
+the header too, NaN standing for an unknown time, so the fusion process
+reports the same stage latencies as an in-process workspace would. So do
+the snapshot's unit and image size, which triangulation checks against the
+camera calibration.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+from multiprocessing import shared_memory
+import math
+from typing import Optional
+
+import numpy as np
+
+from pose_stream_server.common.fusion_workspace import LANDMARK_WIDTH, MEASURED, METRES, PIXELS, PREDICTED, PoseSnapshot
+from pose_stream_server.common.latency import FrameTimes
+from pose_stream_server.udp_pose_receiver.quest_packet import JointLayout, get_joint_layout
+
+logger = logging.getLogger(__name__)
+
+SLOT_PREFIX = "pose_slot_"
+DEFAULT_MAX_KEYPOINTS = 128
+NAMES_CAPACITY = 4096
+HEADER_SIZE = 96
+# seq, frame_id, layout_version, timestamp, count, names_len, flags, data_crc, names_crc, generation,
+# captured, received, decoded, image width, image height (0 when unknown)
+HEADER = struct.Struct("<QQQdIIIIIQdddII")
+# The header fields covered by data_crc, with the keypoint rows after them.
+CHECKED = struct.Struct("<QQdIIIQdddII")
+FLAG_PREDICTED = 0x01
+FLAG_PIXELS = 0x02
+FLAG_METRES = 0x04
+_UNIT_FLAGS = ((PIXELS, FLAG_PIXELS), (METRES, FLAG_METRES))
+NAMES_OFFSET = HEADER_SIZE
+DATA_OFFSET = HEADER_SIZE + NAMES_CAPACITY
+READ_RETRIES = 100
+
+
+def slot_name(source: str) -> str:
+    return SLOT_PREFIX + source
+
+
+def add_publish_argument(parser) -> None:
+    parser.add_argument(
+        "--publish-shm",
+        metavar="SOURCE",
+        default=None,
+        help="Publish poses to the shared-memory slot SOURCE for a separate fusion process "
+        "instead of fusing in-process (the Quest listener is not started)",
+    )
+
+
+def _segment_size(max_keypoints: int) -> int:
+    return DATA_OFFSET + max_keypoints * LANDMARK_WIDTH * 4
+
+
+def _new_generation() -> int:
+    return (os.getpid() & 0xFFFFFFFF) << 32 | random.getrandbits(32)
+
+
+def _pack_times(times: Optional[FrameTimes]) -> tuple:
+    if times is None:
+        return (math.nan, math.nan, math.nan)
+    return tuple(math.nan if t is None else t for t in (times.captured, times.received, times.decoded))
+
+
+def _unpack_times(captured: float, received: float, decoded: float) -> Optional[FrameTimes]:
+    known = [None if math.isnan(t) else t for t in (captured, received, decoded)]
+    if all(t is None for t in known):
+        return None
+    return FrameTimes(*known)
+
+
+def _pack_frame(snapshot: PoseSnapshot) -> tuple:
+    """``(flags, width, height)`` for the snapshot's kind, unit and image size."""
+
+    flags = FLAG_PREDICTED if snapshot.kind == PREDICTED else 0
+    for unit, flag in _UNIT_FLAGS:
+        if snapshot.unit == unit:
+            flags |= flag
+    width, height = snapshot.image_size if snapshot.image_size is not None else (0, 0)
+    return flags, width, height
+
+
+def _unpack_unit(flags: int) -> Optional[str]:
+    for unit, flag in _UNIT_FLAGS:
+        if flags & flag:
+            return unit
+    return None
+
+
+def _open_segment(name: str, size: int) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(name=name, create=True, size=size)
+    except FileExistsError:
+        pass
+    existing = shared_memory.SharedMemory(name=name)
+    if sys.platform == "win32":
+        # A reader still holds the old segment and unlink() is a no-op, so
+        # take it over; the new generation tells readers to start afresh.
+        if existing.size < size:
+            existing.close()
+            raise ValueError(f"Shared pose slot {name} is smaller than {size} bytes; restart its readers")
+        return existing
+    # Left behind by a crashed writer; start from a clean segment.
+    existing.close()
+    existing.unlink()
+    return shared_memory.SharedMemory(name=name, create=True, size=size)
+
+
+class SharedPoseWriter:
+    """Publishes snapshots for one source; usable wherever a workspace sink is expected."""
+
+    def __init__(self, source: str, max_keypoints: int = DEFAULT_MAX_KEYPOINTS) -> None:
+        self.source = source
+        self.max_keypoints = max_keypoints
+        name = slot_name(source)
+        self._shm = _open_segment(name, _segment_size(max_keypoints))
+        self.generation = _new_generation()
+
+        buf = self._shm.buf
+        buf[:DATA_OFFSET] = bytes(DATA_OFFSET)
+        # frame_id 0: nothing published yet by this generation.
+        HEADER.pack_into(buf, 0, 0, 0, 0, 0.0, 0, 0, 0, 0, 0, self.generation, *_pack_times(None), 0, 0)
+        self._data = np.ndarray((max_keypoints, LANDMARK_WIDTH), dtype=np.float32, buffer=buf, offset=DATA_OFFSET)
+        self._seq = 0
+        self._frame_id = 0
+        self._layout: Optional[JointLayout] = None
+        self._layout_version = 0
+        self._names_len = 0
+        self._names_crc = 0
+        logger.info("Publishing %s poses to shared memory slot %s", source, name)
+
+    def publish(self, snapshot: PoseSnapshot) -> None:
+        count = len(snapshot.layout)
+        if count > self.max_keypoints:
+            raise ValueError(f"{count} keypoints exceed slot capacity {self.max_keypoints}")
+
+        buf = self._shm.buf
+        self._seq += 1  # odd: write in progress
+        HEADER.pack_into(
+            buf,
+            0,
+            self._seq,
+            self._frame_id,
+            self._layout_version,
+            0.0,
+            0,
+            self._names_len,
+            0,
+            0,
+            self._names_crc,
+            self.generation,
+            *_pack_times(None),
+            0,
+            0,
+        )
+
+        if snapshot.layout is not self._layout:
+            names = "\n".join(snapshot.layout.names).encode("utf-8")
+            if len(names) > NAMES_CAPACITY:
+                raise ValueError("Keypoint names do not fit in the shared slot")
+            buf[NAMES_OFFSET : NAMES_OFFSET + len(names)] = names
+            self._names_len = len(names)
+            self._names_crc = zlib.crc32(names)
+            self._layout = snapshot.layout
+            self._layout_version += 1
+
+        rows = self._data[:count]
+        rows[:] = snapshot.data
+        self._frame_id += 1
+        self._seq += 1  # even: consistent
+        flags, width, height = _pack_frame(snapshot)
+        times = _pack_times(snapshot.times)
+        checked = CHECKED.pack(
+            self._frame_id,
+            self._layout_version,
+            snapshot.timestamp,
+            count,
+            self._names_len,
+            flags,
+            self.generation,
+            *times,
+            width,
+            height,
+        )
+        data_crc = zlib.crc32(rows, zlib.crc32(checked))
+        HEADER.pack_into(
+            buf,
+            0,
+            self._seq,
+            self._frame_id,
+            self._layout_version,
+            snapshot.timestamp,
+            count,
+            self._names_len,
+            flags,
+            data_crc,
+            self._names_crc,
+            self.generation,
+            *times,
+            width,
+            height,
+        )
+
+    # Lets a writer stand in for FusionWorkspace in the capture loops.
+    update_lower_body = publish
+
+    def close(self) -> None:
+        self._data = None
+        self._shm.close()
+        self._shm.unlink()
+
+
+class SharedPoseReader:
+    """Torn-read-free access to one source's latest snapshot.
+
+    ``torn_reads`` counts retries; ``checksum_failures`` the subset caught
+    only by the CRCs, i.e. reordered stores the seqlock missed.
+    """
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self._shm = shared_memory.SharedMemory(name=slot_name(source))
+        if sys.platform != "win32":
+            # Attaching registers the segment with this process's resource
+            # tracker, which would unlink it on exit; the writer owns it.
+            from multiprocessing import resource_tracker
+
+            resource_tracker.unregister(self._shm._name, "shared_memory")
+
+        max_keypoints = (self._shm.size - DATA_OFFSET) // (LANDMARK_WIDTH * 4)
+        self._data = np.ndarray(
+            (max_keypoints, LANDMARK_WIDTH), dtype=np.float32, buffer=self._shm.buf, offset=DATA_OFFSET
+        )
+        self._last_frame_id = 0
+        self._layout_version = 0
+        self._layout: Optional[JointLayout] = None
+        # Writer generation this reader's cached state belongs to.
+        self.generation = HEADER.unpack_from(self._shm.buf, 0)[9]
+        self.torn_reads = 0
+        self.checksum_failures = 0
+
+    def read(self) -> Optional[PoseSnapshot]:
+        """Return the latest snapshot, or None if nothing new was published."""
+
+        buf = self._shm.buf
+        for _ in range(READ_RETRIES):
+            header = HEADER.unpack_from(buf, 0)
+            seq, frame_id, layout_version, timestamp, count, names_len, flags, data_crc, names_crc, generation = (
+                header[:10]
+            )
+            times = header[10:13]
+            width, height = header[13:]
+            if seq & 1:
+                self.torn_reads += 1
+                time.sleep(0)
+                continue
+            restarted = generation != self.generation
+            if frame_id == 0 or (frame_id == self._last_frame_id and not restarted):
+                return None
+
+            data = self._data[:count].copy()
+            names = None
+            if restarted or layout_version != self._layout_version:
+                names = bytes(buf[NAMES_OFFSET : NAMES_OFFSET + names_len])
+
+            if HEADER.unpack_from(buf, 0)[0] != seq:
+                self.torn_reads += 1
+                continue
+            checked = CHECKED.pack(
+                frame_id, layout_version, timestamp, count, names_len, flags, generation, *times, width, height
+            )
+            if zlib.crc32(data, zlib.crc32(checked)) != data_crc or (
+                names is not None and zlib.crc32(names) != names_crc
+            ):
+                self.torn_reads += 1
+                self.checksum_failures += 1
+                continue
+
+            if restarted:
+                logger.info("Shared pose slot %s was taken over by a new writer", self.source)
+                self.generation = generation
+            if names is not None:
+                self._layout = get_joint_layout(names.decode("utf-8").split("\n"))
+                self._layout_version = layout_version
+            self._last_frame_id = frame_id
+            kind = PREDICTED if flags & FLAG_PREDICTED else MEASURED
+            return PoseSnapshot(
+                timestamp,
+                data,
+                self._layout,
+                kind=kind,
+                times=_unpack_times(*times),
+                unit=_unpack_unit(flags),
+                image_size=(width, height) if width and height else None,
+            )
+
+        logger.debug("Gave up reading %s after %d retries", self.source, READ_RETRIES)
+        return None
+
+    def close(self) -> None:
+        self._data = None
+        self._shm.close()
+
+
+def attach_reader(source: str) -> Optional[SharedPoseReader]:
+    """Reader for ``source``, or None while no writer has created its slot."""
+
+    try:
+        return SharedPoseReader(source)
+    except FileNotFoundError:
+        return None
+
+
+def refresh_reader(source: str, reader: Optional[SharedPoseReader]) -> Optional[SharedPoseReader]:
+    """The reader to use for ``source`` from now on.
+
+    Call it for readers that have gone quiet. If the slot's name now points
+    at a different writer generation (or at nothing), ``reader`` is closed
+    and a reader for the current segment (or None) is returned.
+    """
+
+    current = attach_reader(source)
+    if reader is None:
+        return current
+    if current is not None and current.generation == reader.generation:
+        current.close()
+        return reader
+    reader.close()
+    return current
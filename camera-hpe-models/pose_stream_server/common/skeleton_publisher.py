@@ -0,0 +1,131 @@
+"""Fixed-rate UDP output of the fused skeleton.
+
+Every tick the publisher samples the workspace at the current host time,
+encodes the result with :mod:`skeleton_codec` and sends it to each target.
+The sampled skeleton is ``FusionWorkspace.fused_body_at``: the Quest body in
+its OVR layout, with the aligned camera's joints in place of the ones the
+headset does not track (the legs). Before the camera is aligned it is the
+Quest body alone.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from pose_stream_server.common.metrics import REGISTRY
+from pose_stream_server.udp_pose_receiver.quest_packet import QuestPacket
+from pose_stream_server.udp_pose_receiver.skeleton_codec import (
+    DEFAULT_KEYFRAME_EVERY,
+    DEFAULT_POSITION_STEP,
+    SkeletonEncoder,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RATE_HZ = 60.0
+
+SENT_PACKETS = REGISTRY.counter("pose_skeleton_packets_total", "Fused skeleton datagrams sent")
+SENT_BYTES = REGISTRY.counter("pose_skeleton_bytes_total", "Fused skeleton bytes sent")
+ENCODE_SECONDS = REGISTRY.histogram("pose_skeleton_encode_seconds", "Fused skeleton encode time")
+
+
+def parse_target(spec: str) -> Tuple[str, int]:
+    host, _, port = spec.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Expected HOST:PORT, got {spec!r}")
+    return host, int(port)
+
+
+def _newest_input(packet: Optional[QuestPacket]) -> Optional[float]:
+    if packet is None:
+        return None
+    return packet.times.captured if packet.times is not None else packet.timestamp
+
+
+class SkeletonPublisher:
+    def __init__(
+        self,
+        sample: Callable[[float], Optional[QuestPacket]],
+        targets: Sequence[Tuple[str, int]],
+        rate_hz: float = DEFAULT_RATE_HZ,
+        encoder: Optional[SkeletonEncoder] = None,
+    ) -> None:
+        self.sample = sample
+        self.targets: List[Tuple[str, int]] = list(targets)
+        self.interval = 1.0 / rate_hz
+        self.encoder = encoder or SkeletonEncoder()
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, local_addr=("0.0.0.0", 0))
+        logger.info(
+            "Publishing fused skeleton at %.0f Hz to %s",
+            1.0 / self.interval,
+            ", ".join(f"{host}:{port}" for host, port in self.targets),
+        )
+        next_tick = loop.time()
+        last_timestamp = None
+        try:
+            while True:
+                packet = self.sample(time.time())
+                # Nothing new to say while every source is stale.
+                timestamp = _newest_input(packet)
+                if packet is not None and timestamp != last_timestamp:
+                    last_timestamp = timestamp
+                    began = time.perf_counter()
+                    data = self.encoder.encode(packet)
+                    ENCODE_SECONDS.observe(time.perf_counter() - began)
+                    for target in self.targets:
+                        transport.sendto(data, target)
+                    SENT_PACKETS.inc(len(self.targets))
+                    SENT_BYTES.inc(len(data) * len(self.targets))
+
+                next_tick += self.interval
+                delay = next_tick - loop.time()
+                if delay < 0.0:
+                    # Fell behind (e.g. a stalled loop): resync instead of bursting.
+                    next_tick = loop.time()
+                    delay = 0.0
+                await asyncio.sleep(delay)
+        finally:
+            transport.close()
+
+
+def add_skeleton_arguments(parser) -> None:
+    parser.add_argument(
+        "--publish-skeleton",
+        action="append",
+        default=[],
+        metavar="HOST:PORT",
+        help="Send the fused skeleton in the compact binary format to HOST:PORT (repeatable)",
+    )
+    parser.add_argument(
+        "--skeleton-rate",
+        type=float,
+        default=DEFAULT_RATE_HZ,
+        help=f"Fused skeleton send rate in Hz (default: {DEFAULT_RATE_HZ:g})",
+    )
+    parser.add_argument(
+        "--skeleton-keyframe-every",
+        type=int,
+        default=DEFAULT_KEYFRAME_EVERY,
+        metavar="N",
+        help=f"Send a keyframe every N packets, deltas in between (default: {DEFAULT_KEYFRAME_EVERY}, 1 = no deltas)",
+    )
+
+
+def start_skeleton_publisher(args, workspace) -> Optional[asyncio.Task]:
+    """Start publishing ``workspace``'s skeleton if the command line asked for it."""
+
+    if not args.publish_skeleton:
+        return None
+    publisher = SkeletonPublisher(
+        workspace.fused_body_at,
+        [parse_target(spec) for spec in args.publish_skeleton],
+        rate_hz=args.skeleton_rate,
+        encoder=SkeletonEncoder(keyframe_every=args.skeleton_keyframe_every, position_step=DEFAULT_POSITION_STEP),
+    )
+    return asyncio.create_task(publisher.run())
@@ -0,0 +1,44 @@
+"""Per-phase timing of server startup.
+
+Phases may run on different threads and overlap (e.g. model loading next to
+the UDP listener), so each one is stored as a start/end offset from the
+timer's creation and the report shows both.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+import threading
+import time
+from typing import Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    def __init__(self) -> None:
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self.phases: List[Tuple[str, float, float]] = []
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter() - self._origin
+        try:
+            yield
+        finally:
+            end = time.perf_counter() - self._origin
+            with self._lock:
+                self.phases.append((name, start, end))
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._origin
+
+    def report(self, title: str = "Startup", level: int = logging.INFO) -> None:
+        with self._lock:
+            phases = sorted(self.phases, key=lambda phase: phase[1])
+        lines = [f"{title} finished in {self.elapsed() * 1000.0:.0f} ms:"]
+        for name, start, end in phases:
+            lines.append(f"  {name:<24} {(end - start) * 1000.0:8.1f} ms  (+{start * 1000.0:.0f} ms)")
+        logger.log(level, "\n".join(lines))
@@ -0,0 +1,261 @@
+"""Push-based access to everything a :class:`FusionWorkspace` publishes.
+
+Every accepted Quest packet and camera snapshot produces one immutable
+:class:`FusedFrame`: the newest body of every source at that moment. The
+workspace builds it while holding its lock and then swaps it in as
+``latest_frame`` with a single reference assignment, so readers never take
+the lock and never see a half-updated frame. Frames are also offered to
+subscribers before the lock is released, so with several producer threads
+every subscriber still receives them in ``sequence`` order and a ``LATEST``
+subscription ends up holding ``latest_frame``.
+
+Consumers attach a :class:`Subscription` and get frames pushed to them
+either as an ``async for`` stream or through a callback run on the
+subscription's own thread. Producers never wait on a consumer: each
+subscription has its own queue with one of two backpressure policies,
+
+``LATEST``
+    keep only the newest frame (a slow consumer skips frames), or
+``BOUNDED``
+    keep up to ``maxsize`` frames and evict the oldest once full.
+
+Evicted frames are counted per subscription. Frames share their arrays with
+the workspace and the other subscribers, so treat them as read-only.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import threading
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Callable, Mapping, Optional, Tuple
+
+from pose_stream_server.common.metrics import REGISTRY
+from pose_stream_server.common.pipeline import LatestQueue, start_stage
+
+if TYPE_CHECKING:
+    from pose_stream_server.common.fusion_workspace import PoseSnapshot
+    from pose_stream_server.udp_pose_receiver.quest_packet import QuestPacket
+
+logger = logging.getLogger(__name__)
+
+LATEST = "latest"
+BOUNDED = "bounded"
+POLICIES = (LATEST, BOUNDED)
+DEFAULT_BOUNDED_SIZE = 32
+# How often callback threads re-check for close() while idle.
+POLL_S = 0.1
+# FusedFrame.source for frames triggered by a Quest packet.
+QUEST_SOURCE = "quest"
+
+_EMPTY: Mapping = MappingProxyType({})
+_names = itertools.count(1)
+
+
+class FusedFrame:
+    """The workspace's newest data right after one update.
+
+    ``source`` names what triggered the frame (a camera source, or
+    ``QUEST_SOURCE`` with the sender in ``session``). ``upper_body`` and
+    ``lower_body`` are the primary Quest session's latest packet and the
+    most recently updated camera snapshot; ``upper_bodies``/``lower_bodies``
+    hold the latest of every session and camera source.
+    """
+
+    __slots__ = (
+        "sequence",
+        "timestamp",
+        "source",
+        "session",
+        "upper_body",
+        "lower_body",
+        "upper_bodies",
+        "lower_bodies",
+    )
+
+    def __init__(
+        self,
+        sequence: int,
+        timestamp: float,
+        source: str,
+        session: Optional[str] = None,
+        upper_body: Optional["QuestPacket"] = None,
+        lower_body: Optional["PoseSnapshot"] = None,
+        upper_bodies: Mapping[str, "QuestPacket"] = _EMPTY,
+        lower_bodies: Mapping[str, "PoseSnapshot"] = _EMPTY,
+    ) -> None:
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.source = source
+        self.session = session
+        self.upper_body = upper_body
+        self.lower_body = lower_body
+        self.upper_bodies = upper_bodies
+        self.lower_bodies = lower_bodies
+
+    def __repr__(self) -> str:
+        return (
+            f"FusedFrame(#{self.sequence} from {self.source} @ {self.timestamp:.3f}, "
+            f"{len(self.upper_bodies)} Quest sessions, {len(self.lower_bodies)} camera sources)"
+        )
+
+
+class Subscription:
+    """One consumer's queue of :class:`FusedFrame` objects.
+
+    Use ``get`` from a thread, ``async for`` from a coroutine (the
+    subscription must then be created inside the running event loop), or
+    pass ``callback`` to have frames delivered on a dedicated thread.
+    """
+
+    def __init__(
+        self,
+        policy: str = LATEST,
+        maxsize: int = DEFAULT_BOUNDED_SIZE,
+        name: Optional[str] = None,
+        callback: Optional[Callable[[FusedFrame], None]] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        on_close: Optional[Callable[["Subscription"], None]] = None,
+    ) -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy {policy!r}; expected one of {POLICIES}")
+        self.name = name or f"subscriber-{next(_names)}"
+        self.policy = policy
+        self.dropped = 0
+        self._queue: LatestQueue[FusedFrame] = LatestQueue(
+            maxsize=1 if policy == LATEST else maxsize, on_drop=self._dropped
+        )
+        self._on_close = on_close
+        self._loop = loop
+        self._ready = asyncio.Event() if loop is not None else None
+        self._delivered = REGISTRY.counter(
+            "pose_subscriber_frames_total", "Fused frames queued for a subscriber", subscriber=self.name
+        )
+        self._dropped_metric = REGISTRY.counter(
+            "pose_subscriber_dropped_total", "Fused frames a subscriber fell too far behind to see", subscriber=self.name
+        )
+        self._thread: Optional[threading.Thread] = None
+        if callback is not None:
+            self._thread = start_stage(f"subscriber-{self.name}", self._dispatch, callback)
+
+    @property
+    def closed(self) -> bool:
+        return self._queue.closed
+
+    def offer(self, frame: FusedFrame) -> None:
+        """Queue ``frame`` without blocking (called by the publisher)."""
+
+        self._queue.put(frame)
+        self._delivered.inc()
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._ready.set)
+            except RuntimeError:
+                # Event loop already closed; nobody is listening any more.
+                self.close()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[FusedFrame]:
+        """Oldest queued frame, or None on timeout or once closed."""
+
+        return self._queue.get(timeout)
+
+    def close(self) -> None:
+        if self._queue.closed:
+            return
+        self._queue.close()
+        if self._on_close is not None:
+            self._on_close(self)
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._ready.set)
+            except RuntimeError:
+                pass
+
+    def __aiter__(self) -> "Subscription":
+        if self._loop is None:
+            raise TypeError("Subscription was not created for async iteration; use FusionWorkspace.stream()")
+        return self
+
+    async def __anext__(self) -> FusedFrame:
+        while True:
+            # Clear before checking so an offer landing in between still wakes us.
+            self._ready.clear()
+            frame = self._queue.get(timeout=0)
+            if frame is not None:
+                return frame
+            if self._queue.closed:
+                raise StopAsyncIteration
+            await self._ready.wait()
+
+    def _dispatch(self, callback: Callable[[FusedFrame], None]) -> None:
+        while not self._queue.closed:
+            frame = self._queue.get(timeout=POLL_S)
+            if frame is None:
+                continue
+            try:
+                callback(frame)
+            except Exception:
+                logger.exception("Subscriber %s failed on %r", self.name, frame)
+
+    def _dropped(self, frame: FusedFrame) -> None:
+        if self._queue.closed:
+            return
+        self.dropped += 1
+        self._dropped_metric.inc()
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"Subscription({self.name}, {self.policy}, {self.dropped} dropped)"
+
+
+class FramePublisher:
+    """Fans published frames out to subscriptions.
+
+    The subscriber list is copied on every (rare) change, so ``publish`` is
+    a lock-free loop over a tuple and may run on any producer thread.
+    """
+
+    def __init__(self) -> None:
+        self._subscribers: Tuple[Subscription, ...] = ()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(
+        self,
+        callback: Optional[Callable[[FusedFrame], None]] = None,
+        policy: str = LATEST,
+        maxsize: int = DEFAULT_BOUNDED_SIZE,
+        name: Optional[str] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ) -> Subscription:
+        subscription = Subscription(
+            policy=policy, maxsize=maxsize, name=name, callback=callback, loop=loop, on_close=self._remove
+        )
+        with self._lock:
+            self._subscribers = self._subscribers + (subscription,)
+        logger.debug("%r attached", subscription)
+        return subscription
+
+    def publish(self, frame: FusedFrame) -> None:
+        """Offer ``frame`` to every subscription; never blocks on a consumer."""
+
+        for subscription in self._subscribers:
+            subscription.offer(frame)
+
+    def close(self) -> None:
+        for subscription in self._subscribers:
+            subscription.close()
+
+    def _remove(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not subscription)
+        logger.debug("%r detached", subscription)
@@ -0,0 +1,225 @@
+"""Standalone fusion process fed by pose estimators over shared memory.
+
+Run each estimator with ``--publish-shm NAME`` and point this process at the
+same names; it owns the Quest UDP socket and the FusionWorkspace::
+
+    python synthpose/synthpose_mmpose_server.py --headless --publish-shm synthpose
+    python mediapipe/mediapipe_stream_server.py --headless --publish-shm mediapipe
+    python fusion/fusion_server.py --sources synthpose mediapipe
+
+With ``--calibration`` every camera named in the calibration file is read as
+a 2D view; views are interpolated to a common instant, triangulated, and the
+3D result is published under the ``triangulated`` source.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import sys
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[2]
+sys.path.insert(0, str(project_root))
+from pose_stream_server.common.fusion_workspace import FusionWorkspace
+from pose_stream_server.common.metrics import add_metrics_arguments, start_metrics
+from pose_stream_server.common.multiview import (
+    DEFAULT_MIN_VIEWS,
+    DEFAULT_MIN_VISIBILITY,
+    MultiViewTriangulator,
+    load_calibration,
+)
+from pose_stream_server.common.session_log import SessionRecorder
+from pose_stream_server.common.shared_pose import SharedPoseReader, refresh_reader
+from pose_stream_server.common.skeleton_publisher import add_skeleton_arguments, start_skeleton_publisher
+# Helper to starts and listens to OSC
+from pose_stream_server.udp_pose_receiver.udp_pose_receiver import run_server as start_osc_server
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_HZ = 200.0
+ATTACH_RETRY_S = 1.0
+TRIANGULATED_SOURCE = "triangulated"
+# Views whose newest frame is older than this (relative to the newest view)
+# are left out of triangulation instead of holding the others back.
+MAX_VIEW_LAG_S = 0.1
+
+
+def triangulate_views(workspace: FusionWorkspace, triangulator: MultiViewTriangulator) -> None:
+    """Publish a 3D snapshot built from the camera views in ``workspace``.
+
+    Views are sampled at the oldest of their newest frames, so every view
+    is interpolated rather than extrapolated.
+    """
+
+    latest = [workspace.lower_bodies.get(name) for name in triangulator.names]
+    newest = max((s.timestamp for s in latest if s is not None), default=None)
+    if newest is None:
+        return
+    fresh = [s is not None and newest - s.timestamp <= MAX_VIEW_LAG_S for s in latest]
+    timestamp = min(s.timestamp for s, ok in zip(latest, fresh) if ok)
+
+    views = [
+        workspace.lower_body_at(timestamp, source=name) if ok else None
+        for name, ok in zip(triangulator.names, fresh)
+    ]
+    snapshot = triangulator.triangulate(views, timestamp)
+    if snapshot is not None:
+        workspace.update_lower_body(snapshot, source=TRIANGULATED_SOURCE)
+
+
+async def poll_sources(
+    workspace: FusionWorkspace,
+    sources: Sequence[str],
+    poll_hz: float = DEFAULT_POLL_HZ,
+    triangulator: Optional[MultiViewTriangulator] = None,
+) -> None:
+    """Move new snapshots from every shared slot into ``workspace``.
+
+    Estimators may start after (or restart under) the fusion process, so
+    missing slots are attached periodically, and a slot that has brought
+    nothing new for ``ATTACH_RETRY_S`` is re-opened if a new writer
+    generation took it over (or dropped if it is gone). With a ``triangulator``,
+    every poll that brought in a new view also publishes a 3D snapshot.
+    """
+
+    loop = asyncio.get_running_loop()
+    readers: Dict[str, Optional[SharedPoseReader]] = {source: None for source in sources}
+    last_frame: Dict[str, float] = {source: 0.0 for source in sources}
+    next_attach = 0.0
+    interval = 1.0 / poll_hz
+    try:
+        while True:
+            now = loop.time()
+            if now >= next_attach:
+                next_attach = now + ATTACH_RETRY_S
+                for source, reader in readers.items():
+                    if reader is not None and now - last_frame[source] < ATTACH_RETRY_S:
+                        continue
+                    fresh = readers[source] = refresh_reader(source, reader)
+                    if fresh is not reader:
+                        last_frame[source] = now
+                        if fresh is not None:
+                            logger.info("Attached to shared pose slot %s", source)
+                        else:
+                            logger.info("Shared pose slot %s went away", source)
+
+            updated = False
+            for source, reader in readers.items():
+                if reader is None:
+                    continue
+                snapshot = reader.read()
+                if snapshot is not None:
+                    last_frame[source] = now
+                    workspace.update_lower_body(snapshot, source=source)
+                    updated = True
+
+            if updated and triangulator is not None:
+                triangulate_views(workspace, triangulator)
+
+            await asyncio.sleep(interval)
+    finally:
+        for reader in readers.values():
+            if reader is not None:
+                reader.close()
+
+
+# CLI entrypoint
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--sources",
+        nargs="+",
+        default=None,
+        metavar="SOURCE",
+        help="Shared-memory slots to read poses from (default: the cameras in --calibration)",
+    )
+    parser.add_argument(
+        "--calibration", metavar="PATH", default=None, help="Camera calibration JSON; enables triangulation"
+    )
+    parser.add_argument(
+        "--min-views",
+        type=int,
+        default=DEFAULT_MIN_VIEWS,
+        help=f"Views a keypoint needs to be triangulated (default: {DEFAULT_MIN_VIEWS})",
+    )
+    parser.add_argument(
+        "--min-visibility",
+        type=float,
+        default=DEFAULT_MIN_VISIBILITY,
+        help=f"Keypoint score below which a view is ignored (default: {DEFAULT_MIN_VISIBILITY})",
+    )
+    parser.add_argument(
+        "--poll-hz",
+        type=float,
+        default=DEFAULT_POLL_HZ,
+        help=f"How often to check the slots for new poses (default: {DEFAULT_POLL_HZ:g})",
+    )
+    parser.add_argument("--osc-host", default="0.0.0.0", help="Interface for Unity OSC packets (default: 0.0.0.0)")
+    parser.add_argument("--osc-port", type=int, default=9000, help="UDP port for Unity OSC packets (default: 9000)")
+    parser.add_argument("--log-level", default="INFO", help="Logging level (default: INFO)")
+    parser.add_argument(
+        "--record",
+        metavar="PATH",
+        default=None,
+        help="Record Quest packets and pose snapshots to a session log for later replay",
+    )
+    add_skeleton_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    if args.sources is None and args.calibration is None:
+        parser.error("give --sources, --calibration or both")
+    return args
+
+
+async def async_main(args: argparse.Namespace) -> None:
+    triangulator = None
+    sources = list(args.sources or [])
+    if args.calibration:
+        triangulator = MultiViewTriangulator(
+            load_calibration(args.calibration), min_views=args.min_views, min_visibility=args.min_visibility
+        )
+        sources += [name for name in triangulator.names if name not in sources]
+        logger.info("Triangulating %d views: %s", len(triangulator.names), ", ".join(triangulator.names))
+
+    recorder = SessionRecorder(args.record) if args.record else None
+    workspace = FusionWorkspace(recorder=recorder)
+    osc_task = asyncio.create_task(
+        start_osc_server(
+            args.osc_host, args.osc_port, workspace.handle_quest_packet, decode="array", recorder=recorder
+        )
+    )
+    skeleton_task = start_skeleton_publisher(args, workspace)
+
+    try:
+        await poll_sources(workspace, sources, args.poll_hz, triangulator)
+    finally:
+        osc_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await osc_task
+        if skeleton_task is not None:
+            skeleton_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await skeleton_task
+        workspace.close_subscriptions()
+        if recorder is not None:
+            recorder.close()
+
+
+def main() -> None:
+    args = parse_args()
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.INFO))
+    metrics = start_metrics(args)
+
+    try:
+        asyncio.run(async_main(args))
+    except KeyboardInterrupt:
+        logger.info("Shutting down fusion process")
+    finally:
+        metrics.stop()
+
+
+if __name__ == "__main__":
+    main()
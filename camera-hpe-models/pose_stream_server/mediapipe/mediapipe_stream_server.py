@@ -1,14 +1,15 @@
 """MediaPipe captures loop that shares a workspace with Unity OSC packets.
+
+The model is wrapped as the ``mediapipe`` pose backend; running this file
+starts ``pose_server.py`` with that backend preselected.
 """
 
-import argparse
-import asyncio
-import contextlib
 import logging
 import time
-from typing import Dict, Mapping, MutableMapping, Optional
+from typing import Optional
 import cv2
 import mediapipe as mp
+import numpy as np
 import sys
 from pathlib import Path
 
@@ -16,14 +17,20 @@ current_file = Path(__file__).resolve()
 project_root = current_file.parents[2]
 sys.path.insert(0, str(project_root))
 # Shared fusion workspace so this process can publish pose snapshots
-from pose_stream_server.common.fusion_workspace import FusionWorkspace, PoseSnapshot
-# Helper to starts and listens to OSC
-from pose_stream_server.udp_pose_receiver.udp_pose_receiver import run_server as start_osc_server
+from pose_stream_server.common.fusion_workspace import METRES, PoseSnapshot
+from pose_stream_server.common.metrics import REGISTRY
+# Pose backend interface the shared server drives
+from pose_stream_server.common.backends import PoseBackend, register_backend
+# Reusable buffer for the RGB copy MediaPipe needs
+from pose_stream_server.common.frame_pool import FramePool, release_frame
+# Downscaled model input
+from pose_stream_server.common.pyramid import ResolutionPyramid
+from pose_stream_server.udp_pose_receiver.quest_packet import get_joint_layout
 
 logger = logging.getLogger(__name__)
 
 mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(
+POSE_OPTIONS = dict(
     static_image_mode=False,
     model_complexity=1,
     enable_segmentation=False,
@@ -33,104 +40,101 @@ pose = mp_pose.Pose(
 
 # Previously LOWER_BODY_LANDMARKS; now use all pose landmarks.
 ALL_LANDMARKS = list(mp_pose.PoseLandmark)
-
-# MediaPipe helpers
-def _landmark_dict(landmark) -> Dict[str, float]:
-    return {
-        "x": float(landmark.x),
-        "y": float(landmark.y),
-        "z": float(landmark.z),
-        "visibility": float(getattr(landmark, "visibility", 0.0)),
-    }
+LANDMARK_INDICES = [landmark_enum.value for landmark_enum in ALL_LANDMARKS]
+# Shared keypoint-name table, built once for every snapshot.
+LANDMARK_LAYOUT = get_joint_layout([landmark_enum.name.lower() for landmark_enum in ALL_LANDMARKS])
 
 
-def extract_pose_data(results) -> Optional[PoseSnapshot]:
+# MediaPipe helpers
+def extract_pose_data(results, timestamp: Optional[float] = None) -> Optional[PoseSnapshot]:
     if not (results.pose_landmarks and results.pose_world_landmarks):
         return None
 
     world_landmarks = results.pose_world_landmarks.landmark
-    output: MutableMapping[str, Mapping[str, float]] = {}
-
-    for landmark_enum in ALL_LANDMARKS:
-        idx = landmark_enum.value
-        output[landmark_enum.name.lower()] = _landmark_dict(world_landmarks[idx])
-
-    return PoseSnapshot(timestamp=time.time(), landmarks=dict(output))
-
-
-async def mediapipe_loop(camera_index: int, workspace: FusionWorkspace) -> None:
-    cap = cv2.VideoCapture(camera_index)
-    if not cap.isOpened():
-        logger.error("Cannot open camera index %s", camera_index)
-        return
-
-    try:
-        while True:
-            success, image = cap.read()
-            if not success:
-                logger.warning("Empty frame, retrying...")
-                await asyncio.sleep(0.1)
-                continue
-
-            image.flags.writeable = False
-            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            results = pose.process(image)
-
-            snapshot = extract_pose_data(results)
-            if snapshot:
-                workspace.update_lower_body(snapshot)
-
-            image.flags.writeable = True
-            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-            mp.solutions.drawing_utils.draw_landmarks(
-                image,
-                results.pose_landmarks,
-                mp_pose.POSE_CONNECTIONS,
-                landmark_drawing_spec=mp.solutions.drawing_styles.get_default_pose_landmarks_style(),
-            )
-            cv2.imshow("MediaPipe Pose", cv2.flip(image, 1))
-            if cv2.waitKey(5) & 0xFF == 27:
-                logger.info("ESC pressed, stopping MediaPipe loop")
-                break
-
-            await asyncio.sleep(0)
-    finally:
-        cap.release()
-        cv2.destroyAllWindows()
-
-
-# CLI entrypoint
-def parse_args() -> argparse.Namespace:
-    parser = argparse.ArgumentParser(description=__doc__)
-    parser.add_argument("--camera-index", type=int, default=0, help="OpenCV camera index (default: 0)")
-    parser.add_argument("--osc-host", default="0.0.0.0", help="Interface for Unity OSC packets (default: 0.0.0.0)")
-    parser.add_argument("--osc-port", type=int, default=9000, help="UDP port for Unity OSC packets (default: 9000)")
-    parser.add_argument("--log-level", default="INFO", help="Logging level (default: INFO)")
-    return parser.parse_args()
-
-
-async def async_main(args: argparse.Namespace) -> None:
-    workspace = FusionWorkspace()
-    osc_task = asyncio.create_task(
-        start_osc_server(args.osc_host, args.osc_port, workspace.handle_quest_packet)
-    )
-
-    try:
-        await mediapipe_loop(args.camera_index, workspace)
-    finally:
-        osc_task.cancel()
-        with contextlib.suppress(asyncio.CancelledError):
-            await osc_task
+    data = np.array(
+        [(lm.x, lm.y, lm.z, lm.visibility) for lm in world_landmarks],
+        dtype=np.float32,
+    )[LANDMARK_INDICES]
+
+    return PoseSnapshot(time.time() if timestamp is None else timestamp, data, LANDMARK_LAYOUT, unit=METRES)
+
+
+INFERENCE_SECONDS = REGISTRY.histogram("pose_inference_seconds", "Pose model time per frame", source="mediapipe")
+# World landmarks are in metres.
+SKIP_TOLERANCE_M = 0.02
+SMOOTH_BETA = 5.0
+
+
+class MediaPipeBackend(PoseBackend):
+    """MediaPipe Pose world landmarks (metres, hip-centred)."""
+
+    name = "mediapipe"
+    title = "MediaPipe Pose"
+    skip_tolerance = SKIP_TOLERANCE_M
+    smooth_beta = SMOOTH_BETA
+    unit = METRES
+
+    @classmethod
+    def add_arguments(cls, parser) -> None:
+        parser.add_argument(
+            "--mediapipe-size",
+            type=int,
+            default=0,
+            metavar="PX",
+            help="Hand MediaPipe a copy of the frame downscaled to this long side (default: 0, full frame)",
+        )
+
+    def load(self, timer=None) -> None:
+        self.estimator = mp_pose.Pose(**POSE_OPTIONS)
+        self._rgb = FramePool("mediapipe-rgb", capacity=1)
+        # MediaPipe runs its own detector and tracks its own ROI across frames,
+        # so it only gets a smaller image, never a moving crop. Its landmarks
+        # are normalized or hip-centred metres and need no mapping back.
+        self.pyramid = ResolutionPyramid(self.name, detect_size=self.args.mediapipe_size)
+
+    def infer(self, frame, timestamp: float):
+        small, image, _ = self.pyramid.detection_input(frame)
+        rgb = self._rgb.acquire(image.shape)
+        try:
+            cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=rgb.array)
+            rgb.array.flags.writeable = False
+            began = time.perf_counter()
+            results = self.estimator.process(rgb.array)
+            INFERENCE_SECONDS.observe(time.perf_counter() - began)
+        finally:
+            release_frame(small)
+            rgb.release()
+        return extract_pose_data(results, timestamp=timestamp), results
+
+    def process(self, frame, timestamp: Optional[float] = None) -> Optional[PoseSnapshot]:
+        return self.infer(frame, time.time() if timestamp is None else timestamp)[0]
+
+    def render(self, frame, results):
+        """Draw landmarks on a sampled BGR frame (runs on the preview thread).
+
+        The preview owns the pooled frame, so it is drawn on and flipped in place.
+        """
+
+        mp.solutions.drawing_utils.draw_landmarks(
+            frame,
+            results.pose_landmarks,
+            mp_pose.POSE_CONNECTIONS,
+            landmark_drawing_spec=mp.solutions.drawing_styles.get_default_pose_landmarks_style(),
+        )
+        return cv2.flip(frame, 1, dst=frame)
+
+    def close(self) -> None:
+        estimator = getattr(self, "estimator", None)
+        if estimator is not None:
+            estimator.close()
 
 
 def main() -> None:
-    args = parse_args()
-    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.INFO))
+    from pose_stream_server.pose_server import main as serve
 
-    try:
-        asyncio.run(async_main(args))
-    except KeyboardInterrupt:
-        logger.info("Shutting down MediaPipe + OSC fusion workspace")
+    # Run as a script this module is __main__; register this copy of the class.
+    register_backend(MediaPipeBackend.name, MediaPipeBackend)
+    serve(default_backend=MediaPipeBackend.name)
 
 
 if __name__ == "__main__":
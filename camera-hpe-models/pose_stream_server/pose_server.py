@@ -0,0 +1,217 @@
+"""Camera pose server: any registered pose backend fused with Unity/Quest packets.
+
+One backend runs in this process::
+
+    python pose_server.py --backend mediapipe
+    python pose_server.py --backend synthpose --detect-every 5
+
+Several backends run side by side on the same camera, each in its own
+worker process, and land in the workspace as separate sources::
+
+    python pose_server.py --backend mediapipe --backend synthpose --headless
+
+Backends are listed in common/backends.py; mediapipe/mediapipe_stream_server.py
+and synthpose/synthpose_mmpose_server.py start this server with their own
+backend preselected.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import functools
+import logging
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[1]
+sys.path.insert(0, str(project_root))
+from pose_stream_server.common.backend_runner import run_backend, run_broadcast
+from pose_stream_server.common.backends import backend_class, backend_names, create_backend
+from pose_stream_server.common.frame_source import add_source_argument, source_spec
+# Shared fusion workspace that every backend publishes into
+from pose_stream_server.common.fusion_workspace import FusionWorkspace
+from pose_stream_server.common.metrics import add_metrics_arguments, start_metrics
+# Smoothing and inference skipping while motion is predictable
+from pose_stream_server.common.pose_filter import add_adaptive_arguments, adaptive_inference_from_args
+from pose_stream_server.common.preview import add_preview_arguments
+from pose_stream_server.common.session_log import SessionRecorder
+from pose_stream_server.common.shared_pose import SharedPoseWriter, add_publish_argument
+from pose_stream_server.common.skeleton_publisher import add_skeleton_arguments, start_skeleton_publisher
+from pose_stream_server.common.startup import StartupTimer
+# Helper to starts and listens to OSC
+from pose_stream_server.udp_pose_receiver.udp_pose_receiver import run_server as start_osc_server
+
+logger = logging.getLogger(__name__)
+
+
+def _add_backend_argument(parser, default: Optional[str]) -> None:
+    parser.add_argument(
+        "--backend",
+        action="append",
+        choices=backend_names(),
+        default=None,
+        help="Pose backend to run; repeat to run several side by side in worker processes "
+        f"(default: {default or 'mediapipe'})",
+    )
+
+
+def selected_backends(args) -> List[str]:
+    # Repeats of the same backend would only fight over one source name.
+    return list(dict.fromkeys(args.backend))
+
+
+def parse_args(argv: Optional[Sequence[str]] = None, default_backend: Optional[str] = None) -> argparse.Namespace:
+    # The backends decide part of the command line, so find them first.
+    early = argparse.ArgumentParser(add_help=False)
+    _add_backend_argument(early, default_backend)
+    known, _ = early.parse_known_args(argv)
+    names = list(dict.fromkeys(known.backend or [default_backend or "mediapipe"]))
+    classes = [backend_class(name) for name in names]
+
+    title = classes[0].title if len(classes) == 1 else "Camera pose server"
+    parser = argparse.ArgumentParser(
+        description=f"{title} with Unity/Quest fusion", epilog=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    _add_backend_argument(parser, default_backend)
+    parser.add_argument("--camera-index", type=int, default=0, help="OpenCV camera index (default: 0)")
+    add_source_argument(parser)
+    parser.add_argument("--osc-host", default="0.0.0.0", help="Interface for Unity OSC packets (default: 0.0.0.0)")
+    parser.add_argument("--osc-port", type=int, default=9000, help="UDP port for Unity OSC packets (default: 9000)")
+    parser.add_argument("--log-level", default="INFO", help="Logging level (default: INFO)")
+    add_preview_arguments(parser)
+    parser.add_argument(
+        "--record",
+        metavar="PATH",
+        default=None,
+        help="Record Quest packets and pose snapshots to a session log for later replay",
+    )
+    if len(classes) == 1:
+        add_adaptive_arguments(parser, classes[0].skip_tolerance, classes[0].smooth_beta, classes[0].unit)
+    else:
+        add_adaptive_arguments(parser, None, None, "each backend's keypoint units")
+    add_publish_argument(parser)
+    add_skeleton_arguments(parser)
+    add_metrics_arguments(parser)
+    added = set()
+    for name, cls in zip(names, classes):
+        # Backends deriving from another one share its options.
+        if cls.add_arguments.__func__ not in added:
+            added.add(cls.add_arguments.__func__)
+            cls.add_arguments(parser.add_argument_group(f"{name} backend"))
+
+    args = parser.parse_args(argv)
+    args.backend = names
+    return args
+
+
+def _schedule(args, name: str):
+    cls = backend_class(name)
+    return adaptive_inference_from_args(args, name, cls.skip_tolerance, cls.smooth_beta)
+
+
+async def _load(backend, timer: StartupTimer) -> None:
+    await asyncio.to_thread(backend.load, timer)
+    timer.report(f"{backend.title} startup")
+
+
+async def _run_single(args, name: str, publish, listening: Optional[asyncio.Event] = None) -> None:
+    timer = StartupTimer()
+    backend = create_backend(name, args)
+    # Imports, model loading and warm-up run in a thread while the event loop
+    # brings up the Quest listener.
+    loading = asyncio.ensure_future(_load(backend, timer))
+    try:
+        if listening is not None:
+            with timer.phase("udp listener"):
+                await listening.wait()
+        await loading
+        await run_backend(
+            backend,
+            source_spec(args),
+            publish,
+            headless=args.headless,
+            preview_every=args.preview_every,
+            schedule=_schedule(args, name),
+        )
+    finally:
+        loading.cancel()
+        backend.close()
+
+
+async def _run(args, publishers: Dict[str, object], listening: Optional[asyncio.Event] = None) -> None:
+    names = selected_backends(args)
+    if len(names) == 1:
+        await _run_single(args, names[0], publishers[names[0]], listening)
+        return
+    if not args.headless:
+        logger.info("Several backends run in worker processes without a preview window")
+    await run_broadcast(names, args, source_spec(args), publishers)
+
+
+async def async_main(args: argparse.Namespace) -> None:
+    names = selected_backends(args)
+    if args.publish_shm:
+        # Estimator-only mode: a separate fusion process owns the Quest socket.
+        if len(names) == 1:
+            writers = {names[0]: SharedPoseWriter(args.publish_shm)}
+        else:
+            writers = {name: SharedPoseWriter(f"{args.publish_shm}-{name}") for name in names}
+        try:
+            await _run(args, {name: writer.publish for name, writer in writers.items()})
+        finally:
+            for writer in writers.values():
+                writer.close()
+        return
+
+    recorder = SessionRecorder(args.record) if args.record else None
+    workspace = FusionWorkspace(recorder=recorder)
+    listening = asyncio.Event()
+    osc_task = asyncio.create_task(
+        start_osc_server(
+            args.osc_host,
+            args.osc_port,
+            workspace.handle_quest_packet,
+            decode="array",
+            recorder=recorder,
+            ready=listening,
+        )
+    )
+    skeleton_task = start_skeleton_publisher(args, workspace)
+    if len(names) == 1:
+        # A lone backend keeps the workspace's default source name.
+        publishers = {names[0]: workspace.update_lower_body}
+    else:
+        publishers = {name: functools.partial(workspace.update_lower_body, source=name) for name in names}
+
+    try:
+        await _run(args, publishers, listening)
+    finally:
+        osc_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await osc_task
+        if skeleton_task is not None:
+            skeleton_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await skeleton_task
+        workspace.close_subscriptions()
+        if recorder is not None:
+            workspace.recorder = None
+            recorder.close()
+
+
+def main(argv: Optional[Sequence[str]] = None, default_backend: Optional[str] = None) -> None:
+    args = parse_args(argv, default_backend)
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.INFO))
+    metrics = start_metrics(args)
+    try:
+        asyncio.run(async_main(args))
+    except KeyboardInterrupt:
+        logger.info("Shutting down %s + OSC fusion workspace", " + ".join(selected_backends(args)))
+    finally:
+        metrics.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""CPU inference backend for SynthPose: exported graphs with optional int8.
+
+On CPU the eager HRNet-W48 behind ``inference_topdown`` runs at a fraction
+of real time. This backend swaps the pose model's backbone for a frozen
+TorchScript graph and loads YOLO from its TorchScript export. Both keep
+their usual interfaces, so ``process_frame`` and ``inference_topdown`` run
+unchanged; the mmpose data pipeline, head and DARK decoding stay eager.
+
+Exported graphs are cached in ``models_local/cpu_backend`` (YOLO's export
+sits next to its weights), keyed by checkpoint, torch version, input size
+and quantization mode, so only the first start pays for the export.
+
+Quantization modes:
+
+``none``
+    float32 traced graph.
+``dynamic``
+    ``torch.ao`` dynamic int8. It only rewrites ``nn.Linear`` layers, so on
+    these convolutional models it changes little; kept for parity.
+``static``
+    FX graph-mode post-training int8 of the backbone, calibrated on frames
+    of a recorded clip. Falls back to float32 if the backbone cannot be
+    symbolically traced.
+
+Compare the backend against the eager model on a recorded clip with::
+
+    python -m pose_stream_server.synthpose.cpu_backend clip.mp4 --quantize static --frames 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import hashlib
+import logging
+import os
+import time
+from typing import List, Optional, Sequence
+
+import numpy as np
+import torch
+from torch import nn
+
+from pose_stream_server.common.frame_source import open_frame_source
+from pose_stream_server.synthpose.model_store import MODELS_ROOT
+
+logger = logging.getLogger(__name__)
+
+BACKEND_ROOT = os.path.join(MODELS_ROOT, "cpu_backend")
+QUANTIZE_MODES = ("none", "dynamic", "static")
+CALIBRATION_FRAMES = 64
+# Report thresholds
+MIN_SCORE = 0.3
+PCK_PIXELS = 5.0
+
+
+class TracedBackbone(nn.Module):
+    """Drop-in for an mmpose backbone that runs an exported graph."""
+
+    def __init__(self, graph: torch.jit.ScriptModule) -> None:
+        super().__init__()
+        self.graph = graph
+
+    def forward(self, x: torch.Tensor):
+        with torch.inference_mode():
+            out = self.graph(x)
+        return tuple(out) if isinstance(out, (list, tuple)) else (out,)
+
+
+def configure_threads(threads: int) -> None:
+    if threads > 0:
+        torch.set_num_threads(threads)
+    logger.info("CPU backend using %d intra-op threads", torch.get_num_threads())
+
+
+def _input_shape(synth_model) -> tuple:
+    width, height = synth_model.cfg.codec.input_size
+    return (1, 3, int(height), int(width))
+
+
+def _cache_path(checkpoint_path: str, quantize: str, shape: tuple) -> str:
+    stat = os.stat(checkpoint_path)
+    key = f"{os.path.abspath(checkpoint_path)}:{stat.st_size}:{stat.st_mtime_ns}:{torch.__version__}:{shape}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(BACKEND_ROOT, f"synthpose_backbone-{quantize}-{digest}.pt")
+
+
+def _quantize_static(backbone: nn.Module, example: torch.Tensor, calibration: Sequence[torch.Tensor]) -> nn.Module:
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    prepared = prepare_fx(copy.deepcopy(backbone), get_default_qconfig_mapping("x86"), example_inputs=(example,))
+    with torch.no_grad():
+        for batch in calibration:
+            prepared(batch)
+    return convert_fx(prepared)
+
+
+def export_backbone(
+    synth_model,
+    checkpoint_path: str,
+    quantize: str = "none",
+    calibration: Optional[Sequence[torch.Tensor]] = None,
+) -> torch.jit.ScriptModule:
+    """Load the cached backbone graph, exporting it first if needed."""
+
+    shape = _input_shape(synth_model)
+    path = _cache_path(checkpoint_path, quantize, shape)
+    if os.path.isfile(path):
+        logger.info("Loading cached SynthPose graph %s", path)
+        return torch.jit.load(path, map_location="cpu")
+
+    backbone = synth_model.backbone.eval()
+    example = torch.randn(shape)
+    if quantize == "dynamic":
+        backbone = torch.ao.quantization.quantize_dynamic(backbone, {nn.Linear}, dtype=torch.qint8)
+    elif quantize == "static":
+        if not calibration:
+            raise ValueError("Static quantization needs calibration frames (--quantize-clip)")
+        try:
+            backbone = _quantize_static(backbone, example, calibration)
+        except Exception:
+            logger.exception("Static quantization failed; exporting the float32 backbone instead")
+            quantize = "none"
+            path = _cache_path(checkpoint_path, quantize, shape)
+
+    logger.info("Exporting SynthPose backbone (%s) to %s", quantize, path)
+    with torch.no_grad():
+        graph = torch.jit.trace(backbone, example, check_trace=False, strict=False)
+    graph = torch.jit.freeze(graph.eval())
+
+    os.makedirs(BACKEND_ROOT, exist_ok=True)
+    torch.jit.save(graph, path + ".tmp")
+    os.replace(path + ".tmp", path)
+    return graph
+
+
+def export_yolo(yolo_path: str) -> str:
+    """TorchScript export of the YOLO weights, created once next to them."""
+
+    target = os.path.splitext(yolo_path)[0] + ".torchscript"
+    if not os.path.isfile(target):
+        from ultralytics import YOLO
+
+        logger.info("Exporting YOLO to %s", target)
+        exported = YOLO(yolo_path).export(format="torchscript")
+        if os.path.abspath(exported) != os.path.abspath(target):
+            os.replace(exported, target)
+    return target
+
+
+def collect_calibration_inputs(
+    synth_model, yolo_model, clip: str, frames: int = CALIBRATION_FRAMES
+) -> List[torch.Tensor]:
+    """Backbone inputs for ``frames`` frames spread over ``clip``.
+
+    Runs the regular detection + mmpose pipeline and captures what reaches
+    the backbone, so calibration sees exactly the preprocessing used live.
+    """
+
+    from mmpose.apis import inference_topdown
+
+    from pose_stream_server.synthpose.synthpose_mmpose_server import detect_persons
+
+    inputs: List[torch.Tensor] = []
+    handle = synth_model.backbone.register_forward_pre_hook(lambda _, args: inputs.append(args[0].detach().clone()))
+    source = open_frame_source(clip)
+    try:
+        step = max(1, len(source) // frames) if len(source) else 1
+        index = 0
+        while len(inputs) < frames:
+            ok, frame = source.read()
+            if not ok:
+                break
+            index += 1
+            if (index - 1) % step:
+                continue
+            bboxes = detect_persons(frame, yolo_model, "cpu")
+            if not bboxes:
+                height, width = frame.shape[:2]
+                bboxes = [[0, 0, width, height]]
+            inference_topdown(synth_model, frame, bboxes=bboxes, bbox_format='xyxy')
+    finally:
+        handle.remove()
+        source.release()
+    logger.info("Collected %d calibration inputs from %s", len(inputs), clip)
+    return inputs
+
+
+def load_cpu_models(
+    yolo_path: str,
+    synth_model,
+    checkpoint_path: str,
+    quantize: str = "none",
+    threads: int = 0,
+    quantize_clip: Optional[str] = None,
+):
+    """Return ``(yolo_model, synth_model)`` running on the exported graphs.
+
+    ``synth_model`` is modified in place (its backbone is replaced).
+    """
+
+    from ultralytics import YOLO
+
+    configure_threads(threads)
+    yolo_model = YOLO(export_yolo(yolo_path), task="detect")
+
+    calibration = None
+    shape = _input_shape(synth_model)
+    if quantize == "static" and not os.path.isfile(_cache_path(checkpoint_path, quantize, shape)):
+        if quantize_clip is None:
+            raise ValueError("--quantize static needs --quantize-clip for calibration on first export")
+        calibration = collect_calibration_inputs(synth_model, yolo_model, quantize_clip)
+
+    synth_model.backbone = TracedBackbone(export_backbone(synth_model, checkpoint_path, quantize, calibration))
+    return yolo_model, synth_model
+
+
+# Accuracy vs. speed report
+def _run_clip(clip: str, frames: int, models) -> tuple:
+    from pose_stream_server.synthpose.synthpose_mmpose_server import _SnapshotSink, process_frame
+
+    yolo_model, yolo_device, synth_model, _ = models
+    sink = _SnapshotSink()
+    latencies: List[float] = []
+    keypoints: List[Optional[np.ndarray]] = []
+    source = open_frame_source(clip)
+    try:
+        while len(latencies) < frames:
+            ok, frame = source.read()
+            if not ok:
+                break
+            sink.snapshot = None
+            began = time.perf_counter()
+            process_frame(frame, yolo_model, yolo_device, synth_model, sink, timestamp=0.0)
+            latencies.append(time.perf_counter() - began)
+            keypoints.append(None if sink.snapshot is None else sink.snapshot.data.copy())
+    finally:
+        source.release()
+    return np.asarray(latencies), keypoints
+
+
+def accuracy_report(clip: str, frames: int, quantize: str, threads: int) -> str:
+    from pose_stream_server.synthpose.synthpose_mmpose_server import setup_models
+
+    eager = setup_models(device="cpu", cpu_backend="eager", torch_threads=threads)
+    eager_lat, eager_kpts = _run_clip(clip, frames, eager)
+    backend = setup_models(
+        device="cpu", cpu_backend="traced", quantize=quantize, torch_threads=threads, quantize_clip=clip
+    )
+    backend_lat, backend_kpts = _run_clip(clip, frames, backend)
+
+    both = [(a, b) for a, b in zip(eager_kpts, backend_kpts) if a is not None and b is not None and a.shape == b.shape]
+    detected_eager = sum(a is not None for a in eager_kpts)
+    agreement = len(both) / max(1, detected_eager)
+
+    lines = [
+        f"SynthPose CPU backend ({quantize}) vs eager on {clip}, {len(eager_lat)} frames, "
+        f"{torch.get_num_threads()} threads",
+        f"  eager    mean {eager_lat.mean() * 1000:7.1f} ms  p95 {np.percentile(eager_lat, 95) * 1000:7.1f} ms",
+        f"  backend  mean {backend_lat.mean() * 1000:7.1f} ms  p95 {np.percentile(backend_lat, 95) * 1000:7.1f} ms",
+        f"  speedup  {eager_lat.mean() / max(backend_lat.mean(), 1e-9):.2f}x",
+        f"  frames with a pose in both: {len(both)} ({agreement:.1%} of eager detections)",
+    ]
+    if both:
+        eager_arr = np.stack([a for a, _ in both])
+        backend_arr = np.stack([b for _, b in both])
+        mask = eager_arr[..., 3] >= MIN_SCORE
+        error = np.linalg.norm(eager_arr[..., :2] - backend_arr[..., :2], axis=-1)[mask]
+        score_diff = np.abs(eager_arr[..., 3] - backend_arr[..., 3])[mask]
+        if error.size:
+            lines += [
+                f"  keypoint error  mean {error.mean():.2f} px  p95 {np.percentile(error, 95):.2f} px  "
+                f"PCK@{PCK_PIXELS:g}px {np.mean(error <= PCK_PIXELS):.1%}",
+                f"  score abs diff  mean {score_diff.mean():.4f}",
+            ]
+    return "\n".join(lines)
+
+
+# CLI entrypoint
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare the SynthPose CPU backend with the eager model")
+    parser.add_argument("clip", help="Recorded video file or image directory")
+    parser.add_argument("--frames", type=int, default=200, help="Frames to evaluate (default: 200)")
+    parser.add_argument("--quantize", choices=QUANTIZE_MODES, default="none")
+    parser.add_argument("--threads", type=int, default=0, help="Intra-op threads, 0 = torch default")
+    parser.add_argument("--log-level", default="INFO", help="Logging level (default: INFO)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    args = parse_args(argv)
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.INFO))
+    print(accuracy_report(args.clip, args.frames, args.quantize, args.threads))
+
+
+if __name__ == "__main__":
+    main()
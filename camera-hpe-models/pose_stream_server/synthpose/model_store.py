@@ -0,0 +1,215 @@
+"""Local model files for the SynthPose server, tracked by a manifest.
+
+``models_local/manifest.json`` records size, mtime and SHA-256 of every file
+the server needs. On start the size/mtime pair is compared first, which is
+free; a file is only re-hashed when that pair changed (or when full
+verification is requested), and only fetched when it is missing or its hash
+no longer matches. With ``offline=True`` nothing is ever downloaded and a
+missing model is a clear error instead of a network timeout.
+
+A :class:`ModelSpec` can pin the size and SHA-256 of each released file.
+Pinned files are checked against the pin before they enter the manifest,
+whether freshly downloaded or found on disk, and a download that does not
+match is discarded and fetched again. Unpinned files are trusted on first
+use.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import urllib.request
+from dataclasses import dataclass
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MODELS_ROOT = "./models_local"
+MANIFEST_NAME = "manifest.json"
+HASH_CHUNK = 1 << 20
+# Downloads tried before a file that does not match its pin is an error.
+FETCH_ATTEMPTS = 2
+
+
+class PinnedFile(NamedTuple):
+    name: str
+    size: int
+    sha256: str
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    name: str
+    directory: str
+    files: Tuple[str, ...]
+    # Fetches the missing files into ``directory``.
+    fetch: Callable[["ModelSpec", str], None]
+    # Expected size and SHA-256 of released files.
+    pinned: Tuple[PinnedFile, ...] = ()
+
+    def pin(self, name: str) -> Optional[PinnedFile]:
+        return next((pin for pin in self.pinned if pin.name == name), None)
+
+
+def _fetch_url(url: str) -> Callable[[ModelSpec, str], None]:
+    def fetch(spec: ModelSpec, directory: str) -> None:
+        target = os.path.join(directory, spec.files[0])
+        logger.info("Downloading %s to: %s", spec.name, target)
+        # Download beside the target so an interrupted fetch never looks like a model.
+        urllib.request.urlretrieve(url, target + ".part")
+        os.replace(target + ".part", target)
+
+    return fetch
+
+
+def _fetch_hf_repo(repo_id: str) -> Callable[[ModelSpec, str], None]:
+    def fetch(spec: ModelSpec, directory: str) -> None:
+        # Imported here: huggingface_hub is slow to import and only needed on a miss.
+        from huggingface_hub import snapshot_download
+
+        logger.info("Downloading %s from %s to: %s", spec.name, repo_id, directory)
+        snapshot_download(repo_id=repo_id, local_dir=directory, allow_patterns=list(spec.files))
+
+    return fetch
+
+
+YOLO_MODEL = ModelSpec(
+    "yolov8n",
+    "yolov8n",
+    ("yolov8n.pt",),
+    _fetch_url("https://github.com/ultralytics/assets/releases/download/v0.0.0/yolov8n.pt"),
+)
+SYNTHPOSE_MODEL = ModelSpec(
+    "synthpose_hrnet",
+    "synthpose_hrnet",
+    ("td-hm_hrnet-w48_dark-8xb32-210e_synthpose_inference.py", "hrnet-w48_dark.pth"),
+    _fetch_hf_repo("stanfordmimi/synthpose-hrnet-48-mmpose"),
+)
+
+
+def sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelStore:
+    def __init__(self, root: str = MODELS_ROOT, offline: bool = False, verify: bool = False) -> None:
+        self.root = root
+        self.offline = offline
+        self.verify = verify
+        self.manifest_path = os.path.join(root, MANIFEST_NAME)
+        self.manifest: Dict[str, Dict] = self._load_manifest()
+
+    def ensure(self, spec: ModelSpec) -> Dict[str, str]:
+        """Make ``spec``'s files available locally; returns ``{file: path}``."""
+
+        directory = os.path.join(self.root, spec.directory)
+        paths = {name: os.path.join(directory, name) for name in spec.files}
+        bad = [name for name, path in paths.items() if not self._is_valid(spec, name, path)]
+        if not bad:
+            logger.info("%s model found locally.", spec.name)
+            return paths
+
+        if self.offline:
+            raise RuntimeError(
+                f"{spec.name} is missing or corrupt ({', '.join(bad)}) in {directory} and offline mode is on"
+            )
+        os.makedirs(directory, exist_ok=True)
+        for attempt in range(1, FETCH_ATTEMPTS + 1):
+            spec.fetch(spec, directory)
+            bad = []
+            for name in spec.files:
+                path = paths[name]
+                if not os.path.isfile(path):
+                    raise RuntimeError(f"Download of {spec.name} did not produce {name}")
+                digest = self._matches_pin(spec, name, path)
+                if digest is None:
+                    os.remove(path)
+                    bad.append(name)
+                else:
+                    self._record(spec, name, path, digest)
+            self._save_manifest()
+            if not bad:
+                return paths
+            logger.warning("Download %d of %s did not match the pinned %s", attempt, spec.name, ", ".join(bad))
+        raise RuntimeError(f"Downloaded {spec.name} does not match the pinned checksum of {', '.join(bad)}")
+
+    # Internals
+    def _is_valid(self, spec: ModelSpec, name: str, path: str) -> bool:
+        if not os.path.isfile(path):
+            return False
+        entry = self.manifest.get(spec.name, {}).get(name)
+        stat = os.stat(path)
+        pin = spec.pin(name)
+        if entry is None or (pin is not None and entry["sha256"] != pin.sha256):
+            # Populated before the manifest (or the pin) existed: adopt the
+            # file if it is the released one.
+            digest = self._matches_pin(spec, name, path)
+            if digest is None:
+                return False
+            logger.info("Adding %s/%s to the model manifest", spec.name, name)
+            self._record(spec, name, path, digest)
+            self._save_manifest()
+            return True
+        if not self.verify and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return True
+        if entry["size"] != stat.st_size or sha256_file(path) != entry["sha256"]:
+            logger.warning("Checksum mismatch for %s", path)
+            return False
+        # Same content, touched on disk; refresh mtime so the next start is fast.
+        entry["mtime_ns"] = stat.st_mtime_ns
+        self._save_manifest()
+        return True
+
+    def _matches_pin(self, spec: ModelSpec, name: str, path: str) -> Optional[str]:
+        """SHA-256 of ``path``, or None if it differs from ``spec``'s pin for ``name``."""
+
+        pin = spec.pin(name)
+        if pin is not None and os.path.getsize(path) != pin.size:
+            logger.warning("Size mismatch for %s: expected %d bytes", path, pin.size)
+            return None
+        digest = sha256_file(path)
+        if pin is not None and digest != pin.sha256:
+            logger.warning("Checksum mismatch for %s", path)
+            return None
+        return digest
+
+    def _record(self, spec: ModelSpec, name: str, path: str, digest: str) -> None:
+        stat = os.stat(path)
+        self.manifest.setdefault(spec.name, {})[name] = {
+            "sha256": digest,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+
+    def _load_manifest(self) -> Dict[str, Dict]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            logger.warning("Ignoring unreadable model manifest %s", self.manifest_path)
+            return {}
+
+    def _save_manifest(self) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+
+
+def ensure_models(offline: bool = False, verify: bool = False, root: Optional[str] = None) -> Tuple[str, str, str]:
+    """Return ``(yolo_weights, synthpose_config, synthpose_checkpoint)`` paths."""
+
+    store = ModelStore(root or MODELS_ROOT, offline=offline, verify=verify)
+    yolo = store.ensure(YOLO_MODEL)
+    synth = store.ensure(SYNTHPOSE_MODEL)
+    config, checkpoint = SYNTHPOSE_MODEL.files
+    return yolo[YOLO_MODEL.files[0]], synth[config], synth[checkpoint]
@@ -0,0 +1,199 @@
+"""Keyframe person detection with a lightweight IoU tracker.
+
+YOLO only runs on keyframes (every N frames, or whenever pose confidence
+drops). In between, the person box is propagated from the previous frame's
+SynthPose keypoints, padded to absorb motion. A small IoU tracker keeps a
+stable identity for the headset wearer so pose inference runs on that one
+person only.
+"""
+
+from __future__ import annotations
+
+import itertools
+import logging
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between ``(N, 4)`` and ``(M, 4)`` xyxy boxes."""
+
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0.0, None) * np.clip(y2 - y1, 0.0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0.0)
+
+
+def bbox_from_keypoints(
+    keypoints: np.ndarray,
+    scores: Optional[np.ndarray],
+    frame_shape: Sequence[int],
+    pad_ratio: float = 0.15,
+    min_score: float = 0.3,
+) -> Optional[np.ndarray]:
+    """Padded xyxy box around the confident keypoints, clipped to the frame."""
+
+    keypoints = np.asarray(keypoints, dtype=np.float32)
+    if scores is not None:
+        keypoints = keypoints[np.asarray(scores) >= min_score]
+    if len(keypoints) < 2:
+        return None
+
+    x1, y1 = keypoints[:, :2].min(axis=0)
+    x2, y2 = keypoints[:, :2].max(axis=0)
+    pad_x = (x2 - x1) * pad_ratio
+    pad_y = (y2 - y1) * pad_ratio
+    height, width = frame_shape[:2]
+    return np.array(
+        [
+            max(0.0, x1 - pad_x),
+            max(0.0, y1 - pad_y),
+            min(float(width), x2 + pad_x),
+            min(float(height), y2 + pad_y),
+        ],
+        dtype=np.float32,
+    )
+
+
+@dataclass
+class Track:
+    track_id: int
+    bbox: np.ndarray
+    hits: int = 1
+    misses: int = 0
+
+
+class PersonTracker:
+    """Greedy IoU tracker that keeps one track designated as the wearer."""
+
+    def __init__(self, iou_threshold: float = 0.3, max_misses: int = 3) -> None:
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.tracks: List[Track] = []
+        self.primary_id: Optional[int] = None
+        self._ids = itertools.count(1)
+
+    @property
+    def primary(self) -> Optional[Track]:
+        for track in self.tracks:
+            if track.track_id == self.primary_id:
+                return track
+        return None
+
+    def update(self, detections: np.ndarray) -> Optional[Track]:
+        """Associate a keyframe's detections with existing tracks."""
+
+        detections = np.asarray(detections, dtype=np.float32).reshape(-1, 4)
+        matched_tracks = set()
+        matched_dets = set()
+
+        if self.tracks and len(detections):
+            ious = iou_matrix(np.stack([t.bbox for t in self.tracks]), detections)
+            # Greedy assignment, best pairs first.
+            for flat in np.argsort(-ious, axis=None):
+                ti, di = np.unravel_index(flat, ious.shape)
+                if ious[ti, di] < self.iou_threshold:
+                    break
+                if ti in matched_tracks or di in matched_dets:
+                    continue
+                track = self.tracks[ti]
+                track.bbox = detections[di]
+                track.hits += 1
+                track.misses = 0
+                matched_tracks.add(ti)
+                matched_dets.add(di)
+
+        for ti, track in enumerate(self.tracks):
+            if ti not in matched_tracks:
+                track.misses += 1
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+
+        for di in range(len(detections)):
+            if di not in matched_dets:
+                self.tracks.append(Track(next(self._ids), detections[di]))
+
+        if self.primary is None and self.tracks:
+            # Acquire the wearer as the largest visible person (closest to camera).
+            visible = [t for t in self.tracks if t.misses == 0] or self.tracks
+            areas = [(t.bbox[2] - t.bbox[0]) * (t.bbox[3] - t.bbox[1]) for t in visible]
+            self.primary_id = visible[int(np.argmax(areas))].track_id
+            logger.info("Tracking headset wearer as person track %d", self.primary_id)
+        return self.primary
+
+    def propagate(self, bbox: np.ndarray) -> None:
+        """Move the wearer's box between keyframes (from pose keypoints)."""
+
+        track = self.primary
+        if track is not None:
+            track.bbox = bbox
+
+    def reset(self) -> None:
+        self.tracks.clear()
+        self.primary_id = None
+
+
+class KeyframePersonSelector:
+    """Decide when to run the detector and which box to run pose inference on."""
+
+    def __init__(
+        self,
+        detect_every: int = 5,
+        min_track_score: float = 0.4,
+        bbox_pad: float = 0.15,
+        tracker: Optional[PersonTracker] = None,
+    ) -> None:
+        self.detect_every = max(1, detect_every)
+        self.min_track_score = min_track_score
+        self.bbox_pad = bbox_pad
+        self.tracker = tracker or PersonTracker()
+        self._frames_since_detection = 0
+        self._needs_detection = True
+        self.detector_runs = 0
+
+    def select(self, frame, detect: Callable[[object], np.ndarray]) -> Optional[np.ndarray]:
+        """Return the wearer's xyxy box for ``frame``, running ``detect`` on keyframes."""
+
+        if (
+            self._needs_detection
+            or self.tracker.primary is None
+            or self._frames_since_detection >= self.detect_every - 1
+        ):
+            self.detector_runs += 1
+            self._frames_since_detection = 0
+            self._needs_detection = False
+            primary = self.tracker.update(detect(frame))
+            if primary is None or primary.misses:
+                # Wearer not seen on this keyframe: try again next frame.
+                self._needs_detection = True
+                return None
+            return primary.bbox
+
+        self._frames_since_detection += 1
+        return self.tracker.primary.bbox
+
+    def observe_pose(self, keypoints: np.ndarray, scores: Optional[np.ndarray], frame_shape) -> None:
+        """Feed back the wearer's pose so the next frame can skip detection."""
+
+        mean_score = float(np.mean(scores)) if scores is not None and len(scores) else 0.0
+        bbox = bbox_from_keypoints(keypoints, scores, frame_shape, pad_ratio=self.bbox_pad)
+        if bbox is None or mean_score < self.min_track_score:
+            logger.debug("Pose confidence %.2f below %.2f, forcing detection", mean_score, self.min_track_score)
+            self._needs_detection = True
+            return
+        self.tracker.propagate(bbox)
+
+    def lost(self) -> None:
+        """No pose for the current box; re-detect on the next frame."""
+
+        self._needs_detection = True
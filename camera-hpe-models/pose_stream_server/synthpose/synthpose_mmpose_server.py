@@ -1,97 +1,156 @@
 """Synthpose captures loop that shares a workspace with Unity OSC packets.
+
+The model is wrapped as the ``synthpose`` pose backend; running this file
+starts ``pose_server.py`` with that backend preselected. torch, mmpose and
+ultralytics are imported inside ``setup_models`` so the server (and the
+Quest listener) come up before the heavy imports finish.
 """
-import os
 import cv2
 import numpy as np
-import torch
 import logging
 import time
-import argparse
-import asyncio
-import contextlib
+import functools
 import sys
 from pathlib import Path
-from mmpose.apis import init_model, inference_topdown
-from mmpose.visualization import PoseLocalVisualizer
-from ultralytics import YOLO
-import urllib.request
-from huggingface_hub import snapshot_download
+from typing import Optional
 
 current_file = Path(__file__).resolve()
 project_root = current_file.parents[2]
 sys.path.insert(0, str(project_root))
 # Shared fusion workspace so this process can publish pose snapshots
-from pose_stream_server.common.fusion_workspace import FusionWorkspace, PoseSnapshot
-# OSC receiver helper
-from pose_stream_server.udp_pose_receiver.udp_pose_receiver import run_server as start_osc_server
+from pose_stream_server.common.fusion_workspace import LANDMARK_WIDTH, PIXELS, PoseSnapshot
+from pose_stream_server.common.metrics import REGISTRY
+# Pose backend interface the shared server drives
+from pose_stream_server.common.backends import PoseBackend, register_backend
+from pose_stream_server.common.startup import StartupTimer
+# Downscaled detection and ROI-cropped pose inference
+from pose_stream_server.common.frame_pool import release_frame
+from pose_stream_server.common.pyramid import ResolutionPyramid, parse_size
+# Local model manifest (skips downloads when models are present)
+from pose_stream_server.synthpose.model_store import MODELS_ROOT, ensure_models
+# Keyframe detection + wearer tracking
+from pose_stream_server.synthpose.person_tracker import KeyframePersonSelector
+from pose_stream_server.udp_pose_receiver.quest_packet import get_joint_layout
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
-
-# Create or reuse a workspace for fusing pose sources
-workspace = FusionWorkspace()
 
 # Choose device
 def choose_device() -> str:
+    import torch
+
     if torch.cuda.is_available():
         return "cuda"
     if hasattr(torch.backends, "mps") and torch.backends.mps.is_available():
         return "mps"
     return "cpu"
 
-# YOLOv8 local model download
-YOLO_DIR = "./models_local/yolov8n"
-os.makedirs(YOLO_DIR, exist_ok=True)
 
-yolo_local_path = os.path.join(YOLO_DIR, "yolov8n.pt")
-
-def setup_models():
-    """Download / initialize YOLO and SynthPose models and return them.
+WARMUP_FRAME_SHAPE = (480, 640, 3)
+DETECT_SECONDS = REGISTRY.histogram("pose_detect_seconds", "Person detector time per keyframe", source="synthpose")
+INFERENCE_SECONDS = REGISTRY.histogram("pose_inference_seconds", "Pose model time per frame", source="synthpose")
+# Keypoints are in image pixels.
+SKIP_TOLERANCE_PX = 4.0
+SMOOTH_BETA = 0.02
+# GetBBoxCenterScale's default in the SynthPose config: mmpose widens every
+# box by this much before its affine crop, so ROI crops add the same context.
+BBOX_PADDING = 1.25
+
+
+def setup_models(
+    offline: bool = False,
+    verify_models: bool = False,
+    warmup: bool = True,
+    timer=None,
+    device=None,
+    cpu_backend: str = "traced",
+    quantize: str = "none",
+    torch_threads: int = 0,
+    quantize_clip=None,
+):
+    """Find (or download) and initialize YOLO and SynthPose models.
+
+    On CPU (unless ``cpu_backend="eager"``) both models run from exported
+    graphs, see synthpose/cpu_backend.py.
 
     Returns: (yolo_model, yolo_device, synth_model, visualizer)
     """
-    if not os.path.exists(yolo_local_path):
-        logger.info("Downloading YOLOv8n model to: %s", yolo_local_path)
-        url = "https://github.com/ultralytics/assets/releases/download/v0.0.0/yolov8n.pt"
-        urllib.request.urlretrieve(url, yolo_local_path)
-    else:
-        logger.info("YOLOv8n model found locally.")
-
-    yolo_device = choose_device()
-    yolo_model = YOLO(yolo_local_path)
-    if yolo_device != "cpu":
-        yolo_model.to(yolo_device)
+    timer = timer or StartupTimer()
+    device = device or choose_device()
+
+    with timer.phase("model files"):
+        yolo_path, config_path, checkpoint_path = ensure_models(offline=offline, verify=verify_models)
+
+    with timer.phase("import torch"):
+        import torch  # noqa: F401
+    with timer.phase("import ultralytics"):
+        from ultralytics import YOLO
+    with timer.phase("import mmpose"):
+        from mmpose.apis import init_model
+        from mmpose.visualization import PoseLocalVisualizer
+
+    with timer.phase("load yolo"):
+        yolo_device = device
+        yolo_model = YOLO(yolo_path)
+        if yolo_device != "cpu":
+            yolo_model.to(yolo_device)
     logger.info("Using YOLO device: %s", yolo_device)
 
-    # SynthPose local model download and load
-    MODEL_DIR = "./models_local/synthpose_hrnet"
-    os.makedirs(MODEL_DIR, exist_ok=True)
-
-    repo_dir = snapshot_download(
-        repo_id="stanfordmimi/synthpose-hrnet-48-mmpose",
-        local_dir=MODEL_DIR,
-    )
+    with timer.phase("load synthpose"):
+        synth_model = init_model(config_path, checkpoint_path, device=device)
+        synth_model.eval()
+    logger.info("SynthPose HRNet48 initialized on %s", device)
 
-    config_path = os.path.join(repo_dir, "td-hm_hrnet-w48_dark-8xb32-210e_synthpose_inference.py")
-    checkpoint_path = os.path.join(repo_dir, "hrnet-w48_dark.pth")
+    if device == "cpu" and cpu_backend != "eager":
+        with timer.phase("cpu backend"):
+            from pose_stream_server.synthpose.cpu_backend import load_cpu_models
 
-    device = choose_device()
-    synth_model = init_model(config_path, checkpoint_path, device=device)
-    synth_model.eval()
-    logger.info("SynthPose HRNet48 initialized on %s", device)
+            yolo_model, synth_model = load_cpu_models(
+                yolo_path, synth_model, checkpoint_path, quantize, torch_threads, quantize_clip
+            )
+        logger.info("SynthPose running on the CPU backend (quantize=%s)", quantize)
 
     visualizer = PoseLocalVisualizer()
     visualizer.set_dataset_meta(synth_model.dataset_meta)
 
+    if warmup:
+        with timer.phase("warm-up inference"):
+            warm_up(yolo_model, yolo_device, synth_model)
+
     return yolo_model, yolo_device, synth_model, visualizer
 
 
+def warm_up(yolo_model, yolo_device, synth_model) -> None:
+    """Run both models once so the first real frame doesn't pay for lazy init."""
+
+    from mmpose.apis import inference_topdown
+
+    frame = np.zeros(WARMUP_FRAME_SHAPE, dtype=np.uint8)
+    height, width = frame.shape[:2]
+    detect_persons(frame, yolo_model, yolo_device)
+    # A blank frame has no people, so pose inference gets a full-frame box.
+    inference_topdown(synth_model, frame, bboxes=[[0, 0, width, height]], bbox_format='xyxy')
+
+
+def _to_numpy(value):
+    if hasattr(value, "detach"):  # torch.Tensor
+        return value.detach().cpu().numpy()
+    return np.asarray(value)
+
+
+@functools.lru_cache(maxsize=None)
+def synthpose_layout(num_kpts: int):
+    """Cached keypoint-name table for a SynthPose model with ``num_kpts`` outputs."""
+
+    return get_joint_layout([f"synthpose_kpt_{i}" for i in range(num_kpts)])
+
+
 # Webcam Loop
-def process_frame(frame, yolo_model, yolo_device, synth_model, visualizer, workspace, window_name, conf_thresh=0.6):
-    vis_frame = frame.copy()
+def detect_persons(frame, yolo_model, yolo_device, conf_thresh=0.6):
+    """YOLO person detection; returns a list of xyxy boxes."""
 
-    # YOLO person detection
+    began = time.perf_counter()
     yolo_results = yolo_model(frame, device=yolo_device, verbose=False)[0]
+    DETECT_SECONDS.observe(time.perf_counter() - began)
 
     person_bboxes = []
     for box in yolo_results.boxes:
@@ -100,152 +159,347 @@ def process_frame(frame, yolo_model, yolo_device, synth_model, visualizer, works
         if cls == 0 and conf >= conf_thresh:  # person + high confidence
             x1, y1, x2, y2 = box.xyxy[0].tolist()
             person_bboxes.append([x1, y1, x2, y2])
+    return person_bboxes
 
-    if len(person_bboxes) == 0:
-        logger.debug("No person detected in frame")
-        cv2.imshow(window_name, vis_frame)
-        return True
 
-    # Draw all YOLO boxes
-    for (x1, y1, x2, y2) in person_bboxes:
-        cv2.rectangle(vis_frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 255), 2)
-
-    # Run SynthPose for all persons
-    pose_samples = inference_topdown(
-        synth_model,
-        frame,
-        bboxes=person_bboxes,
-        bbox_format='xyxy'
-    )
+def detect_persons_scaled(frame, yolo_model, yolo_device, conf_thresh=0.6, pyramid=None):
+    """``detect_persons`` on the pyramid's detection image, boxes in frame pixels."""
+
+    if pyramid is None:
+        return detect_persons(frame, yolo_model, yolo_device, conf_thresh)
+    buffer, image, transform = pyramid.detection_input(frame)
+    try:
+        boxes = detect_persons(image, yolo_model, yolo_device, conf_thresh)
+    finally:
+        release_frame(buffer)
+    return transform.boxes_to_frame(boxes).tolist() if boxes else []
+
+
+def pose_roi(frame, bbox, synth_model, pyramid):
+    """SynthPose on one ``roi_size`` crop around ``bbox``; keypoints mapped to frame pixels.
 
+    Returns the PoseDataSample, or None if mmpose returned nothing.
+    """
+
+    from mmpose.apis import inference_topdown
+
+    buffer, transform = pyramid.roi_input(frame, bbox)
+    try:
+        height, width = buffer.shape[:2]
+        # mmpose pads the box again; this one pads out to exactly the crop.
+        margin_x = width * (1.0 - 1.0 / BBOX_PADDING) * 0.5
+        margin_y = height * (1.0 - 1.0 / BBOX_PADDING) * 0.5
+        began = time.perf_counter()
+        pose_samples = inference_topdown(
+            synth_model,
+            buffer.array,
+            bboxes=[[margin_x, margin_y, width - margin_x, height - margin_y]],
+            bbox_format='xyxy'
+        )
+        INFERENCE_SECONDS.observe(time.perf_counter() - began)
+    finally:
+        buffer.release()
     if len(pose_samples) == 0:
-        logger.debug("Pose not detected even though YOLO found persons.")
-        cv2.imshow(window_name, vis_frame)
-        return True
+        return None
 
-    # inference_topdown returns a list of PoseDataSample (one per image),
-    # since we're giving a single frame, it's usually length 1.
     pose_batch = pose_samples[0]
-
     pred_instances = getattr(pose_batch, "pred_instances", None)
     if pred_instances is not None and hasattr(pred_instances, "keypoints"):
-        keypoints = pred_instances.keypoints  # (num_instances, num_keypoints, 2)
-        keypoint_scores = getattr(pred_instances, "keypoint_scores", None)  # (num_instances, num_keypoints) if present
-
-        if isinstance(keypoints, torch.Tensor):
-            keypoints_np = keypoints.detach().cpu().numpy()
-        else:
-            keypoints_np = np.asarray(keypoints)
-
-        if keypoint_scores is not None:
-            if isinstance(keypoint_scores, torch.Tensor):
-                keypoint_scores_np = keypoint_scores.detach().cpu().numpy()
-            else:
-                keypoint_scores_np = np.asarray(keypoint_scores)
-        else:
-            keypoint_scores_np = None
-
-        if keypoints_np.ndim == 3 and keypoints_np.shape[0] > 0:
-            # Build a simple landmarks map for the fusion workspace
-            first_kpts = keypoints_np[0]  # (num_kpts, 2)
-            if keypoint_scores_np is not None and keypoint_scores_np.shape[0] > 0:
-                first_scores = keypoint_scores_np[0]
-            else:
-                first_scores = None
-
-            num_kpts = first_kpts.shape[0]
-            landmarks = {}
-            for i in range(num_kpts):
-                kname = f"synthpose_kpt_{i}"
-                kp_x = float(first_kpts[i, 0])
-                kp_y = float(first_kpts[i, 1])
-                score = float(first_scores[i]) if (first_scores is not None and i < first_scores.shape[0]) else 0.0
-                landmarks[kname] = {"x": kp_x, "y": kp_y, "z": 0.0, "visibility": score}
-
-            snapshot = PoseSnapshot(timestamp=time.time(), landmarks=landmarks)
-            try:
-                workspace.update_lower_body(snapshot)
-            except Exception:
-                logger.exception("Failed to publish SynthPose snapshot to fusion workspace")
+        pred_instances.keypoints = transform.to_frame(_to_numpy(pred_instances.keypoints))
+        if hasattr(pred_instances, "bboxes"):
+            pred_instances.bboxes = transform.boxes_to_frame(_to_numpy(pred_instances.bboxes))
+    return pose_batch
 
-    # Draw skeletons for all instances using MMPose visualizer
-    visualizer.add_datasample(
-        name="vis",
-        image=vis_frame,
-        data_sample=pose_batch,
-        draw_gt=False,
-        draw_pred=True,
-        show=False,
-        out_file=None
-    )
 
-    vis_frame = visualizer.get_image()
-    cv2.imshow(window_name, vis_frame)
-    return True
+def first_instance(pose_batch):
+    """``(keypoints (K, 2), scores (K,) or None)`` of the first posed person, or None."""
 
-def run_capture_loop(camera_index: int, yolo_model, yolo_device, synth_model, visualizer):
-    cap = cv2.VideoCapture(camera_index)
-    if not cap.isOpened():
-        raise RuntimeError("Could not open webcam.")
+    pred_instances = getattr(pose_batch, "pred_instances", None)
+    if pred_instances is None or not hasattr(pred_instances, "keypoints"):
+        return None
+    keypoints = pred_instances.keypoints  # (num_instances, num_keypoints, 2)
+    keypoint_scores = getattr(pred_instances, "keypoint_scores", None)  # (num_instances, num_keypoints) if present
 
-    window_name = "SynthPose HRNet48 - Live Pose Estimation"
-    cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
+    keypoints_np = _to_numpy(keypoints)
+    keypoint_scores_np = _to_numpy(keypoint_scores) if keypoint_scores is not None else None
+    if keypoints_np.ndim != 3 or keypoints_np.shape[0] == 0:
+        return None
+    first_kpts = keypoints_np[0]  # (num_kpts, 2)
+    if keypoint_scores_np is not None and keypoint_scores_np.shape[0] > 0:
+        return first_kpts, keypoint_scores_np[0]
+    return first_kpts, None
 
-    try:
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
 
-            cont = process_frame(frame, yolo_model, yolo_device, synth_model, visualizer, workspace, window_name)
-            if not cont:
-                break
+def keypoints_to_snapshot(keypoints, scores, timestamp: float, image_size=None) -> PoseSnapshot:
+    """Pack pixel keypoints and their scores into a SynthPose :class:`PoseSnapshot`.
 
-            if cv2.waitKey(5) & 0xFF == 27:
-                logger.info("ESC pressed, stopping Synthpose loop")
-                break
+    ``image_size`` is the ``(width, height)`` of the frame they were found in.
+    """
 
-            if cv2.getWindowProperty(window_name, cv2.WND_PROP_VISIBLE) < 1:
-                break
-    finally:
-        cap.release()
-        cv2.destroyAllWindows()
+    # (x, y, z=0, visibility) rows filled with one vectorized copy each
+    num_kpts = keypoints.shape[0]
+    data = np.zeros((num_kpts, LANDMARK_WIDTH), dtype=np.float32)
+    data[:, :2] = keypoints[:, :2]
+    if scores is not None:
+        n_scores = min(num_kpts, scores.shape[0])
+        data[:n_scores, 3] = scores[:n_scores]
+    return PoseSnapshot(timestamp, data, synthpose_layout(num_kpts), unit=PIXELS, image_size=image_size)
 
 
-def parse_args() -> argparse.Namespace:
-    parser = argparse.ArgumentParser(description="SynthPose MMPose capture server")
-    parser.add_argument("--camera-index", type=int, default=0, help="OpenCV camera index (default: 0)")
-    parser.add_argument("--osc-host", default="0.0.0.0", help="Interface for Unity OSC packets (default: 0.0.0.0)")
-    parser.add_argument("--osc-port", type=int, default=9000, help="UDP port for Unity OSC packets (default: 9000)")
-    parser.add_argument("--log-level", default="INFO", help="Logging level (default: INFO)")
-    return parser.parse_args()
+def process_frame(frame, yolo_model, yolo_device, synth_model, workspace, conf_thresh=0.6, selector=None,
+                  timestamp=None, pyramid=None):
+    """Detect persons, run SynthPose and publish the first instance.
 
+    With a ``KeyframePersonSelector`` YOLO only runs on keyframes and pose
+    inference runs on the tracked wearer's box alone; without one every
+    frame is detected and every person is posed.
 
-async def async_main(args: argparse.Namespace) -> None:
-    # Initialize models in a thread to avoid blocking the event loop
-    yolo_model, yolo_device, synth_model, visualizer = await asyncio.to_thread(setup_models)
+    With a ``ResolutionPyramid`` YOLO sees its downscaled copy of the frame
+    and, if it crops, SynthPose runs on a ROI crop around the first box only
+    (the person that gets published).
 
-    osc_task = asyncio.create_task(
-        start_osc_server(args.osc_host, args.osc_port, workspace.handle_quest_packet)
-    )
+    Returns ``(person_bboxes, pose_batch)`` for optional preview rendering;
+    ``pose_batch`` is None when nothing was detected. No drawing happens here.
+    """
 
-    try:
-        # Run the blocking capture/inference loop in a thread so OSC can run concurrently
-        await asyncio.to_thread(run_capture_loop, args.camera_index, yolo_model, yolo_device, synth_model, visualizer)
-    finally:
-        osc_task.cancel()
-        with contextlib.suppress(asyncio.CancelledError):
-            await osc_task
+    if selector is None:
+        person_bboxes = detect_persons_scaled(frame, yolo_model, yolo_device, conf_thresh, pyramid)
+    else:
+        wearer_bbox = selector.select(
+            frame,
+            lambda f: np.asarray(
+                detect_persons_scaled(f, yolo_model, yolo_device, conf_thresh, pyramid), dtype=np.float32
+            ),
+        )
+        person_bboxes = [] if wearer_bbox is None else [wearer_bbox.tolist()]
+
+    if len(person_bboxes) == 0:
+        logger.debug("No person detected in frame")
+        return person_bboxes, None
+
+    if pyramid is not None and pyramid.crops:
+        pose_batch = pose_roi(frame, person_bboxes[0], synth_model, pyramid)
+    else:
+        from mmpose.apis import inference_topdown
+
+        # Run SynthPose for all persons
+        began = time.perf_counter()
+        pose_samples = inference_topdown(
+            synth_model,
+            frame,
+            bboxes=person_bboxes,
+            bbox_format='xyxy'
+        )
+        INFERENCE_SECONDS.observe(time.perf_counter() - began)
+        # inference_topdown returns a list of PoseDataSample (one per image),
+        # since we're giving a single frame, it's usually length 1.
+        pose_batch = pose_samples[0] if len(pose_samples) else None
+
+    if pose_batch is None:
+        logger.debug("Pose not detected even though YOLO found persons.")
+        if selector is not None:
+            selector.lost()
+        return person_bboxes, None
+
+    first = first_instance(pose_batch)
+    if first is not None:
+        first_kpts, first_scores = first
+        if selector is not None:
+            selector.observe_pose(first_kpts, first_scores, frame.shape)
+        snapshot = keypoints_to_snapshot(
+            first_kpts,
+            first_scores,
+            time.time() if timestamp is None else timestamp,
+            image_size=(frame.shape[1], frame.shape[0]),
+        )
+        try:
+            workspace.update_lower_body(snapshot)
+        except Exception:
+            logger.exception("Failed to publish SynthPose snapshot to fusion workspace")
+
+    return person_bboxes, pose_batch
+
+
+def render_preview(frame, result, visualizer):
+    """Draw YOLO boxes and SynthPose skeletons (runs on the preview thread).
+
+    The preview owns ``frame`` once offered, so it is drawn on in place.
+    """
+
+    person_bboxes, pose_batch = result
+    for (x1, y1, x2, y2) in person_bboxes:
+        cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 255), 2)
+
+    if pose_batch is None:
+        return frame
+
+    # Draw skeletons for all instances using MMPose visualizer
+    visualizer.add_datasample(
+        name="vis",
+        image=frame,
+        data_sample=pose_batch,
+        draw_gt=False,
+        draw_pred=True,
+        show=False,
+        out_file=None
+    )
+    return visualizer.get_image()
+
+
+class _SnapshotSink:
+    """Stand-in workspace that just keeps the last published snapshot."""
+
+    def __init__(self) -> None:
+        self.snapshot = None
+
+    def update_lower_body(self, snapshot) -> None:
+        self.snapshot = snapshot
+
+
+def _roi_size(value: str):
+    return "model" if value == "model" else parse_size(value)
+
+
+class SynthPoseBackend(PoseBackend):
+    """YOLO person boxes + SynthPose HRNet48 keypoints (image pixels)."""
+
+    name = "synthpose"
+    title = "SynthPose HRNet48 - Live Pose Estimation"
+    skip_tolerance = SKIP_TOLERANCE_PX
+    smooth_beta = SMOOTH_BETA
+    unit = PIXELS
+
+    @classmethod
+    def add_arguments(cls, parser) -> None:
+        parser.add_argument(
+            "--detect-every",
+            type=int,
+            default=1,
+            metavar="N",
+            help="Run YOLO only every N frames and track the wearer in between (default: 1, detect every frame)",
+        )
+        parser.add_argument(
+            "--min-track-score",
+            type=float,
+            default=0.4,
+            help="Mean keypoint score below which detection is forced on the next frame (default: 0.4)",
+        )
+        parser.add_argument(
+            "--bbox-pad",
+            type=float,
+            default=0.15,
+            help="Padding ratio around propagated keypoint boxes to absorb motion (default: 0.15)",
+        )
+        parser.add_argument(
+            "--detect-size",
+            type=int,
+            default=0,
+            metavar="PX",
+            help="Run YOLO on a copy of the frame downscaled to this long side (default: 0, full frame)",
+        )
+        parser.add_argument(
+            "--roi-size",
+            type=_roi_size,
+            default=None,
+            metavar="WxH|model",
+            help="Run SynthPose on a crop around the first person resized to WxH, or 'model' for the "
+            "model's input size (default: full frame, every person)",
+        )
+        parser.add_argument(
+            "--offline",
+            action="store_true",
+            help=f"Never download models; fail if they are missing from {MODELS_ROOT}",
+        )
+        parser.add_argument(
+            "--verify-models",
+            action="store_true",
+            help="Re-hash every model file against the manifest instead of trusting size and mtime",
+        )
+        parser.add_argument("--no-warmup", action="store_true", help="Skip the warm-up inference at startup")
+        parser.add_argument(
+            "--cpu-backend",
+            choices=("traced", "eager"),
+            default="traced",
+            help="On CPU, run exported TorchScript graphs or the eager models (default: traced)",
+        )
+        parser.add_argument(
+            "--quantize",
+            choices=("none", "dynamic", "static"),
+            default="none",
+            help="int8 quantization for the CPU backend (default: none)",
+        )
+        parser.add_argument(
+            "--quantize-clip",
+            metavar="PATH",
+            default=None,
+            help="Recorded clip used to calibrate --quantize static on first export",
+        )
+        parser.add_argument(
+            "--torch-threads", type=int, default=0, help="Intra-op threads for the CPU backend, 0 = torch default"
+        )
+
+    def load(self, timer=None) -> None:
+        args = self.args
+        self.yolo_model, self.yolo_device, self.synth_model, self.visualizer = setup_models(
+            offline=args.offline,
+            verify_models=args.verify_models,
+            warmup=not args.no_warmup,
+            timer=timer,
+            cpu_backend=args.cpu_backend,
+            quantize=args.quantize,
+            torch_threads=args.torch_threads,
+            quantize_clip=args.quantize_clip,
+        )
+        self.selector = None
+        if args.detect_every > 1:
+            self.selector = KeyframePersonSelector(
+                detect_every=args.detect_every,
+                min_track_score=args.min_track_score,
+                bbox_pad=args.bbox_pad,
+            )
+        self.pyramid = None
+        if args.detect_size or args.roi_size is not None:
+            roi_size = args.roi_size
+            if roi_size == "model":
+                roi_size = tuple(int(v) for v in self.synth_model.cfg.codec.input_size)
+            self.pyramid = ResolutionPyramid(self.name, args.detect_size, roi_size, padding=BBOX_PADDING)
+            logger.info(
+                "Resolution pyramid: detection at %s px, pose on %s",
+                args.detect_size or "full-frame",
+                "x".join(map(str, roi_size)) + " ROI crops" if roi_size else "the full frame",
+            )
+        self._sink = _SnapshotSink()
+
+    def infer(self, frame, timestamp: float):
+        self._sink.snapshot = None
+        result = process_frame(
+            frame,
+            self.yolo_model,
+            self.yolo_device,
+            self.synth_model,
+            self._sink,
+            selector=self.selector,
+            timestamp=timestamp,
+            pyramid=self.pyramid,
+        )
+        return self._sink.snapshot, result
+
+    def process(self, frame, timestamp: Optional[float] = None) -> Optional[PoseSnapshot]:
+        return self.infer(frame, time.time() if timestamp is None else timestamp)[0]
+
+    def render(self, frame, result):
+        """Draw YOLO boxes and SynthPose skeletons (runs on the preview thread)."""
+
+        return render_preview(frame, result, self.visualizer)
 
 
 def main() -> None:
-    args = parse_args()
-    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.INFO))
-    try:
-        asyncio.run(async_main(args))
-    except KeyboardInterrupt:
-        logger.info("Shutting down SynthPose + OSC fusion workspace")
+    from pose_stream_server.pose_server import main as serve
+
+    # Run as a script this module is __main__; register this copy of the class.
+    register_backend(SynthPoseBackend.name, SynthPoseBackend)
+    serve(default_backend=SynthPoseBackend.name)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
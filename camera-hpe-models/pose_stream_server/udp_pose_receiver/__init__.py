@@ -1,9 +1,23 @@
 """Raw UDP pose receiver package."""
 
+from .clock_sync import ClockSync
+from .quest_packet import JointLayout, QuestPacket, decode_quest_packet, get_joint_layout
+from .sessions import QuestSession, QuestSessionTable
+from .skeleton_codec import SkeletonDecoder, SkeletonEncoder, is_skeleton_datagram
 from .udp_pose_receiver import PosePacketProtocol, main, parse_args, run_server
 
 __all__ = [
+    "ClockSync",
+    "JointLayout",
     "PosePacketProtocol",
+    "QuestPacket",
+    "QuestSession",
+    "QuestSessionTable",
+    "SkeletonDecoder",
+    "SkeletonEncoder",
+    "decode_quest_packet",
+    "get_joint_layout",
+    "is_skeleton_datagram",
     "main",
     "parse_args",
     "run_server",
@@ -0,0 +1,137 @@
+"""Headset clock to host clock, estimated from packet arrival times.
+
+``PosePacket.timestamp`` is Unity's ``Time.timeAsDouble``: seconds since the
+app started, ticking at the headset's own rate. The receiver only sees
+``(timestamp, arrival)`` pairs, and ``arrival - timestamp`` is the clock
+offset plus a network delay that is never below some minimum and spikes
+with Wi-Fi jitter. The lower envelope of those differences therefore
+tracks the offset, and its slope the relative drift of the two clocks.
+
+:class:`ClockSync` keeps the smallest difference per ``bucket`` seconds of
+headset time (the least-delayed packet of that second) and fits a line
+through the last ``window`` bucket minima. Buckets lying well above the
+first fit (every packet of that second was delayed) are dropped and the
+line is refit. Until two buckets have closed, the running minimum is used
+with zero drift, so the mapping is usable from the first packet.
+
+The minimum one-way delay itself cannot be separated from the offset
+without round trips, so mapped times are late by that much (well under a
+millisecond on a LAN). A headset timestamp running backwards (app restart)
+or a whole bucket far below the fit (host clock stepped) restarts the
+estimate.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import deque
+from typing import Deque, Optional
+
+import numpy as np
+
+BUCKET_S = 1.0
+WINDOW_BUCKETS = 60
+# Bucket minima further above the first fit than this are treated as delayed.
+DELAYED_BUCKET_S = 0.005
+# Disagreement with the fit that means the clocks themselves jumped.
+RESET_S = 1.0
+
+
+class ClockSync:
+    """Online ``host ≈ remote + offset + drift * (remote - reference)`` fit."""
+
+    def __init__(self, bucket: float = BUCKET_S, window: int = WINDOW_BUCKETS) -> None:
+        self.bucket = bucket
+        self.window = window
+        self.offset: Optional[float] = None
+        self.drift = 0.0
+        self.reference = 0.0
+        self.resets = 0
+        self._remote: Deque[float] = deque(maxlen=window)
+        self._differences: Deque[float] = deque(maxlen=window)
+        self._bucket_end: Optional[float] = None
+        self._bucket_remote = 0.0
+        self._bucket_min = math.inf
+        self._last_remote: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.offset is not None
+
+    def observe(self, remote: float, arrival: float) -> None:
+        """Feed one packet's headset timestamp and host arrival time."""
+
+        if self._last_remote is not None and remote < self._last_remote - RESET_S:
+            self.reset()
+        self._last_remote = remote
+        difference = arrival - remote
+
+        if self._bucket_end is None:
+            self._bucket_end = remote + self.bucket
+        elif remote >= self._bucket_end:
+            self._close_bucket()
+            self._bucket_end = remote + self.bucket
+        if difference < self._bucket_min:
+            self._bucket_min = difference
+            self._bucket_remote = remote
+
+        if len(self._remote) < 2:
+            # No fit yet: the smallest difference so far is the best guess.
+            if self.offset is None or difference < self.offset:
+                self.offset = difference
+                self.reference = remote
+
+    def to_host(self, remote: float) -> float:
+        """Host ``time.time()`` at which the headset sampled ``remote``."""
+
+        if self.offset is None:
+            raise RuntimeError("ClockSync has not observed any packet yet")
+        return remote + self.offset + self.drift * (remote - self.reference)
+
+    def delay(self, remote: float, arrival: float) -> float:
+        """How much later than the fastest packets this one arrived."""
+
+        return arrival - self.to_host(remote)
+
+    def reset(self) -> None:
+        self.offset = None
+        self.drift = 0.0
+        self.resets += 1
+        self._remote.clear()
+        self._differences.clear()
+        self._bucket_end = None
+        self._bucket_min = math.inf
+        self._last_remote = None
+
+    def _close_bucket(self) -> None:
+        remote, difference = self._bucket_remote, self._bucket_min
+        self._bucket_min = math.inf
+        if self.offset is not None and len(self._remote) >= 2:
+            expected = self.offset + self.drift * (remote - self.reference)
+            if difference < expected - RESET_S:
+                self.reset()
+        self._remote.append(remote)
+        self._differences.append(difference)
+        if len(self._remote) >= 2:
+            self._fit()
+
+    def _fit(self) -> None:
+        # Relative to the newest bucket so the fit stays well conditioned.
+        reference = self._remote[-1]
+        x = np.asarray(self._remote, dtype=np.float64) - reference
+        y = np.asarray(self._differences, dtype=np.float64)
+        drift, offset = np.polyfit(x, y, 1)
+        on_envelope = y - (offset + drift * x) <= DELAYED_BUCKET_S
+        if 2 <= on_envelope.sum() < len(x):
+            drift, offset = np.polyfit(x[on_envelope], y[on_envelope], 1)
+        self.offset = float(offset)
+        self.drift = float(drift)
+        self.reference = reference
+
+    def summary(self) -> str:
+        if self.offset is None:
+            return "clock not synced"
+        return f"clock offset {self.offset:+.3f}s, drift {self.drift * 1e6:+.0f} ppm"
+
+    def __repr__(self) -> str:
+        return f"ClockSync({self.summary()}, {len(self._remote)} buckets)"
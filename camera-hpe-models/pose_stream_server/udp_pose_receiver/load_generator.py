@@ -0,0 +1,255 @@
+"""Synthetic Quest headsets for load-testing the UDP receiver.
+
+Each simulated headset sends ``PosePacket`` msgpack datagrams shaped like
+``example.json`` (same joint names and payload layout) from its own socket,
+so every headset shows up as a separate sender/session on the receiver. The
+template body sways and jitters so consecutive packets differ like real
+tracking data, and each headset's ``timestamp`` runs on its own
+``Time.timeAsDouble``-style clock at the nominal rate, which lets the
+receiver's session stats estimate loss from timestamp gaps.
+
+    python -m pose_stream_server.udp_pose_receiver.load_generator --headsets 8 --rate 72 --duration 30
+
+Use ``--processes`` when one process can't keep up with the requested
+total rate, and ``--drop`` to check that the receiver's loss estimate
+matches a known loss ratio.
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import logging
+import multiprocessing
+import random
+import socket
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import msgpack
+import numpy as np
+
+from .quest_packet import POSITION, QuestPacket, decode_quest_packet
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEMPLATE = Path(__file__).resolve().parents[3] / "example.json"
+DEFAULT_RATE_HZ = 72.0
+PROGRESS_INTERVAL_S = 5.0
+# Body sway: radius (m) and frequency (Hz) of a slow circle, plus per-joint noise (m).
+SWAY_RADIUS_M = 0.1
+SWAY_HZ = 0.2
+JITTER_M = 0.002
+
+
+def load_template(path: Path) -> QuestPacket:
+    with open(path, "r", encoding="utf-8") as f:
+        return decode_quest_packet(json.load(f), keep_payload=False)
+
+
+class SimulatedHeadset:
+    """One headset: its own socket, clock, motion phase and reusable payload."""
+
+    def __init__(
+        self, index: int, template: QuestPacket, rate_hz: float, seed: int, open_socket: bool = True
+    ) -> None:
+        self.index = index
+        self.interval = 1.0 / rate_hz
+        self.rng = np.random.default_rng(seed)
+        self.phase = self.rng.uniform(0.0, 2.0 * np.pi)
+        # Unity's clock starts when the app does; headsets never agree on it.
+        self.clock = float(self.rng.uniform(1.0, 600.0))
+        self.frame = 0
+        self.sent = 0
+        self.dropped = 0
+        self.errors = 0
+        self.bytes = 0
+
+        self._hmd = template.hmd.copy()
+        self._poses = template.poses.copy()
+        self._payload = QuestPacket(
+            timestamp=0.0,
+            hmd=self._hmd,
+            poses=self._poses,
+            confidences=template.confidences,
+            layout=template.layout,
+        ).to_payload()
+        self._base_hmd = template.hmd[POSITION].copy()
+        self._base_joints = template.poses[:, POSITION].copy()
+        self._positions = [self._payload["hmd"]["position"]] + [
+            joint["pose"]["position"] for joint in self._payload["joints"]
+        ]
+        # Without a socket (benchmarks) the headset only builds datagrams.
+        self.sock: Optional[socket.socket] = None
+        self.port = 0
+        if open_socket:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.bind(("0.0.0.0", 0))
+            self.port = self.sock.getsockname()[1]
+
+    def next_datagram(self) -> bytes:
+        t = self.frame * self.interval
+        angle = self.phase + 2.0 * np.pi * SWAY_HZ * t
+        offset = np.array([np.cos(angle), 0.0, np.sin(angle)]) * SWAY_RADIUS_M
+        hmd = self._base_hmd + offset
+        joints = self._base_joints + offset + self.rng.normal(scale=JITTER_M, size=self._base_joints.shape)
+
+        # Only the positions move; rewrite them in the prebuilt payload dicts.
+        rows = [hmd.tolist()] + joints.tolist()
+        for position, (x, y, z) in zip(self._positions, rows):
+            position["x"] = x
+            position["y"] = y
+            position["z"] = z
+        self._payload["timestamp"] = self.clock + t
+        self.frame += 1
+        return msgpack.packb(self._payload, use_bin_type=True)
+
+    def close(self) -> None:
+        if self.sock is not None:
+            self.sock.close()
+
+
+def run_headsets(
+    target: tuple,
+    indices: Sequence[int],
+    template_path: Path,
+    rate_hz: float,
+    duration: float,
+    drop: float = 0.0,
+    jitter_ms: float = 0.0,
+    seed: int = 0,
+) -> List[dict]:
+    """Send from headsets ``indices`` until ``duration`` (0 = forever) elapses."""
+
+    template = load_template(template_path)
+    headsets = [SimulatedHeadset(i, template, rate_hz, seed + i) for i in indices]
+    rng = random.Random(f"{seed}:{list(indices)}")
+    start = time.perf_counter()
+    # Stagger the first packets across one interval like independent devices.
+    queue = [(start + rng.uniform(0.0, 1.0 / rate_hz), h.index, h) for h in headsets]
+    heapq.heapify(queue)
+    deadline = start + duration if duration > 0 else float("inf")
+    next_progress = start + PROGRESS_INTERVAL_S
+    logger.info("Sending from %d headsets at %.0f Hz each to %s:%d", len(headsets), rate_hz, *target)
+
+    try:
+        while queue:
+            due, index, headset = queue[0]
+            if due >= deadline:
+                break
+            delay = due - time.perf_counter()
+            if delay > 0.0:
+                time.sleep(delay)
+
+            data = headset.next_datagram()
+            if drop and rng.random() < drop:
+                headset.dropped += 1
+            else:
+                try:
+                    headset.sock.sendto(data, target)
+                    headset.sent += 1
+                    headset.bytes += len(data)
+                except OSError:
+                    headset.errors += 1
+
+            scheduled = due + headset.interval
+            if jitter_ms:
+                scheduled += rng.uniform(-jitter_ms, jitter_ms) / 1000.0
+            heapq.heapreplace(queue, (scheduled, index, headset))
+
+            now = time.perf_counter()
+            if now >= next_progress:
+                sent = sum(h.sent for h in headsets)
+                logger.info("%d packets sent (%.0f/s)", sent, sent / (now - start))
+                next_progress += PROGRESS_INTERVAL_S
+    except KeyboardInterrupt:
+        pass
+    finally:
+        elapsed = max(time.perf_counter() - start, 1e-6)
+        for headset in headsets:
+            headset.close()
+
+    return [
+        {
+            "headset": h.index,
+            "port": h.port,
+            "sent": h.sent,
+            "dropped": h.dropped,
+            "errors": h.errors,
+            "bytes": h.bytes,
+            "rate": h.sent / elapsed,
+        }
+        for h in headsets
+    ]
+
+
+def _worker(target, indices, args, results) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(processName)s %(levelname)s %(message)s")
+    results.extend(
+        run_headsets(target, indices, args.template, args.rate, args.duration, args.drop, args.jitter_ms, args.seed)
+    )
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Simulated Quest headsets sending PosePacket datagrams")
+    parser.add_argument("--host", default="127.0.0.1", help="Receiver address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=9000, help="Receiver UDP port (default: 9000)")
+    parser.add_argument("--headsets", type=int, default=1, help="Number of simulated headsets (default: 1)")
+    parser.add_argument(
+        "--rate", type=float, default=DEFAULT_RATE_HZ, help=f"Packets per second per headset (default: {DEFAULT_RATE_HZ:g})"
+    )
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run, 0 = until Ctrl-C (default: 10)")
+    parser.add_argument(
+        "--processes", type=int, default=1, help="Sender processes to spread the headsets over (default: 1)"
+    )
+    parser.add_argument("--drop", type=float, default=0.0, help="Fraction of packets to skip sending (default: 0)")
+    parser.add_argument(
+        "--jitter-ms", type=float, default=0.0, help="Uniform send-time jitter in milliseconds (default: 0)"
+    )
+    parser.add_argument(
+        "--template", type=Path, default=DEFAULT_TEMPLATE, help=f"PosePacket JSON to animate (default: {DEFAULT_TEMPLATE})"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    target = (args.host, args.port)
+    indices = list(range(args.headsets))
+
+    if args.processes <= 1:
+        results = run_headsets(
+            target, indices, args.template, args.rate, args.duration, args.drop, args.jitter_ms, args.seed
+        )
+    else:
+        with multiprocessing.Manager() as manager:
+            shared = manager.list()
+            workers = [
+                multiprocessing.Process(target=_worker, args=(target, indices[i :: args.processes], args, shared))
+                for i in range(args.processes)
+            ]
+            for worker in workers:
+                worker.start()
+            try:
+                for worker in workers:
+                    worker.join()
+            except KeyboardInterrupt:
+                for worker in workers:
+                    worker.join()
+            results = sorted(shared, key=lambda r: r["headset"])
+
+    for r in results:
+        print(
+            f"headset {r['headset']:3d} (port {r['port']}): {r['sent']:8d} sent at {r['rate']:7.1f}/s, "
+            f"{r['dropped']} dropped on purpose, {r['errors']} send errors, {r['bytes'] / max(r['sent'], 1):.0f} B/packet"
+        )
+    sent = sum(r["sent"] for r in results)
+    print(f"total: {sent} packets, {sum(r['bytes'] for r in results) / 1e6:.1f} MB, {sum(r['rate'] for r in results):.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+"""Array-backed representation of the Quest ``PosePacket`` msgpack payload.
+
+Each joint pose is stored as one row of a ``(n_joints, 7)`` float32 array laid
+out as ``(px, py, pz, qx, qy, qz, qw)``. Joint names are interned and cached
+per layout so that consumers only pay for the name list once per headset
+configuration instead of once per packet.
+
+:class:`QuestPacketDecoder` reads datagrams without building the nested
+dicts. Unity (and the load generator) always encode the numbers as msgpack
+float32/float64, so every packet from one headset has the same bytes apart
+from the float payloads. The first datagram of a shape is walked with
+``msgpack.Unpacker`` to learn where each number sits; later ones are
+checked byte for byte against that template (names included, in place) and
+their floats gathered straight into the pose arrays.
+"""
+
+from __future__ import annotations
+
+import struct
+import sys
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import msgpack
+import numpy as np
+
+if TYPE_CHECKING:
+    from pose_stream_server.common.latency import FrameTimes
+
+POSE_WIDTH = 7
+POSITION = slice(0, 3)
+ROTATION = slice(3, 7)
+
+_IDENTITY_POSE = (0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 1.0)
+
+
+class JointLayout:
+    """Ordered, interned joint-name table shared by every packet with that order."""
+
+    __slots__ = ("names", "index", "layout_id")
+
+    def __init__(self, names: Tuple[str, ...], layout_id: int) -> None:
+        self.names = names
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(names)}
+        self.layout_id = layout_id
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __repr__(self) -> str:
+        return f"JointLayout(id={self.layout_id}, n_joints={len(self.names)})"
+
+
+_LAYOUT_CACHE: Dict[Tuple[str, ...], JointLayout] = {}
+
+
+def get_joint_layout(names: Sequence[str]) -> JointLayout:
+    """Return the cached layout for ``names``, creating it on first sight."""
+
+    key = tuple(names)
+    layout = _LAYOUT_CACHE.get(key)
+    if layout is None:
+        interned = tuple(sys.intern(str(name)) for name in key)
+        layout = JointLayout(interned, layout_id=len(_LAYOUT_CACHE))
+        _LAYOUT_CACHE[key] = layout
+    return layout
+
+
+@dataclass
+class QuestPacket:
+    timestamp: float
+    hmd: np.ndarray  # (7,) float32
+    poses: np.ndarray  # (n_joints, 7) float32
+    confidences: np.ndarray  # (n_joints,) float32
+    layout: JointLayout
+    payload: Optional[Mapping[str, object]] = field(default=None, repr=False)
+    # Capture/receive/decode/publish times on the host clock, once known.
+    times: Optional["FrameTimes"] = field(default=None, repr=False, compare=False)
+
+    @property
+    def joint_names(self) -> Tuple[str, ...]:
+        return self.layout.names
+
+    @property
+    def positions(self) -> np.ndarray:
+        return self.poses[:, POSITION]
+
+    @property
+    def rotations(self) -> np.ndarray:
+        return self.poses[:, ROTATION]
+
+    def joint(self, name: str) -> Optional[np.ndarray]:
+        idx = self.layout.index.get(name)
+        return None if idx is None else self.poses[idx]
+
+    def to_payload(self) -> Mapping[str, object]:
+        """Return the original dict payload, rebuilding it if it was not kept."""
+
+        if self.payload is None:
+            self.payload = {
+                "timestamp": self.timestamp,
+                "hmd": _transform_dict(self.hmd),
+                "joints": [
+                    {
+                        "name": name,
+                        "pose": _transform_dict(self.poses[i]),
+                        "confidence": float(self.confidences[i]),
+                    }
+                    for i, name in enumerate(self.layout.names)
+                ],
+            }
+        return self.payload
+
+
+def _transform_dict(row: np.ndarray) -> Dict[str, Dict[str, float]]:
+    px, py, pz, qx, qy, qz, qw = (float(v) for v in row)
+    return {
+        "position": {"x": px, "y": py, "z": pz},
+        "rotation": {"x": qx, "y": qy, "z": qz, "w": qw},
+    }
+
+
+def _transform_tuple(transform) -> Tuple[float, ...]:
+    if not transform:
+        return _IDENTITY_POSE
+    position = transform.get("position") or {}
+    rotation = transform.get("rotation") or {}
+    return (
+        position.get("x", 0.0),
+        position.get("y", 0.0),
+        position.get("z", 0.0),
+        rotation.get("x", 0.0),
+        rotation.get("y", 0.0),
+        rotation.get("z", 0.0),
+        rotation.get("w", 1.0),
+    )
+
+
+def decode_quest_packet(payload: Mapping[str, object], keep_payload: bool = False) -> QuestPacket:
+    """Convert an unpacked ``PosePacket`` dict into a :class:`QuestPacket`.
+
+    The pose array is allocated once and filled row by row; the joint-name
+    table comes from the layout cache. Datagrams should go through
+    :class:`QuestPacketDecoder` instead, which never builds the dict.
+    """
+
+    joints = payload.get("joints") or []
+    n_joints = len(joints)
+
+    layout = get_joint_layout([joint.get("name", "") for joint in joints])
+    poses = np.empty((n_joints, POSE_WIDTH), dtype=np.float32)
+    confidences = np.empty(n_joints, dtype=np.float32)
+    for i, joint in enumerate(joints):
+        poses[i] = _transform_tuple(joint.get("pose"))
+        confidences[i] = joint.get("confidence", 0.0)
+
+    return QuestPacket(
+        timestamp=float(payload.get("timestamp") or 0.0),
+        hmd=np.asarray(_transform_tuple(payload.get("hmd")), dtype=np.float32),
+        poses=poses,
+        confidences=confidences,
+        layout=layout,
+        payload=payload if keep_payload else None,
+    )
+
+
+# msgpack type bytes of the only encodings a template accepts for numbers.
+_FLOAT32 = 0xCA
+_FLOAT64 = 0xCB
+_NIL = 0xC0
+_FLOAT_WIDTH = {_FLOAT32: 4, _FLOAT64: 8}
+_FLOAT_FORMAT = {_FLOAT32: ">f", _FLOAT64: ">d"}
+_TRANSFORM_FIELDS = {
+    "position": {"x": 0, "y": 1, "z": 2},
+    "rotation": {"x": 3, "y": 4, "z": 5, "w": 6},
+}
+# Distinct datagram shapes remembered per decoder (one per headset layout).
+MAX_TEMPLATES = 16
+
+
+class _PacketTemplate:
+    """Where the numbers of one datagram shape sit, plus its other bytes.
+
+    Decoded values land in one float32 block: the HMD row, the pose rows,
+    then the confidences. The gathers go through scratch buffers owned by
+    the template; only the block itself is allocated per packet, since
+    sessions and histories keep packets past the next datagram.
+    """
+
+    def __init__(
+        self,
+        data: bytes,
+        layout: JointLayout,
+        defaults: np.ndarray,
+        slots: List[Tuple[int, int, int]],
+        timestamp: Tuple[int, int],
+    ) -> None:
+        self.size = len(data)
+        self.layout = layout
+        self.defaults = defaults
+        self._timestamp_offset = timestamp[0] + 1
+        self._timestamp_format = struct.Struct(_FLOAT_FORMAT[timestamp[1]])
+
+        numbers = np.zeros(self.size, dtype=bool)
+        numbers[timestamp[0] + 1 : timestamp[0] + 1 + _FLOAT_WIDTH[timestamp[1]]] = True
+        gathers = {}
+        for kind, width in _FLOAT_WIDTH.items():
+            dest = np.array([d for d, offset, k in slots if k == kind], dtype=np.intp)
+            offsets = np.array([offset + 1 for d, offset, k in slots if k == kind], dtype=np.intp)
+            index = offsets[:, None] + np.arange(width, dtype=np.intp)
+            numbers[index.ravel()] = True
+            gathers[kind] = (dest, index, np.empty(index.shape, dtype=np.uint8), _FLOAT_FORMAT[kind])
+        self._gathers = [gather for gather in gathers.values() if len(gather[0])]
+        self._other = np.flatnonzero(~numbers)
+        self._other_bytes = np.frombuffer(data, dtype=np.uint8)[self._other].copy()
+        self._other_scratch = np.empty_like(self._other_bytes)
+
+    def decode(self, data: bytes) -> Optional[QuestPacket]:
+        """The packet, or None when ``data`` does not have this shape."""
+
+        raw = np.frombuffer(data, dtype=np.uint8)
+        np.take(raw, self._other, out=self._other_scratch)
+        if not np.array_equal(self._other_scratch, self._other_bytes):
+            return None
+        block = self.defaults.copy()
+        for dest, index, scratch, fmt in self._gathers:
+            np.take(raw, index, out=scratch)
+            block[dest] = scratch.view(fmt).ravel()
+        return _packet_from_block(
+            self._timestamp_format.unpack_from(data, self._timestamp_offset)[0], block, self.layout
+        )
+
+
+def _packet_from_block(timestamp: float, block: np.ndarray, layout: JointLayout) -> QuestPacket:
+    n_joints = len(layout)
+    rows = POSE_WIDTH * (n_joints + 1)
+    return QuestPacket(
+        timestamp=float(timestamp),
+        hmd=block[:POSE_WIDTH],
+        poses=block[POSE_WIDTH:rows].reshape(n_joints, POSE_WIDTH),
+        confidences=block[rows:],
+        layout=layout,
+    )
+
+
+class _PacketWalk:
+    """One pass over a ``PosePacket`` datagram with ``msgpack.Unpacker``.
+
+    Records each number's destination in the float32 block and the offset
+    of its type byte; ``fixed`` turns False if any number is not a float,
+    in which case the shape cannot become a template.
+    """
+
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.unpacker = msgpack.Unpacker(raw=False)
+        self.unpacker.feed(data)
+        self.values: Dict[int, float] = {}
+        self.slots: List[Tuple[int, int, int]] = []
+        self.fixed = True
+        self.timestamp_slot: Optional[Tuple[int, int]] = None
+
+    def _number(self, default: float) -> Tuple[float, int, int]:
+        offset = self.unpacker.tell()
+        value = self.unpacker.unpack()
+        kind = self.data[offset]
+        if kind not in _FLOAT_WIDTH:
+            self.fixed = False
+        return (default if value is None else float(value)), offset, kind
+
+    def _store(self, dest: int, default: float) -> None:
+        value, offset, kind = self._number(default)
+        self.values[dest] = value
+        self.slots.append((dest, offset, kind))
+
+    def _skip_nil(self) -> bool:
+        offset = self.unpacker.tell()
+        if offset < len(self.data) and self.data[offset] == _NIL:
+            self.unpacker.skip()
+            return True
+        return False
+
+    def _transform(self, base: int) -> None:
+        if self._skip_nil():
+            return
+        for _ in range(self.unpacker.read_map_header()):
+            fields = _TRANSFORM_FIELDS.get(self.unpacker.unpack())
+            if fields is None or self._skip_nil():
+                if fields is None:
+                    self.unpacker.skip()
+                continue
+            for _ in range(self.unpacker.read_map_header()):
+                column = fields.get(self.unpacker.unpack())
+                if column is None:
+                    self.unpacker.skip()
+                else:
+                    self._store(base + column, 1.0 if column == 6 else 0.0)
+
+    def _joints(self) -> Tuple[str, ...]:
+        if self._skip_nil():
+            return ()
+        n_joints = self.unpacker.read_array_header()
+        names = []
+        for i in range(n_joints):
+            name = ""
+            for _ in range(self.unpacker.read_map_header()):
+                key = self.unpacker.unpack()
+                if key == "name":
+                    name = self.unpacker.unpack()
+                elif key == "pose":
+                    self._transform(POSE_WIDTH * (i + 1))
+                elif key == "confidence":
+                    self._store(POSE_WIDTH * (n_joints + 1) + i, 0.0)
+                else:
+                    self.unpacker.skip()
+            names.append(name)
+        return tuple(names)
+
+    def run(self) -> Tuple[float, JointLayout]:
+        timestamp = 0.0
+        names: Tuple[str, ...] = ()
+        for _ in range(self.unpacker.read_map_header()):
+            key = self.unpacker.unpack()
+            if key == "timestamp":
+                timestamp, offset, kind = self._number(0.0)
+                self.timestamp_slot = (offset, kind)
+            elif key == "hmd":
+                self._transform(0)
+            elif key == "joints":
+                names = self._joints()
+            else:
+                self.unpacker.skip()
+        if self.unpacker.tell() != len(self.data):
+            raise msgpack.ExtraData(None, self.data[self.unpacker.tell() :])
+        return timestamp, get_joint_layout(names)
+
+    def defaults(self, layout: JointLayout) -> np.ndarray:
+        n_joints = len(layout)
+        block = np.zeros(POSE_WIDTH * (n_joints + 1) + n_joints, dtype=np.float32)
+        block[POSE_WIDTH - 1 : POSE_WIDTH * (n_joints + 1) : POSE_WIDTH] = 1.0
+        return block
+
+
+class QuestPacketDecoder:
+    """Decodes ``PosePacket`` datagrams into :class:`QuestPacket` without dicts.
+
+    Not thread-safe: the templates own the scratch buffers, so give each
+    receiver its own decoder. Raises ``msgpack.UnpackException``,
+    ``ValueError`` or ``TypeError`` for malformed datagrams.
+    """
+
+    def __init__(self, max_templates: int = MAX_TEMPLATES) -> None:
+        self.max_templates = max_templates
+        self._templates: Dict[int, List[_PacketTemplate]] = {}
+        self._count = 0
+
+    def decode(self, data: bytes) -> QuestPacket:
+        for template in self._templates.get(len(data), ()):
+            packet = template.decode(data)
+            if packet is not None:
+                return packet
+        return self._learn(data)
+
+    def _learn(self, data: bytes) -> QuestPacket:
+        walk = _PacketWalk(data)
+        timestamp, layout = walk.run()
+        block = walk.defaults(layout)
+        for dest, value in walk.values.items():
+            block[dest] = value
+        if walk.fixed and walk.timestamp_slot is not None and walk.timestamp_slot[1] in _FLOAT_WIDTH:
+            if self._count >= self.max_templates:
+                self._templates.clear()
+                self._count = 0
+            template = _PacketTemplate(data, layout, walk.defaults(layout), walk.slots, walk.timestamp_slot)
+            self._templates.setdefault(len(data), []).append(template)
+            self._count += 1
+        return _packet_from_block(timestamp, block, layout)
+
+
+def as_quest_packet(packet) -> QuestPacket:
+    """Accept either a decoded :class:`QuestPacket` or a raw dict payload."""
+
+    if isinstance(packet, QuestPacket):
+        return packet
+    return decode_quest_packet(packet)
@@ -0,0 +1,202 @@
+"""Per-headset session tracking for Quest pose streams.
+
+Every sender address gets a :class:`QuestSession` on its first packet. A
+session keeps the latest packet, arrival statistics and an owner-defined
+``state`` slot (the fusion workspace keeps its pose history there), and is
+evicted once it has been idle for ``idle_timeout`` seconds.
+
+``PosePacket`` carries no sequence number, so loss is estimated from the
+headset's own timestamps: a gap of ``n`` nominal frame intervals between
+consecutive packets counts ``n - 1`` lost packets. Packets whose timestamp
+is not newer than the session's latest were reordered by the network and
+are rejected as stale, unless the timestamp went back by more than
+``RESET_S``: Unity's clock restarts near 0 with the app, so that is a
+restart, and the session resets its interval and clock and carries on.
+
+Each session also maps its headset's clock onto the host clock
+(:class:`ClockSync`); accepted packets get their capture time on the host
+clock in ``packet.times.captured``.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from pose_stream_server.common.latency import FrameTimes
+from pose_stream_server.common.metrics import REGISTRY
+
+from .clock_sync import RESET_S, ClockSync
+from .quest_packet import QuestPacket
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IDLE_TIMEOUT_S = 5.0
+# Idle sessions are looked for at most this often.
+EVICT_CHECK_INTERVAL_S = 1.0
+# Smoothing of the nominal packet interval estimate.
+INTERVAL_SMOOTHING = 0.05
+# Gaps above this many intervals are pauses (app in background etc.), not loss.
+MAX_GAP_INTERVALS = 30
+
+Address = Tuple[str, int]
+
+OPENED = REGISTRY.counter("pose_quest_sessions_opened_total", "Quest sender sessions opened")
+EVICTED = REGISTRY.counter("pose_quest_sessions_evicted_total", "Quest sender sessions evicted after going idle")
+RESTARTED = REGISTRY.counter("pose_quest_sessions_restarted_total", "Quest sender sessions whose clock restarted")
+
+
+class QuestSession:
+    """One sender's stream: latest packet, arrival stats, clock mapping and owner state."""
+
+    def __init__(self, addr: Address, received_at: float) -> None:
+        self.addr = addr
+        self.key = f"{addr[0]}:{addr[1]}"
+        self.first_seen = received_at
+        self.last_seen = received_at
+        self.latest: Optional[QuestPacket] = None
+        self.packets = 0
+        self.stale = 0
+        self.lost = 0
+        self.restarts = 0
+        # Nominal seconds between packets on the headset clock.
+        self.interval: Optional[float] = None
+        self.clock = ClockSync()
+        self.state: Any = None
+
+    @property
+    def rate(self) -> float:
+        """Average packets per second since the session opened."""
+
+        elapsed = self.last_seen - self.first_seen
+        return (self.packets - 1) / elapsed if elapsed > 0.0 else 0.0
+
+    @property
+    def loss_ratio(self) -> float:
+        expected = self.packets + self.lost
+        return self.lost / expected if expected else 0.0
+
+    def accept(self, packet: QuestPacket, received_at: float) -> bool:
+        previous = self.latest
+        if previous is not None:
+            dt = packet.timestamp - previous.timestamp
+            if dt < -RESET_S:
+                self._restart(previous, packet)
+            elif dt <= 0.0:
+                self.stale += 1
+                return False
+            elif self.interval is None:
+                self.interval = dt
+            else:
+                frames = round(dt / self.interval)
+                if 1 < frames <= MAX_GAP_INTERVALS:
+                    self.lost += frames - 1
+                if frames <= 1:
+                    self.interval += INTERVAL_SMOOTHING * (dt - self.interval)
+        self.clock.observe(packet.timestamp, received_at)
+        times = packet.times
+        if times is None:
+            times = packet.times = FrameTimes(received=received_at)
+        times.captured = self.clock.to_host(packet.timestamp)
+        self.latest = packet
+        self.last_seen = received_at
+        self.packets += 1
+        return True
+
+    def _restart(self, previous: QuestPacket, packet: QuestPacket) -> None:
+        logger.info(
+            "Quest session %s clock went back from %.3f to %.3f; treating it as an app restart",
+            self.key,
+            previous.timestamp,
+            packet.timestamp,
+        )
+        self.restarts += 1
+        RESTARTED.inc()
+        self.interval = None
+        self.clock.reset()
+
+    def to_host(self, timestamp: float) -> float:
+        """Host time at which this headset sampled Unity time ``timestamp``."""
+
+        return self.clock.to_host(timestamp)
+
+    def summary(self) -> str:
+        return (
+            f"{self.key}: {self.packets} packets at {self.rate:.1f}/s, "
+            f"~{self.lost} lost ({self.loss_ratio:.1%}), {self.stale} stale, {self.restarts} restarts, "
+            f"{self.clock.summary()}"
+        )
+
+    def __repr__(self) -> str:
+        return f"QuestSession({self.summary()})"
+
+
+class QuestSessionTable:
+    """Sessions keyed by sender address, with idle eviction."""
+
+    def __init__(
+        self,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT_S,
+        on_evict: Optional[Callable[[QuestSession], None]] = None,
+    ) -> None:
+        self.idle_timeout = idle_timeout
+        self.sessions: Dict[Address, QuestSession] = {}
+        self._on_evict = on_evict
+        self._next_evict_check = 0.0
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def __iter__(self):
+        return iter(list(self.sessions.values()))
+
+    def get(self, key: str) -> Optional[QuestSession]:
+        for session in self.sessions.values():
+            if session.key == key:
+                return session
+        return None
+
+    @property
+    def primary(self) -> Optional[QuestSession]:
+        """The longest-running live session (the first headset to connect)."""
+
+        return next(iter(self.sessions.values()), None)
+
+    def update(
+        self, packet: QuestPacket, addr: Optional[Address], received_at: Optional[float] = None
+    ) -> Optional[QuestSession]:
+        """Route ``packet`` to its sender's session; None if it was stale.
+
+        ``received_at`` defaults to the arrival time the receiver stamped
+        on the packet, or now.
+        """
+
+        if received_at is None:
+            received_at = packet.times.received if packet.times is not None else None
+        received_at = time.time() if received_at is None else received_at
+        if received_at >= self._next_evict_check:
+            self.evict_idle(received_at)
+
+        # Packets injected without a sender (tests, tools) share one session.
+        addr = (str(addr[0]), int(addr[1])) if addr else ("local", 0)
+        session = self.sessions.get(addr)
+        if session is None:
+            session = self.sessions[addr] = QuestSession(addr, received_at)
+            OPENED.inc()
+            logger.info("Quest session %s opened (%d active)", session.key, len(self.sessions))
+        return session if session.accept(packet, received_at) else None
+
+    def evict_idle(self, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        self._next_evict_check = now + EVICT_CHECK_INTERVAL_S
+        idle = [addr for addr, session in self.sessions.items() if now - session.last_seen > self.idle_timeout]
+        for addr in idle:
+            session = self.sessions.pop(addr)
+            EVICTED.inc()
+            logger.info("Quest session closed after %.1fs idle — %s", now - session.last_seen, session.summary())
+            if self._on_evict is not None:
+                self._on_evict(session)
+
+    def summary(self) -> str:
+        return "; ".join(session.summary() for session in self.sessions.values()) or "no Quest sessions"
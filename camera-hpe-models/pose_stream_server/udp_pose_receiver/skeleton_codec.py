@@ -0,0 +1,259 @@
+"""Compact binary wire format for skeleton streams.
+
+A datagram is a fixed header followed by column blocks, all little endian::
+
+    header   magic 0xC1, version, flags, pad, layout code (u32), sequence (u32),
+             keyframe sequence (u32), timestamp (f64), rows (u16), position step (f32)
+    [names]  u16 length + newline-joined UTF-8 joint names (FLAG_NAMES only)
+    positions  (rows, 3) int32 on keyframes, int16 deltas against the keyframe otherwise
+    rotations  (rows,) uint32 smallest-three quaternions
+    confidence (rows,) uint8
+
+Row 0 is the HMD, rows 1.. are the joints in layout order. The layout code is
+a CRC32 of the joint names, so it is stable across processes; the names
+themselves only travel on keyframes every ``names_every`` keyframes (and
+whenever the layout changes). ``0xC1`` is never used by msgpack, so
+receivers can tell these datagrams from ``PosePacket`` payloads by their
+first byte.
+
+Positions are quantized to ``position_step`` metres (0.5 mm by default).
+Quaternions keep the three smallest components at 10 bits each plus a
+2-bit index of the dropped largest one, under 0.3° of error. The worst case,
+about 0.27°, is near rotations whose four components are all equal, where
+rebuilding the dropped component amplifies the rounding of the other three.
+"""
+
+from __future__ import annotations
+
+import functools
+import struct
+import zlib
+from typing import Dict, Optional
+
+import numpy as np
+
+from .quest_packet import POSE_WIDTH, POSITION, ROTATION, JointLayout, QuestPacket, get_joint_layout
+
+MAGIC = 0xC1
+MAGIC_BYTE = bytes([MAGIC])
+VERSION = 1
+HEADER = struct.Struct("<BBBxIIIdHf")
+NAMES_LENGTH = struct.Struct("<H")
+
+FLAG_KEYFRAME = 0x01
+FLAG_NAMES = 0x02
+
+DEFAULT_POSITION_STEP = 0.0005
+DEFAULT_KEYFRAME_EVERY = 30
+DEFAULT_NAMES_EVERY = 4
+
+_QUAT_BITS = 10
+_QUAT_MAX = (1 << _QUAT_BITS) - 1
+_QUAT_RANGE = 1.0 / np.sqrt(2.0)
+_INT16_MIN = np.iinfo(np.int16).min
+_INT16_MAX = np.iinfo(np.int16).max
+
+
+class SkeletonDecodeError(ValueError):
+    pass
+
+
+def is_skeleton_datagram(data: bytes) -> bool:
+    return data[:1] == MAGIC_BYTE
+
+
+@functools.lru_cache(maxsize=None)
+def layout_code(layout: JointLayout) -> int:
+    """Process-independent ID for ``layout`` (layouts are cached singletons)."""
+
+    return zlib.crc32("\n".join(layout.names).encode("utf-8"))
+
+
+def encode_quaternions(quats: np.ndarray) -> np.ndarray:
+    """``(N, 4)`` (x, y, z, w) quaternions to ``(N,)`` uint32 smallest-three."""
+
+    quats = np.asarray(quats, dtype=np.float64)
+    norms = np.linalg.norm(quats, axis=1, keepdims=True)
+    quats = np.divide(quats, norms, out=np.tile([0.0, 0.0, 0.0, 1.0], (len(quats), 1)), where=norms > 0.0)
+
+    largest = np.argmax(np.abs(quats), axis=1)
+    rows = np.arange(len(quats))
+    # q and -q are the same rotation; flip so the dropped component is positive.
+    quats *= np.where(quats[rows, largest] < 0.0, -1.0, 1.0)[:, None]
+
+    keep = np.arange(4)[None, :] != largest[:, None]
+    three = quats[keep].reshape(-1, 3)
+    levels = np.rint((three / _QUAT_RANGE + 1.0) * 0.5 * _QUAT_MAX)
+    levels = np.clip(levels, 0, _QUAT_MAX).astype(np.uint32)
+    return (
+        (largest.astype(np.uint32) << 30)
+        | (levels[:, 0] << 20)
+        | (levels[:, 1] << 10)
+        | levels[:, 2]
+    )
+
+
+def decode_quaternions(packed: np.ndarray) -> np.ndarray:
+    packed = np.asarray(packed, dtype=np.uint32)
+    largest = (packed >> 30).astype(np.intp)
+    levels = np.stack([(packed >> 20) & _QUAT_MAX, (packed >> 10) & _QUAT_MAX, packed & _QUAT_MAX], axis=1)
+    three = (levels.astype(np.float32) / _QUAT_MAX * 2.0 - 1.0) * _QUAT_RANGE
+
+    quats = np.empty((len(packed), 4), dtype=np.float32)
+    keep = np.arange(4)[None, :] != largest[:, None]
+    quats[keep] = three.ravel()
+    quats[~keep] = np.sqrt(np.clip(1.0 - np.sum(three * three, axis=1), 0.0, None))
+    return quats
+
+
+class SkeletonEncoder:
+    """Stateful encoder for one outgoing stream (keyframe/delta bookkeeping)."""
+
+    def __init__(
+        self,
+        keyframe_every: int = DEFAULT_KEYFRAME_EVERY,
+        position_step: float = DEFAULT_POSITION_STEP,
+        names_every: int = DEFAULT_NAMES_EVERY,
+    ) -> None:
+        self.keyframe_every = max(1, keyframe_every)
+        self.position_step = position_step
+        self.names_every = max(1, names_every)
+        self._sequence = 0
+        self._keyframe_sequence = 0
+        self._keyframes_sent = 0
+        self._keyframe_positions: Optional[np.ndarray] = None
+        self._layout: Optional[JointLayout] = None
+
+    def encode(self, packet: QuestPacket) -> bytes:
+        self._sequence = (self._sequence + 1) & 0xFFFFFFFF
+        rows = np.empty((len(packet.layout) + 1, POSE_WIDTH), dtype=np.float32)
+        rows[0] = packet.hmd
+        rows[1:] = packet.poses
+        confidence = np.empty(len(rows), dtype=np.uint8)
+        confidence[0] = 255
+        confidence[1:] = np.rint(np.clip(packet.confidences, 0.0, 1.0) * 255.0)
+
+        positions = np.rint(rows[:, POSITION].astype(np.float64) / self.position_step).astype(np.int64)
+        layout_changed = packet.layout is not self._layout
+        keyframe = (
+            layout_changed
+            or self._keyframe_positions is None
+            or self._sequence - self._keyframe_sequence >= self.keyframe_every
+        )
+        if not keyframe:
+            delta = positions - self._keyframe_positions
+            # Moved too far from the keyframe for int16 deltas: start a new one.
+            keyframe = bool(delta.min() < _INT16_MIN or delta.max() > _INT16_MAX)
+
+        flags = 0
+        names = b""
+        if keyframe:
+            flags |= FLAG_KEYFRAME
+            if layout_changed or self._keyframes_sent % self.names_every == 0:
+                flags |= FLAG_NAMES
+                names = "\n".join(packet.layout.names).encode("utf-8")
+            self._keyframe_sequence = self._sequence
+            self._keyframe_positions = positions
+            self._keyframes_sent += 1
+            self._layout = packet.layout
+            position_block = positions.astype("<i4").tobytes()
+        else:
+            position_block = delta.astype("<i2").tobytes()
+
+        parts = [
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                flags,
+                layout_code(packet.layout),
+                self._sequence,
+                self._keyframe_sequence,
+                packet.timestamp,
+                len(rows),
+                self.position_step,
+            )
+        ]
+        if flags & FLAG_NAMES:
+            parts += [NAMES_LENGTH.pack(len(names)), names]
+        parts += [
+            position_block,
+            encode_quaternions(rows[:, ROTATION]).astype("<u4").tobytes(),
+            confidence.tobytes(),
+        ]
+        return b"".join(parts)
+
+
+class SkeletonDecoder:
+    """Stateful decoder for one incoming stream.
+
+    Returns None for delta frames whose keyframe was lost and for streams
+    whose joint names have not been seen yet; both resolve on the next
+    keyframe.
+    """
+
+    def __init__(self) -> None:
+        self._layouts: Dict[int, JointLayout] = {}
+        self._keyframe_sequence: Optional[int] = None
+        self._keyframe_positions: Optional[np.ndarray] = None
+        self.missed = 0
+
+    def register_layout(self, names) -> None:
+        """Make a layout known up front so decoding can start on any keyframe."""
+
+        layout = get_joint_layout(names)
+        self._layouts[layout_code(layout)] = layout
+
+    def decode(self, data: bytes) -> Optional[QuestPacket]:
+        if len(data) < HEADER.size or data[0] != MAGIC:
+            raise SkeletonDecodeError("Not a skeleton datagram")
+        _, version, flags, code, sequence, keyframe_sequence, timestamp, n_rows, step = HEADER.unpack_from(data, 0)
+        if version != VERSION:
+            raise SkeletonDecodeError(f"Unsupported skeleton format version {version}")
+
+        offset = HEADER.size
+        if flags & FLAG_NAMES:
+            (length,) = NAMES_LENGTH.unpack_from(data, offset)
+            offset += NAMES_LENGTH.size
+            names = bytes(data[offset : offset + length]).decode("utf-8")
+            offset += length
+            self.register_layout(names.split("\n") if names else [])
+
+        keyframe = bool(flags & FLAG_KEYFRAME)
+        position_dtype = np.dtype("<i4") if keyframe else np.dtype("<i2")
+        expected = offset + n_rows * (3 * position_dtype.itemsize + 4 + 1)
+        if len(data) < expected:
+            raise SkeletonDecodeError(f"Truncated skeleton datagram ({len(data)} < {expected} bytes)")
+
+        positions = np.frombuffer(data, dtype=position_dtype, count=n_rows * 3, offset=offset).reshape(n_rows, 3)
+        offset += positions.nbytes
+        rotations = np.frombuffer(data, dtype="<u4", count=n_rows, offset=offset)
+        offset += rotations.nbytes
+        confidence = np.frombuffer(data, dtype=np.uint8, count=n_rows, offset=offset)
+
+        if keyframe:
+            self._keyframe_sequence = keyframe_sequence
+            self._keyframe_positions = positions.astype(np.int64)
+            absolute = self._keyframe_positions
+        elif keyframe_sequence != self._keyframe_sequence or self._keyframe_positions is None:
+            self.missed += 1
+            return None
+        elif len(self._keyframe_positions) != n_rows:
+            raise SkeletonDecodeError("Delta frame does not match its keyframe")
+        else:
+            absolute = self._keyframe_positions + positions
+
+        layout = self._layouts.get(code)
+        if layout is None or len(layout) != n_rows - 1:
+            self.missed += 1
+            return None
+
+        rows = np.empty((n_rows, POSE_WIDTH), dtype=np.float32)
+        rows[:, POSITION] = absolute * step
+        rows[:, ROTATION] = decode_quaternions(rotations)
+        return QuestPacket(
+            timestamp=timestamp,
+            hmd=rows[0],
+            poses=rows[1:],
+            confidences=confidence[1:].astype(np.float32) / 255.0,
+            layout=layout,
+        )
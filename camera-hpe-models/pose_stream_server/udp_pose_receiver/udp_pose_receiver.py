@@ -1,70 +1,228 @@
+"""Standalone Quest UDP receiver.
+
+Decodes ``PosePacket`` msgpack (and binary skeleton) datagrams, tracks one
+session per sender and logs per-packet details at DEBUG. With ``--workers N``
+several processes bind the same port with ``SO_REUSEPORT``; the kernel
+hashes each sender's address to one worker, so a headset's packets always
+land in the same process and its session state stays consistent.
+"""
+
 from __future__ import annotations
 
 import argparse
 import asyncio
+import contextlib
 import json
 import logging
-from typing import Callable, Iterable, Sequence, Tuple
+import multiprocessing
+import socket
+import struct
+import time
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
 import msgpack
 
+from pose_stream_server.common.latency import FrameTimes
+from pose_stream_server.common.metrics import REGISTRY, Counter, add_metrics_arguments, start_metrics
+
+from .quest_packet import QuestPacket, QuestPacketDecoder, as_quest_packet
+from .sessions import DEFAULT_IDLE_TIMEOUT_S, QuestSessionTable
+from .skeleton_codec import SkeletonDecodeError, SkeletonDecoder, is_skeleton_datagram
+
 logger = logging.getLogger(__name__)
 
+# Decode modes for PosePacketProtocol: "dict" hands the raw msgpack payload to
+# the handler, "array" hands a QuestPacket decoded straight from the datagram
+# (QuestPacketDecoder; the dict is rebuilt on demand by .to_payload()).
+# Binary skeleton datagrams (skeleton_codec.py) are detected by their first
+# byte and always decode to a QuestPacket; "dict" mode gets its to_payload().
+DECODE_DICT = "dict"
+DECODE_ARRAY = "array"
+DECODE_MODES = (DECODE_DICT, DECODE_ARRAY)
+
+DECODE_SECONDS = REGISTRY.histogram("pose_decode_seconds", "Quest datagram decode time")
+
+
 class PosePacketProtocol(asyncio.DatagramProtocol):
-    def __init__(self, handler: Callable[[dict, Tuple[str, int]], None]) -> None:
+    def __init__(
+        self,
+        handler: Callable[[Any, Tuple[str, int]], None],
+        decode: str = DECODE_DICT,
+        recorder=None,
+    ) -> None:
         super().__init__()
+        if decode not in DECODE_MODES:
+            raise ValueError(f"Unknown decode mode {decode!r}; expected one of {DECODE_MODES}")
         self._handler = handler
+        self._decode = decode
+        # Optional SessionRecorder that keeps every raw datagram.
+        self._recorder = recorder
+        # Per-sender counters, cached so the hot path skips the registry.
+        self._packets: Dict[str, Counter] = {}
+        self._dropped: Dict[str, Counter] = {}
+        self._packet_decoder = QuestPacketDecoder()
+        # Skeleton streams carry keyframe/delta state per sender.
+        self._skeleton_decoders: Dict[Tuple[str, int], SkeletonDecoder] = {}
+
+    def _source_counters(self, host: str) -> Tuple[Counter, Counter]:
+        packets = self._packets.get(host)
+        if packets is None:
+            packets = self._packets[host] = REGISTRY.counter(
+                "pose_quest_packets_total", "Quest datagrams received", source=host
+            )
+            self._dropped[host] = REGISTRY.counter(
+                "pose_quest_dropped_total", "Quest datagrams that failed to decode", source=host
+            )
+        return packets, self._dropped[host]
 
     def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
-        try:
-            payload = msgpack.unpackb(data, raw=False)
-        except (msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as exc:
-            logger.warning("Failed to decode UDP packet from %s: %s", addr, exc)
+        received = time.time()
+        packets, dropped = self._source_counters(addr[0])
+        packets.inc()
+        if self._recorder is not None:
+            self._recorder.record_quest_datagram(data, addr)
+
+        began = time.perf_counter()
+        if is_skeleton_datagram(data):
+            self._skeleton_received(data, addr, dropped, began, received)
             return
 
+        if self._decode == DECODE_ARRAY:
+            try:
+                payload = self._packet_decoder.decode(data)
+            except (msgpack.UnpackException, TypeError, ValueError) as exc:
+                dropped.inc()
+                logger.debug("Malformed pose packet from %s: %s", addr, exc)
+                return
+            payload.times = FrameTimes(received=received, decoded=time.time())
+        else:
+            try:
+                payload = msgpack.unpackb(data, raw=False)
+            except (msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as exc:
+                dropped.inc()
+                logger.debug("Failed to decode UDP packet from %s: %s", addr, exc)
+                return
+        DECODE_SECONDS.observe(time.perf_counter() - began)
+
         self._handler(payload, addr)
 
+    def _skeleton_received(
+        self, data: bytes, addr: Tuple[str, int], dropped: Counter, began: float, received: float
+    ) -> None:
+        decoder = self._skeleton_decoders.get(addr)
+        if decoder is None:
+            decoder = self._skeleton_decoders[addr] = SkeletonDecoder()
+        try:
+            packet = decoder.decode(data)
+        except (SkeletonDecodeError, struct.error, UnicodeDecodeError) as exc:
+            dropped.inc()
+            logger.debug("Malformed skeleton datagram from %s: %s", addr, exc)
+            return
+        if packet is None:
+            # Delta without its keyframe, or names not seen yet.
+            dropped.inc()
+            return
+        packet.times = FrameTimes(received=received, decoded=time.time())
+        DECODE_SECONDS.observe(time.perf_counter() - began)
+
+        self._handler(packet.to_payload() if self._decode == DECODE_DICT else packet, addr)
+
 
-async def run_server(host: str, port: int, on_packet: Callable[[dict, Tuple[str, int]], None]) -> None:
+async def run_server(
+    host: str,
+    port: int,
+    on_packet: Callable[[Any, Tuple[str, int]], None],
+    decode: str = DECODE_DICT,
+    recorder=None,
+    ready: Optional[asyncio.Event] = None,
+    reuse_port: bool = False,
+) -> None:
     loop = asyncio.get_running_loop()
     transport, _ = await loop.create_datagram_endpoint(
-        lambda: PosePacketProtocol(on_packet), local_addr=(host, port)
+        lambda: PosePacketProtocol(on_packet, decode=decode, recorder=recorder),
+        local_addr=(host, port),
+        # Lets several receiver processes share the port (Linux/BSD only).
+        reuse_port=reuse_port or None,
     )
 
     logger.info("Listening for raw UDP pose packets on udp://%s:%d", host, port)
+    if ready is not None:
+        ready.set()
     try:
         await asyncio.Future()
     finally:
         transport.close()
 
 
-def _pretty_print_packet(packet: dict, addr: Tuple[str, int]) -> None:
-    timestamp = packet.get("timestamp")
-    hmd = packet.get("hmd", {})
-    position = hmd.get("position", {})
-    rotation = hmd.get("rotation", {})
+def _pretty_print_packet(packet: dict | QuestPacket, addr: Tuple[str, int]) -> None:
+    if not logger.isEnabledFor(logging.DEBUG):
+        # Rates and decode latency are in the periodic metrics summary.
+        return
 
-    logger.info(
+    quest = as_quest_packet(packet)
+    hmd = quest.hmd
+
+    logger.debug(
         "Packet from %s timestamp=%s hmd=(%.3f, %.3f, %.3f) yaw=%.1f",
         addr,
-        timestamp,
-        position.get("x", 0.0),
-        position.get("y", 0.0),
-        position.get("z", 0.0),
-        rotation.get("y", 0.0),
+        quest.timestamp,
+        hmd[0],
+        hmd[1],
+        hmd[2],
+        hmd[4],
     )
 
-    joint_iterable: Iterable[dict] = packet.get("joints", [])
-    joint_list = list(joint_iterable)
-    if joint_list:
+    if len(quest.layout):
         joint_summary = ", ".join(
-            f"{joint.get('name')}:({joint.get('pose', {}).get('position', {}).get('x', 0.0):.3f},"
-            f" {joint.get('pose', {}).get('position', {}).get('y', 0.0):.3f},"
-            f" {joint.get('pose', {}).get('position', {}).get('z', 0.0):.3f})"
-            for joint in joint_list
+            f"{name}:({x:.3f}, {y:.3f}, {z:.3f})"
+            for name, (x, y, z) in zip(quest.joint_names, quest.positions.tolist())
         )
         logger.debug("Joints %s", joint_summary)
-    
-    logger.info("Full packet payload from %s: %s", addr, json.dumps(packet, sort_keys=True))
+
+    logger.debug("Full packet payload from %s: %s", addr, json.dumps(quest.to_payload(), sort_keys=True))
+
+
+async def _report_sessions(sessions: QuestSessionTable, interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        sessions.evict_idle()
+        if len(sessions):
+            logger.info("Sessions — %s", sessions.summary())
+
+
+async def serve(args: argparse.Namespace) -> None:
+    sessions = QuestSessionTable(idle_timeout=args.session_timeout)
+
+    def on_packet(packet, addr: Tuple[str, int]) -> None:
+        sessions.update(as_quest_packet(packet), addr)
+        _pretty_print_packet(packet, addr)
+
+    report = None
+    if args.metrics_interval > 0:
+        report = asyncio.create_task(_report_sessions(sessions, args.metrics_interval))
+    try:
+        await run_server(args.host, args.port, on_packet, decode=args.decode, reuse_port=args.workers > 1)
+    finally:
+        if report is not None:
+            report.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await report
+
+
+def _run_worker(args: argparse.Namespace, worker: int) -> None:
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(processName)s %(levelname)s:%(name)s:%(message)s" if args.workers > 1 else logging.BASIC_FORMAT,
+    )
+    if args.metrics_port:
+        # One endpoint per worker: --metrics-port, +1, +2, ...
+        args.metrics_port += worker
+    metrics = start_metrics(args)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        logger.info("Shutting down UDP receiver")
+    finally:
+        metrics.stop()
 
 
 def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
@@ -74,20 +232,52 @@ def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
     parser.add_argument(
         "--verbose",
         action="store_true",
-        help="Increase logging verbosity (prints sample joint positions)",
+        help="Log every packet with its joint positions and full payload",
+    )
+    parser.add_argument(
+        "--decode",
+        choices=DECODE_MODES,
+        default=DECODE_ARRAY,
+        help="Packet decode mode: nested dicts or NumPy pose arrays (default: array)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Receiver processes sharing the port via SO_REUSEPORT (default: 1)",
+    )
+    parser.add_argument(
+        "--session-timeout",
+        type=float,
+        default=DEFAULT_IDLE_TIMEOUT_S,
+        help=f"Seconds without packets before a sender's session is dropped (default: {DEFAULT_IDLE_TIMEOUT_S:g})",
     )
-    return parser.parse_args(argv)
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.workers > 1 and not hasattr(socket, "SO_REUSEPORT"):
+        parser.error("--workers needs SO_REUSEPORT, which this platform does not support")
+    return args
 
 
 def main(argv: Sequence[str] | None = None) -> None:
     args = parse_args(argv)
+    if args.workers <= 1:
+        _run_worker(args, 0)
+        return
 
-    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
-
+    workers = [
+        multiprocessing.Process(target=_run_worker, args=(args, i), name=f"receiver-{i}")
+        for i in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
     try:
-        asyncio.run(run_server(args.host, args.port, _pretty_print_packet))
+        for worker in workers:
+            worker.join()
     except KeyboardInterrupt:
-        logger.info("Shutting down UDP receiver")
+        # Workers got the same SIGINT and shut down on their own.
+        for worker in workers:
+            worker.join()
 
 
 if __name__ == "__main__":
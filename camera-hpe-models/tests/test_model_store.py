@@ -0,0 +1,55 @@
+"""Model files are checked against their pinned checksums."""
+
+import hashlib
+import os
+
+import pytest
+
+from pose_stream_server.synthpose.model_store import ModelSpec, ModelStore, PinnedFile
+
+RELEASED = b"released weights"
+CORRUPT = b"truncated"
+
+
+def _spec(*downloads: bytes) -> ModelSpec:
+    remaining = list(downloads)
+
+    def fetch(spec, directory):
+        with open(os.path.join(directory, "weights.pt"), "wb") as f:
+            f.write(remaining.pop(0))
+
+    pin = PinnedFile("weights.pt", len(RELEASED), hashlib.sha256(RELEASED).hexdigest())
+    return ModelSpec("model", "model", ("weights.pt",), fetch, pinned=(pin,))
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_mismatched_download_is_fetched_again(tmp_path):
+    store = ModelStore(str(tmp_path))
+    paths = store.ensure(_spec(CORRUPT, RELEASED))
+    assert _read(paths["weights.pt"]) == RELEASED
+    assert store.manifest["model"]["weights.pt"]["sha256"] == hashlib.sha256(RELEASED).hexdigest()
+
+
+def test_repeatedly_mismatched_download_fails(tmp_path):
+    store = ModelStore(str(tmp_path))
+    with pytest.raises(RuntimeError, match="pinned checksum"):
+        store.ensure(_spec(CORRUPT, CORRUPT))
+    assert "model" not in store.manifest
+
+
+def test_unrecorded_file_that_does_not_match_pin_is_replaced(tmp_path):
+    os.makedirs(tmp_path / "model")
+    (tmp_path / "model" / "weights.pt").write_bytes(CORRUPT)
+    paths = ModelStore(str(tmp_path)).ensure(_spec(RELEASED))
+    assert _read(paths["weights.pt"]) == RELEASED
+
+
+def test_offline_store_rejects_file_that_does_not_match_pin(tmp_path):
+    os.makedirs(tmp_path / "model")
+    (tmp_path / "model" / "weights.pt").write_bytes(CORRUPT)
+    with pytest.raises(RuntimeError, match="missing or corrupt"):
+        ModelStore(str(tmp_path), offline=True).ensure(_spec())
@@ -0,0 +1,51 @@
+"""Triangulation only takes views that match their calibration."""
+
+import logging
+
+import numpy as np
+import pytest
+
+from pose_stream_server.common.fusion_workspace import LANDMARK_WIDTH, METRES, PIXELS, PoseSnapshot
+from pose_stream_server.common.multiview import CameraCalibration, MultiViewTriangulator
+from pose_stream_server.udp_pose_receiver.quest_packet import get_joint_layout
+
+LAYOUT = get_joint_layout(["nose", "left_hip", "right_hip"])
+POINTS = np.array([[0.0, 1.6, 3.0], [-0.1, 1.0, 3.1], [0.1, 1.0, 2.9]])
+IMAGE_SIZE = (1280, 720)
+K = np.array([[900.0, 0.0, 640.0], [0.0, 900.0, 360.0], [0.0, 0.0, 1.0]])
+
+
+def _camera(name: str, x: float) -> CameraCalibration:
+    return CameraCalibration(name, K, np.zeros(5), np.eye(3), np.array([x, 0.0, 0.0]), IMAGE_SIZE)
+
+
+CAMERAS = {"cam0": _camera("cam0", 0.5), "cam1": _camera("cam1", -0.5)}
+
+
+def _view(cam: CameraCalibration, **kwargs) -> PoseSnapshot:
+    projected = (cam.projection @ np.hstack([POINTS, np.ones((len(POINTS), 1))]).T).T
+    data = np.zeros((len(POINTS), LANDMARK_WIDTH), dtype=np.float32)
+    data[:, :2] = projected[:, :2] / projected[:, 2:]
+    data[:, 3] = 1.0
+    return PoseSnapshot(1.0, data, LAYOUT, **kwargs)
+
+
+def test_matching_views_are_triangulated():
+    triangulator = MultiViewTriangulator(CAMERAS)
+    views = [_view(cam, unit=PIXELS, image_size=IMAGE_SIZE) for cam in CAMERAS.values()]
+    snapshot = triangulator.triangulate(views)
+    np.testing.assert_allclose(snapshot.data[:, :3], POINTS, atol=1e-4)
+
+
+@pytest.mark.parametrize(
+    "frame",
+    [dict(unit=METRES), dict(unit=PIXELS, image_size=(640, 360))],
+    ids=["metres", "other_image_size"],
+)
+def test_mismatched_view_is_skipped(frame, caplog):
+    triangulator = MultiViewTriangulator(CAMERAS)
+    views = [_view(CAMERAS["cam0"], unit=PIXELS, image_size=IMAGE_SIZE), _view(CAMERAS["cam1"], **frame)]
+    with caplog.at_level(logging.WARNING):
+        assert triangulator.triangulate(views) is None
+        assert triangulator.triangulate(views) is None
+    assert [record.getMessage().split(":")[0] for record in caplog.records] == ["Ignoring camera cam1"]
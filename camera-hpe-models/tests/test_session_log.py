@@ -0,0 +1,25 @@
+"""Session log round trips."""
+
+import numpy as np
+
+from pose_stream_server.common.fusion_workspace import LANDMARK_WIDTH, MEASURED, PREDICTED, PoseSnapshot
+from pose_stream_server.common.session_log import KIND_POSE_SNAPSHOT, SessionReader, SessionRecorder
+from pose_stream_server.udp_pose_receiver.quest_packet import get_joint_layout
+
+LAYOUT = get_joint_layout(["nose", "left_hip", "right_hip"])
+
+
+def test_snapshot_kind_survives_replay(tmp_path):
+    path = str(tmp_path / "session.poselog")
+    data = np.arange(len(LAYOUT) * LANDMARK_WIDTH, dtype=np.float32).reshape(len(LAYOUT), LANDMARK_WIDTH)
+    with SessionRecorder(path) as recorder:
+        recorder.record_snapshot(PoseSnapshot(1.0, data, LAYOUT), "cam0")
+        recorder.record_snapshot(PoseSnapshot(2.0, data, LAYOUT, kind=PREDICTED), "cam0")
+
+    reader = SessionReader(path)
+    try:
+        snapshots = [reader.decode_snapshot(record) for record in reader.records() if record.kind == KIND_POSE_SNAPSHOT]
+    finally:
+        reader.close()
+    assert [(snapshot.kind, source) for snapshot, source in snapshots] == [(MEASURED, "cam0"), (PREDICTED, "cam0")]
+    np.testing.assert_array_equal(snapshots[1][0].data, data)
@@ -0,0 +1,103 @@
+"""Shared-memory pose slots across a writer restart."""
+
+import os
+
+import numpy as np
+import pytest
+
+from pose_stream_server.common.fusion_workspace import LANDMARK_WIDTH, METRES, PIXELS, PoseSnapshot
+from pose_stream_server.common.latency import FrameTimes
+from pose_stream_server.common.shared_pose import SharedPoseWriter, attach_reader, refresh_reader
+from pose_stream_server.udp_pose_receiver.quest_packet import get_joint_layout
+
+LAYOUT = get_joint_layout(["nose", "left_hip", "right_hip"])
+
+
+@pytest.fixture
+def source():
+    return f"test_restart_{os.getpid()}"
+
+
+def _snapshot(timestamp: float, value: float) -> PoseSnapshot:
+    return PoseSnapshot(timestamp, np.full((len(LAYOUT), LANDMARK_WIDTH), value, dtype=np.float32), LAYOUT)
+
+
+def test_reader_follows_restarted_writer(source):
+    writer = SharedPoseWriter(source)
+    reader = attach_reader(source)
+    try:
+        writer.publish(_snapshot(1.0, 1.0))
+        assert reader.read().timestamp == 1.0
+        writer.close()
+
+        writer = SharedPoseWriter(source)
+        writer.publish(_snapshot(2.0, 2.0))
+        writer.publish(_snapshot(3.0, 3.0))
+
+        reader = refresh_reader(source, reader)
+        snapshot = reader.read()
+        assert snapshot is not None
+        assert snapshot.timestamp == 3.0
+        assert snapshot.layout is LAYOUT
+        np.testing.assert_array_equal(snapshot.data, 3.0)
+        assert reader.read() is None
+    finally:
+        if reader is not None:
+            reader.close()
+        writer.close()
+
+
+def test_refresh_keeps_reader_of_live_writer(source):
+    writer = SharedPoseWriter(source)
+    reader = attach_reader(source)
+    try:
+        writer.publish(_snapshot(1.0, 1.0))
+        assert reader.read() is not None
+        assert refresh_reader(source, reader) is reader
+    finally:
+        reader.close()
+        writer.close()
+
+
+def test_refresh_drops_reader_of_closed_writer(source):
+    writer = SharedPoseWriter(source)
+    reader = attach_reader(source)
+    writer.close()
+    assert refresh_reader(source, reader) is None
+
+
+def test_frame_times_cross_the_slot(source):
+    writer = SharedPoseWriter(source)
+    reader = attach_reader(source)
+    try:
+        snapshot = _snapshot(1.0, 1.0)
+        snapshot.times = FrameTimes(0.9, 0.95, None)
+        writer.publish(snapshot)
+        times = reader.read().times
+        assert (times.captured, times.received, times.decoded, times.published) == (0.9, 0.95, None, None)
+
+        writer.publish(_snapshot(2.0, 2.0))
+        assert reader.read().times is None
+    finally:
+        reader.close()
+        writer.close()
+
+
+def test_unit_and_image_size_cross_the_slot(source):
+    writer = SharedPoseWriter(source)
+    reader = attach_reader(source)
+    try:
+        snapshot = _snapshot(1.0, 1.0)
+        snapshot.unit, snapshot.image_size = PIXELS, (1280, 720)
+        writer.publish(snapshot)
+        read = reader.read()
+        assert (read.unit, read.image_size) == (PIXELS, (1280, 720))
+
+        snapshot = _snapshot(2.0, 2.0)
+        snapshot.unit = METRES
+        writer.publish(snapshot)
+        read = reader.read()
+        assert (read.unit, read.image_size) == (METRES, None)
+    finally:
+        reader.close()
+        writer.close()
@@ -0,0 +1,24 @@
+"""Smallest-three quaternion quantization error."""
+
+import numpy as np
+
+from pose_stream_server.udp_pose_receiver.skeleton_codec import decode_quaternions, encode_quaternions
+
+# Documented bound on the rotation error, in degrees.
+MAX_ERROR_DEG = 0.3
+
+
+def _error_deg(quats: np.ndarray) -> np.ndarray:
+    decoded = decode_quaternions(encode_quaternions(quats)).astype(np.float64)
+    dot = np.abs(np.sum(quats * decoded, axis=1)) / np.linalg.norm(decoded, axis=1)
+    return np.degrees(2.0 * np.arccos(np.clip(dot, 0.0, 1.0)))
+
+
+def test_quaternion_error_stays_under_documented_bound():
+    rng = np.random.default_rng(0)
+    uniform = rng.normal(size=(100_000, 4))
+    # The worst case is near equal components.
+    equal = 0.5 + rng.normal(scale=0.02, size=(100_000, 4))
+    quats = np.concatenate([uniform, equal])
+    quats /= np.linalg.norm(quats, axis=1, keepdims=True)
+    assert _error_deg(quats).max() < MAX_ERROR_DEG